@@ -0,0 +1,140 @@
+# agenda.py
+# Agenda materializada por (médico, fecha): los intervalos de horario del día por
+# sucursal y los slots ocupados por citas pendientes. Se construye perezosamente
+# (los días que faltan de un rango se cargan con una consulta de citas; el
+# horario del médico ya parseado tiene su propia caché), vive en una caché LRU y las escrituras de esta API (crear, cancelar,
+# completar, reagendar) la actualizan en el lugar, así que la disponibilidad se
+# sirve desde memoria sin llamadas al backend.
+#
+# El TTL acota cuánto tardan en verse los cambios hechos por fuera de este
+# proceso (otra instancia, horarios editados en Supabase). La reserva se sigue
+# validando en la base, así que un dato viejo nunca produce una doble reserva.
+import asyncio
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, FrozenSet, List, Sequence, Tuple
+
+import vuelo
+from cache import crear_cache
+from datos import db
+from disponibilidad import DURACION_SLOT_MINUTOS, HorarioMedico, Intervalo, minutos
+
+AGENDA_CACHE_TTL = float(os.getenv("AGENDA_CACHE_TTL", "300"))
+AGENDA_CACHE_MAX = int(os.getenv("AGENDA_CACHE_MAX", "5000"))
+HORARIOS_CACHE_MAX = int(os.getenv("HORARIOS_CACHE_MAX", "1000"))
+
+_agendas = crear_cache("agendas", AGENDA_CACHE_TTL, AGENDA_CACHE_MAX)
+_horarios = crear_cache("horarios_medico", AGENDA_CACHE_TTL, HORARIOS_CACHE_MAX)
+# Escrituras vistas por el proceso; una carga que se cruza con una escritura
+# responde con lo que leyó pero no se guarda en la caché
+_escrituras = 0
+
+
+class AgendaDia:
+    __slots__ = ("horario", "intervalos", "ocupadas")
+
+    def __init__(self, horario: HorarioMedico, fecha: date):
+        self.horario = horario
+        self.intervalos = horario.del_dia(fecha)  # sucursal_id -> ((inicio, fin, duración), ...)
+        self.ocupadas: Dict[Tuple[str, int], str] = {}  # (sucursal_id, minuto) -> id de la cita
+
+    @property
+    def sucursales(self) -> FrozenSet[str]:
+        return self.horario.sucursales
+
+    def de_sucursal(self, sucursal_id: str) -> Dict[Any, Sequence[Intervalo]]:
+        return {s: iv for s, iv in self.intervalos.items() if str(s) == sucursal_id}
+
+
+def _slot(cita: Dict[str, Any]):
+    minuto = minutos(cita.get("hora"))
+    return None if minuto is None else (str(cita.get("sucursal_id")), minuto)
+
+
+async def horario_medico(medico_id: str) -> HorarioMedico:
+    # Los horarios no se editan desde esta API; el TTL recoge los cambios externos
+    medico_id = str(medico_id)
+    horario = _horarios.get(medico_id)
+    if horario is None:
+        horario = await vuelo.compartir("horario_medico", medico_id, lambda: _cargar_horario(medico_id))
+    return horario
+
+
+async def _cargar_horario(medico_id: str) -> HorarioMedico:
+    res = await db.table("horarios").select("*").eq("medico_id", medico_id).execute()
+    horario = HorarioMedico(res.data or [], DURACION_SLOT_MINUTOS)
+    _horarios.set(medico_id, horario)
+    return horario
+
+
+async def _cargar(medico_id: str, fechas: List[date]) -> Dict[Tuple[str, str], AgendaDia]:
+    escrituras = _escrituras
+    horario, citas_res = await asyncio.gather(
+        horario_medico(medico_id),
+        db.table("citas").select("id,fecha,hora,sucursal_id")
+          .eq("medico_id", medico_id)
+          .eq("estado", "pendiente")
+          .gte("fecha", fechas[0].isoformat())
+          .lte("fecha", fechas[-1].isoformat())
+          .execute(),
+    )
+    nuevas = {(medico_id, f.isoformat()): AgendaDia(horario, f) for f in fechas}
+    for c in citas_res.data or []:
+        agenda, slot = nuevas.get((medico_id, c["fecha"])), _slot(c)
+        if agenda is not None and slot is not None:
+            agenda.ocupadas[slot] = str(c["id"])
+
+    if escrituras == _escrituras:
+        for clave, agenda in nuevas.items():
+            _agendas.set(clave, agenda)
+    return nuevas
+
+
+async def agenda_medico(medico_id: str, inicio: date, fin: date) -> List[Tuple[date, AgendaDia]]:
+    medico_id = str(medico_id)
+    fechas = [inicio + timedelta(days=n) for n in range((fin - inicio).days + 1)]
+    encontradas, faltantes = _agendas.get_many((medico_id, f.isoformat()) for f in fechas)
+    if faltantes:
+        # Una sola carga desde el primer hasta el último día que falta
+        desde, hasta = date.fromisoformat(faltantes[0][1]), date.fromisoformat(faltantes[-1][1])
+        cargadas = await vuelo.compartir(
+            "agenda", (medico_id, desde, hasta),
+            lambda: _cargar(medico_id, [f for f in fechas if desde <= f <= hasta]),
+        )
+        encontradas.update(cargadas)
+    return [(f, encontradas[(medico_id, f.isoformat())]) for f in fechas]
+
+
+# ✏️ Actualizaciones desde las escrituras de la API
+
+def _agenda_de(cita: Dict[str, Any]):
+    return _agendas.get((str(cita.get("medico_id")), str(cita.get("fecha"))))
+
+
+def registrar_cita(cita: Dict[str, Any]) -> None:
+    global _escrituras
+    _escrituras += 1
+    agenda, slot = _agenda_de(cita), _slot(cita)
+    if agenda is not None and slot is not None and cita.get("estado") == "pendiente":
+        agenda.ocupadas[slot] = str(cita["id"])
+
+
+def liberar_cita(cita: Dict[str, Any]) -> None:
+    # La cita dejó de estar pendiente (cancelada o completada)
+    global _escrituras
+    _escrituras += 1
+    agenda, slot = _agenda_de(cita), _slot(cita)
+    if agenda is not None and slot is not None and agenda.ocupadas.get(slot) == str(cita["id"]):
+        del agenda.ocupadas[slot]
+
+
+def liberar_por_id(cita_id: Any) -> None:
+    # Para cuando solo se conoce el id (la cita original de un reagendado)
+    global _escrituras
+    _escrituras += 1
+    cita_id = str(cita_id)
+    for _, agenda in _agendas.items():
+        for slot, ocupante in agenda.ocupadas.items():
+            if ocupante == cita_id:
+                del agenda.ocupadas[slot]
+                return
@@ -0,0 +1,221 @@
+# bench/arranque.py
+# Costo del arranque en frío: importa `main` en un proceso nuevo con
+# `python -X importtime` (varias veces, se toma el mínimo por módulo) y reporta
+# el tiempo por módulo propio y por paquete externo, más la primera petición
+# a `GET /` y la primera que consulta datos (`GET /roles/`) contra el backend en
+# memoria. Aparte mide cuánto cuesta crear el backend de Supabase en un proceso
+# nuevo (imports + clientes, sin red), que es lo que paga la primera consulta
+# real en un arranque en frío. Ejecutar desde la raíz:
+#
+#     python bench/arranque.py
+#     python bench/arranque.py --guardar bench/resultados/arranque.json
+#     python bench/arranque.py --comparar bench/resultados/arranque.json
+#
+# Con --comparar termina con código 1 si el import, la primera petición, la
+# primera consulta o la creación del backend empeoran más allá de la tolerancia.
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import date
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Importa main y atiende GET / y luego GET /roles/ (primera consulta al backend)
+# sin cliente HTTP; imprime los tiempos en ms
+_PRIMERA_PETICION = """
+import asyncio, json, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter()
+
+async def peticion(ruta):
+    scope = {"type": "http", "method": "GET", "path": ruta, "raw_path": ruta.encode(), "query_string": b"",
+             "headers": [], "http_version": "1.1", "scheme": "http", "server": ("bench", 80),
+             "client": ("127.0.0.1", 1), "root_path": ""}
+    enviados = []
+    async def recibir():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def enviar(mensaje):
+        enviados.append(mensaje)
+    await main.app(scope, recibir, enviar)
+    return enviados[0]["status"]
+
+async def ambas():
+    t0 = time.perf_counter()
+    estado = await peticion("/")
+    t1 = time.perf_counter()
+    estado_consulta = await peticion("/roles/")
+    return estado, estado_consulta, (t1 - t0) * 1000, (time.perf_counter() - t1) * 1000
+
+estado, estado_consulta, primera, consulta = asyncio.run(ambas())
+print(json.dumps({"import_ms": (importado - inicio) * 1000, "primera_peticion_ms": primera,
+                  "primera_consulta_ms": consulta, "estado": estado, "estado_consulta": estado_consulta}))
+"""
+
+# Crea el backend y el storage de Supabase como en la primera consulta (sin red)
+_BACKEND_SUPABASE = """
+import json, time
+inicio = time.perf_counter()
+from repositorio import crear_repositorio, crear_storage
+crear_repositorio("supabase")
+crear_storage()
+import sys
+print(json.dumps({"backend_supabase_ms": (time.perf_counter() - inicio) * 1000,
+                  "cliente_sync": "supabase" in sys.modules}))
+"""
+
+
+def _entorno() -> dict:
+    entorno = dict(os.environ)
+    entorno.setdefault("DATA_BACKEND", "memoria")
+    entorno.setdefault("ARRANQUE_RAPIDO", "1")
+    return entorno
+
+
+def _entorno_supabase() -> dict:
+    entorno = _entorno()
+    entorno.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+    entorno.setdefault("SUPABASE_API_KEY", "bench")
+    return entorno
+
+
+def _modulos_propios() -> set:
+    propios = set()
+    for nombre in os.listdir(RAIZ):
+        ruta = os.path.join(RAIZ, nombre)
+        if nombre.endswith(".py"):
+            propios.add(nombre[:-3])
+        elif os.path.isdir(ruta) and not nombre.startswith((".", "_")) and nombre not in ("bench", "sql"):
+            propios.add(nombre)
+    return propios
+
+
+def importtime() -> list:
+    # [(self_us, acumulado_us, profundidad, módulo)] de un proceso nuevo
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=RAIZ, env=_entorno(), capture_output=True, text=True, check=True,
+    )
+    filas = []
+    for linea in proceso.stderr.splitlines():
+        m = _LINEA.match(linea)
+        if m:
+            filas.append((int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2, m.group(4)))
+    return filas
+
+
+def medir(repeticiones: int) -> dict:
+    propios = _modulos_propios()
+    total_ms, por_modulo, por_paquete = [], defaultdict(list), defaultdict(list)
+    for _ in range(repeticiones):
+        filas = importtime()
+        paquetes = defaultdict(int)
+        for propio_us, acumulado_us, _, modulo in filas:
+            raiz = modulo.split(".")[0]
+            if raiz in propios:
+                por_modulo[modulo].append(acumulado_us / 1000)
+            else:
+                paquetes[raiz] += propio_us
+            if modulo == "main":
+                total_ms.append(acumulado_us / 1000)
+        for paquete, us in paquetes.items():
+            por_paquete[paquete].append(us / 1000)
+
+    peticiones = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", _PRIMERA_PETICION], cwd=RAIZ, env=_entorno(),
+                                capture_output=True, text=True, check=True).stdout
+        peticiones.append(json.loads(salida.strip().splitlines()[-1]))
+
+    backends = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", _BACKEND_SUPABASE], cwd=RAIZ, env=_entorno_supabase(),
+                                capture_output=True, text=True, check=True).stdout
+        backends.append(json.loads(salida.strip().splitlines()[-1]))
+
+    return {
+        "meta": {
+            "repeticiones": repeticiones,
+            "arranque_rapido": _entorno()["ARRANQUE_RAPIDO"],
+            "python": platform.python_version(),
+            "fecha": date.today().isoformat(),
+        },
+        "import_main_ms": round(min(total_ms), 1),
+        "proceso_import_ms": round(min(p["import_ms"] for p in peticiones), 1),
+        "primera_peticion_ms": round(min(p["primera_peticion_ms"] for p in peticiones), 1),
+        "primera_consulta_ms": round(min(p["primera_consulta_ms"] for p in peticiones), 1),
+        "backend_supabase_ms": round(min(b["backend_supabase_ms"] for b in backends), 1),
+        # True si crear el backend también importó el paquete `supabase` (cliente síncrono)
+        "backend_carga_cliente_sync": any(b["cliente_sync"] for b in backends),
+        # Acumulado (incluye lo que cada módulo importa por primera vez)
+        "modulos": {m: round(min(v), 1) for m, v in sorted(por_modulo.items(), key=lambda kv: -min(kv[1]))},
+        # Tiempo propio sumado de todos los submódulos del paquete
+        "paquetes": {p: round(min(v), 1) for p, v in sorted(por_paquete.items(), key=lambda kv: -min(kv[1]))},
+    }
+
+
+def reportar(resultados: dict, top: int) -> None:
+    print(f"import main        {resultados['import_main_ms']:>8.1f} ms (importtime)")
+    print(f"import en proceso  {resultados['proceso_import_ms']:>8.1f} ms")
+    print(f"primera petición   {resultados['primera_peticion_ms']:>8.1f} ms (GET /)")
+    print(f"primera consulta   {resultados['primera_consulta_ms']:>8.1f} ms (GET /roles/, backend {_entorno()['DATA_BACKEND']})")
+    print(f"backend Supabase   {resultados['backend_supabase_ms']:>8.1f} ms (imports + clientes, sin red)"
+          + ("  ⚠️ carga el cliente síncrono `supabase`" if resultados["backend_carga_cliente_sync"] else ""))
+    print("\nMódulos propios (acumulado):")
+    for modulo, ms in list(resultados["modulos"].items())[:top]:
+        print(f"  {modulo:<28}{ms:>8.1f} ms")
+    print("\nPaquetes externos (propio):")
+    for paquete, ms in list(resultados["paquetes"].items())[:top]:
+        print(f"  {paquete:<28}{ms:>8.1f} ms")
+
+
+def comparar(base: dict, actual: dict, tolerancia: float, margen_ms: float) -> list:
+    regresiones = []
+    for clave in ("import_main_ms", "primera_peticion_ms", "primera_consulta_ms", "backend_supabase_ms"):
+        # Resultados guardados antes de agregar una métrica no la tienen
+        if clave not in base:
+            continue
+        if actual[clave] > base[clave] * (1 + tolerancia) + margen_ms:
+            regresiones.append(f"{clave}: {base[clave]} -> {actual[clave]} ms")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación y primera petición de la API")
+    parser.add_argument("--repeticiones", type=int, default=5, help="procesos por medición (se toma el mínimo)")
+    parser.add_argument("--top", type=int, default=20, help="filas por tabla")
+    parser.add_argument("--guardar", help="escribe los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON base contra el que se compara")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="empeoramiento relativo admitido")
+    parser.add_argument("--margen-ms", type=float, default=20.0, help="margen absoluto (ruido)")
+    args = parser.parse_args()
+
+    resultados = medir(args.repeticiones)
+    reportar(resultados, args.top)
+
+    if args.guardar:
+        os.makedirs(os.path.dirname(os.path.abspath(args.guardar)), exist_ok=True)
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(base, resultados, args.tolerancia, args.margen_ms)
+        if regresiones:
+            print("\nRegresiones respecto a", args.comparar)
+            for r in regresiones:
+                print("  -", r)
+            sys.exit(1)
+        print("\nSin regresiones respecto a", args.comparar)
+
+
+if __name__ == "__main__":
+    main()
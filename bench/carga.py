@@ -0,0 +1,264 @@
+# bench/carga.py
+# Prueba de carga de los endpoints principales contra el backend en memoria (o
+# SQLite) con latencia simulada por consulta. Siembra volúmenes realistas y
+# reporta throughput, p50/p95/p99 y llamadas al backend por petición.
+# Ejecutar desde la raíz:
+#
+#     python bench/carga.py                                   # solo reporte
+#     python bench/carga.py --guardar bench/resultados/base.json
+#     python bench/carga.py --comparar bench/resultados/base.json
+#
+# Con --comparar termina con código 1 si algún escenario empeora: p95 o
+# throughput fuera de la tolerancia, o más llamadas al backend por petición.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# El benchmark hace de proxy: reparte los logins entre IPs con X-Forwarded-For
+os.environ.setdefault("LOGIN_CONFIAR_PROXY", "1")
+
+import httpx  # noqa: E402
+
+from datos import usar_repositorio  # noqa: E402
+from disponibilidad import DIAS_ES  # noqa: E402
+from repositorio import RepositorioMemoria, RepositorioSQLite  # noqa: E402
+
+MEDICO_ROLE_ID = "5770e7d5-c449-4094-bbe1-fd52ee6fe75f"
+PACIENTE_ROLE_ID = "abc856dd-ba5f-41ae-8dea-27aa29f8ab47"
+PASSWORD = "clave-de-prueba"
+HORAS = [f"{h:02d}:00" for h in range(8, 16)]
+ESTADOS = ("pendiente", "pendiente", "completada", "cancelada")
+
+
+# 🌱 Datos sembrados
+def sembrar(usuarios: int, citas: int, medicos: int, sucursales: int, semilla: int = 7):
+    from seguridad import contexto_hash
+
+    azar = random.Random(semilla)
+    hash_password = contexto_hash().hash(PASSWORD)
+    hoy = date.today()
+
+    tablas = {
+        "roles": [{"id": MEDICO_ROLE_ID, "nombre": "medico"}, {"id": PACIENTE_ROLE_ID, "nombre": "paciente"}],
+        "sucursales": [{"id": f"s{i}", "nombre": f"Sucursal {i}"} for i in range(sucursales)],
+        "usuarios": [],
+        "horarios": [],
+        "citas": [],
+    }
+    for i in range(medicos):
+        tablas["usuarios"].append({
+            "id": f"m{i}", "nombre": f"Médico {i}", "email": f"medico{i}@clinica.test",
+            "password": hash_password, "rol_id": MEDICO_ROLE_ID, "sucursal_id": f"s{i % sucursales}",
+        })
+        for dia in DIAS_ES[:5]:
+            tablas["horarios"].append({
+                "medico_id": f"m{i}", "sucursal_id": f"s{i % sucursales}", "dia_semana": dia,
+                "hora_inicio": "08:00:00", "hora_fin": "16:00:00",
+            })
+    for i in range(usuarios - medicos):
+        tablas["usuarios"].append({
+            "id": f"p{i}", "nombre": f"Paciente {i}", "email": f"paciente{i}@clinica.test",
+            "password": hash_password, "rol_id": PACIENTE_ROLE_ID, "sucursal_id": f"s{i % sucursales}",
+        })
+
+    # Slots laborables de -60 a +60 días; se ocupa una parte y el resto queda libre
+    fechas = [hoy + timedelta(days=d) for d in range(-60, 61)]
+    fechas = [f.isoformat() for f in fechas if f.weekday() < 5]
+    slots = [(f"m{m}", f, h) for m in range(medicos) for f in fechas for h in HORAS]
+    azar.shuffle(slots)
+    ocupados, libres = slots[:citas], slots[citas:]
+    pacientes = usuarios - medicos
+    for medico_id, fecha, hora in ocupados:
+        tablas["citas"].append({
+            "paciente_id": f"p{azar.randrange(pacientes)}", "medico_id": medico_id,
+            "sucursal_id": f"s{int(medico_id[1:]) % sucursales}", "fecha": fecha, "hora": hora,
+            "estado": azar.choice(ESTADOS), "comentarios": "",
+        })
+    futuros = [s for s in libres if s[1] >= hoy.isoformat()]
+    return tablas, futuros
+
+
+# 🎯 Escenarios: nombre -> generador de peticiones (método, url, kwargs)
+def escenarios(args, futuros, azar):
+    medicos = [f"m{i}" for i in range(args.medicos)]
+    pacientes = args.usuarios - args.medicos
+    libres = iter(futuros)
+
+    def login(n):
+        i = azar.randrange(pacientes)
+        return "POST", "/auth/login", {
+            "json": {"email": f"paciente{i}@clinica.test", "password": PASSWORD},
+            # IP distinta por petición para no medir el limitador
+            "headers": {"x-forwarded-for": f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"},
+        }
+
+    def reservar(_):
+        medico_id, fecha, hora = next(libres)
+        return "POST", "/citas", {"data": {
+            "paciente_id": f"p{azar.randrange(pacientes)}", "medico_id": medico_id,
+            "sucursal_id": f"s{int(medico_id[1:]) % args.sucursales}", "fecha": fecha, "hora": hora,
+        }}
+
+    return {
+        "citas_todas": (args.peticiones, lambda _: ("GET", "/citas/todas?limite=200", {})),
+        "citas_todas_ndjson": (max(args.peticiones // 20, 5), lambda _: ("GET", "/citas/todas?formato=ndjson", {})),
+        "citas_resumen": (args.peticiones, lambda _: ("GET", "/admin/citas/resumen", {})),
+        "citas_medico": (args.peticiones, lambda _: ("GET", f"/citas/medico/{azar.choice(medicos)}", {})),
+        "disponibilidad": (args.peticiones, lambda _: ("GET", f"/medicos/{azar.choice(medicos)}/disponibilidad", {})),
+        "login": (args.peticiones, login),
+        "crear_cita": (args.peticiones, reservar),
+    }
+
+
+def percentil(valores, p):
+    return statistics.quantiles(valores, n=100, method="inclusive")[p - 1] if len(valores) > 1 else valores[0]
+
+
+async def correr(cliente, repo, peticiones: int, generador, concurrencia: int):
+    latencias, errores = [], 0
+    contador = iter(range(peticiones))
+
+    async def trabajador():
+        nonlocal errores
+        for n in contador:
+            metodo, url, kwargs = generador(n)
+            inicio = time.perf_counter()
+            r = await cliente.request(metodo, url, **kwargs)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if r.status_code >= 400:
+                errores += 1
+
+    llamadas = repo.llamadas
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+    return {
+        "peticiones": peticiones,
+        "errores": errores,
+        "rps": round(peticiones / duracion, 1),
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+        "llamadas_por_peticion": round((repo.llamadas - llamadas) / peticiones, 2),
+    }
+
+
+async def medir(args):
+    tablas, futuros = sembrar(args.usuarios, args.citas, args.medicos, args.sucursales)
+    latencia = args.latencia_ms / 1000
+    if args.backend == "sqlite":
+        repo = RepositorioSQLite(":memory:", latencia=latencia)
+        repo.cargar(tablas)
+    else:
+        repo = RepositorioMemoria(tablas, latencia=latencia)
+    usar_repositorio(repo)
+
+    import cache
+    from main import app
+
+    azar = random.Random()
+    resultados = {}
+    seleccion = set(args.solo.split(",")) if args.solo else None
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+        for nombre, (peticiones, generador) in escenarios(args, futuros, azar).items():
+            if seleccion and nombre not in seleccion:
+                continue
+            # Escenarios independientes del orden: cachés vacías y azar reiniciado;
+            # el calentamiento deja listas las cachés que el escenario usa
+            for nombre_cache in cache.estadisticas():
+                cache.invalidar(nombre_cache)
+            azar.seed(nombre)
+            await correr(cliente, repo, max(1, min(args.concurrencia, peticiones) // 2), generador, args.concurrencia)
+            resultados[nombre] = await correr(cliente, repo, peticiones, generador, args.concurrencia)
+            r = resultados[nombre]
+            print(f"{nombre:<16}{r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f}  p95 {r['p95_ms']:>8.2f}  "
+                  f"p99 {r['p99_ms']:>8.2f} ms  {r['llamadas_por_peticion']:>5.2f} llamadas/pet  "
+                  f"{r['errores']} errores")
+
+    return {
+        "meta": {
+            "backend": args.backend,
+            "latencia_ms": args.latencia_ms,
+            "usuarios": args.usuarios,
+            "citas": args.citas,
+            "medicos": args.medicos,
+            "concurrencia": args.concurrencia,
+            "python": platform.python_version(),
+            "fecha": date.today().isoformat(),
+        },
+        "escenarios": resultados,
+    }
+
+
+def comparar(base: dict, actual: dict, tolerancia: float, margen_ms: float, margen_llamadas: float) -> list:
+    # Devuelve la lista de regresiones (vacía si todo está dentro de tolerancia)
+    regresiones = []
+    for nombre, a in actual["escenarios"].items():
+        b = base["escenarios"].get(nombre)
+        if not b:
+            continue
+        # Las llamadas solo varían por el orden en que se llenan las cachés; un
+        # N+1 agrega al menos una llamada por petición
+        if a["llamadas_por_peticion"] > b["llamadas_por_peticion"] + margen_llamadas:
+            regresiones.append(f"{nombre}: llamadas/pet {b['llamadas_por_peticion']} -> {a['llamadas_por_peticion']}")
+        if a["p95_ms"] > b["p95_ms"] * (1 + tolerancia) + margen_ms:
+            regresiones.append(f"{nombre}: p95 {b['p95_ms']} -> {a['p95_ms']} ms")
+        if a["rps"] < b["rps"] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: throughput {b['rps']} -> {a['rps']} req/s")
+        if a["errores"] > b["errores"]:
+            regresiones.append(f"{nombre}: errores {b['errores']} -> {a['errores']}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API contra un backend local")
+    parser.add_argument("--backend", choices=("memoria", "sqlite"), default="memoria")
+    parser.add_argument("--latencia-ms", type=float, default=5.0, help="latencia simulada por consulta")
+    parser.add_argument("--usuarios", type=int, default=3000)
+    parser.add_argument("--citas", type=int, default=30000)
+    parser.add_argument("--medicos", type=int, default=200)
+    parser.add_argument("--sucursales", type=int, default=5)
+    parser.add_argument("--peticiones", type=int, default=200, help="peticiones por escenario")
+    parser.add_argument("--concurrencia", type=int, default=10)
+    parser.add_argument("--solo", default="", help="escenarios separados por coma")
+    parser.add_argument("--guardar", help="escribe los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON base contra el que se compara")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="empeoramiento relativo admitido")
+    parser.add_argument("--margen-ms", type=float, default=2.0, help="margen absoluto de p95 (ruido)")
+    parser.add_argument("--margen-llamadas", type=float, default=0.1, help="margen de llamadas/petición")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(medir(args))
+
+    if args.guardar:
+        os.makedirs(os.path.dirname(os.path.abspath(args.guardar)), exist_ok=True)
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        distintos = [k for k in ("backend", "latencia_ms", "usuarios", "citas", "medicos", "concurrencia")
+                     if base["meta"].get(k) != resultados["meta"][k]]
+        if distintos:
+            print("Aviso: la base se midió con otros parámetros:", ", ".join(distintos))
+        regresiones = comparar(base, resultados, args.tolerancia, args.margen_ms, args.margen_llamadas)
+        if regresiones:
+            print("Regresiones respecto a", args.comparar)
+            for r in regresiones:
+                print("  -", r)
+            sys.exit(1)
+        print("Sin regresiones respecto a", args.comparar)
+
+
+if __name__ == "__main__":
+    main()
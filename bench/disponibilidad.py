@@ -0,0 +1,147 @@
+# bench/disponibilidad.py
+# Micro-benchmark del motor de disponibilidad frente a la implementación anterior
+# (_get_disponibilidad_slots, copiada tal cual). Ejecutar desde la raíz:
+#
+#     python bench/disponibilidad.py
+#
+# La versión anterior crece con días × slots × citas; el motor indexado crece
+# linealmente con el número de citas.
+import os
+import random
+import sys
+import time as _time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from disponibilidad import DIAS_ES, calcular_disponibilidad  # noqa: E402
+
+
+# Implementación anterior (referencia)
+def disponibilidad_anterior(horarios: List[Dict[str, Any]], citas: List[Dict[str, Any]], 
+                              dias_a_ver: int, slot_duration_minutes: int) -> List[Dict[str, Any]]:
+
+    disponibilidad: List[Dict[str, Any]] = []
+    hoy = datetime.now().date()
+    
+
+    resultado_agrupado: Dict[str, Dict[str, List[str]]] = {} 
+
+    for dia_offset in range(dias_a_ver):
+        fecha_actual = hoy + timedelta(days=dia_offset)
+        fecha_str = fecha_actual.strftime("%Y-%m-%d")
+        dia_semana_str = DIAS_ES[fecha_actual.weekday()]
+
+
+        horarios_dia = [h for h in horarios if h["dia_semana"] == dia_semana_str]
+        
+        sucursales_con_horario = set(h["sucursal_id"] for h in horarios_dia)
+
+        for sucursal_id in sucursales_con_horario:
+            horas_disponibles: List[str] = []
+            
+            horarios_sucursal = [h for h in horarios_dia if str(h["sucursal_id"]) == str(sucursal_id)]
+
+            for h in horarios_sucursal:
+                try:
+
+                    hora_inicio = datetime.strptime(h["hora_inicio"], "%H:%M:%S")
+                    hora_fin = datetime.strptime(h["hora_fin"], "%H:%M:%S")
+                except ValueError:
+                    continue 
+
+                dt_actual = hora_inicio
+
+                while dt_actual < hora_fin:
+                    hora_str = dt_actual.strftime("%H:%M")
+
+                    if fecha_actual == hoy and dt_actual.time() < datetime.now().time():
+                        dt_actual += timedelta(minutes=slot_duration_minutes)
+                        continue
+
+
+                    ocupada = any(
+                        c["fecha"] == fecha_str and
+                        c["hora"] == hora_str and
+                        c["estado"] == "pendiente" and
+                        str(c["sucursal_id"]) == str(sucursal_id)
+                        for c in citas
+                    )
+
+                    if not ocupada:
+                        horas_disponibles.append(hora_str)
+                    
+                    dt_actual += timedelta(minutes=slot_duration_minutes)
+            
+            if horas_disponibles:
+
+                key = f"{fecha_str}-{sucursal_id}"
+                if key not in resultado_agrupado:
+                    resultado_agrupado[key] = {
+                        "fecha": fecha_str,
+                        "dia_semana": dia_semana_str,
+                        "sucursal_id": sucursal_id,
+                        "horas_disponibles": []
+                    }
+
+                resultado_agrupado[key]["horas_disponibles"].extend(horas_disponibles)
+    
+
+    for key, data in resultado_agrupado.items():
+        data["horas_disponibles"] = sorted(list(set(data["horas_disponibles"])))
+        disponibilidad.append(data)
+    
+    return disponibilidad
+
+
+def generar_datos(n_citas: int, n_sucursales: int = 3, semilla: int = 7):
+    rnd = random.Random(semilla)
+    sucursales = [f"suc-{i}" for i in range(n_sucursales)]
+    horarios = [
+        {"dia_semana": dia, "sucursal_id": suc, "hora_inicio": "08:00:00", "hora_fin": "17:00:00"}
+        for dia in DIAS_ES for suc in sucursales
+    ]
+    hoy = datetime.now().date()
+    citas = []
+    for _ in range(n_citas):
+        # Historial de varios años más las próximas dos semanas
+        fecha = hoy + timedelta(days=rnd.randint(-900, 13))
+        citas.append({
+            "fecha": fecha.strftime("%Y-%m-%d"),
+            "hora": f"{rnd.randint(8, 16):02d}:00",
+            "estado": rnd.choice(["pendiente", "completada", "cancelada"]),
+            "sucursal_id": rnd.choice(sucursales),
+        })
+    return horarios, citas
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = _time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (_time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def normalizar(resultado):
+    return sorted((d["fecha"], str(d["sucursal_id"]), tuple(d["horas_disponibles"])) for d in resultado)
+
+
+def main():
+    print(f"{'citas':>8} {'anterior (ms)':>14} {'indexado (ms)':>14} {'x':>7}")
+    for n in (100, 1_000, 5_000, 20_000):
+        horarios, citas = generar_datos(n)
+        ahora = datetime.now()
+
+        antes = disponibilidad_anterior(horarios, citas, 14, 60)
+        despues = calcular_disponibilidad(horarios, citas, 14, 60, ahora=ahora)
+        assert normalizar(antes) == normalizar(despues), "los resultados difieren"
+
+        repeticiones = 3 if n >= 5_000 else 10
+        t_antes = medir(lambda: disponibilidad_anterior(horarios, citas, 14, 60), repeticiones)
+        t_despues = medir(lambda: calcular_disponibilidad(horarios, citas, 14, 60, ahora=ahora), repeticiones * 10)
+        print(f"{n:>8} {t_antes:>14.2f} {t_despues:>14.3f} {t_antes / t_despues:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# bench/serializacion.py
+# Costo por fila de armar y serializar un listado grande de citas: el bucle
+# anterior de /citas/todas (strptime por fila, copiado tal cual) más el camino
+# por defecto de FastAPI (jsonable_encoder + JSONResponse), frente a la
+# proyección de campos.py (fechas memorizadas, generador) más RespuestaJSON
+# (orjson). Sin red ni backend: los nombres vienen en mapas ya resueltos.
+# Ejecutar desde la raíz:
+#
+#     python bench/serializacion.py
+#     python bench/serializacion.py --filas 50000 --repeticiones 5
+import argparse
+import json
+import os
+import random
+import sys
+import time as _time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATA_BACKEND", "memoria")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from disponibilidad import DIAS_ES  # noqa: E402
+from respuestas import RespuestaJSON, a_ndjson, orjson  # noqa: E402
+from routes.citas import _CAMPOS_HISTORIAL, _CAMPOS_TODAS  # noqa: E402
+
+
+# Implementación anterior (referencia)
+def enriquecer_anterior(citas: List[Dict[str, Any]], usuarios_map, sucursales_map) -> List[Dict[str, Any]]:
+    citas_enriquecidas = []
+    for c in citas:
+        fecha_dt = datetime.strptime(c["fecha"], "%Y-%m-%d").date()
+        dia_semana = DIAS_ES[fecha_dt.weekday()]
+
+        citas_enriquecidas.append({
+            "id": c["id"],
+            "paciente": usuarios_map.get(c["paciente_id"], "Desconocido"),
+            "medico": usuarios_map.get(c["medico_id"], "Desconocido"),
+            "sucursal": sucursales_map.get(c["sucursal_id"], "Desconocida"),
+            "fecha": c["fecha"],
+            "hora": c["hora"],
+            "fecha_formateada": f"{dia_semana} {fecha_dt.strftime('%d/%m/%Y')}",
+            "estado": c["estado"]
+        })
+    return citas_enriquecidas
+
+
+def historial_anterior(citas: List[Dict[str, Any]], usuarios_map, sucursales_map) -> List[Dict[str, Any]]:
+    citas_enriquecidas = []
+    for c in citas:
+        fecha_dt = datetime.strptime(c["fecha"], "%Y-%m-%d").date()
+
+        citas_enriquecidas.append({
+            "id": c["id"],
+            "fecha": c["fecha"],
+            "hora": c["hora"],
+            "estado": c["estado"],
+            "comentarios": c.get("comentarios", ""),
+            "fecha_formateada": fecha_dt.strftime("%d/%m/%Y"),
+            "dia": DIAS_ES[fecha_dt.weekday()],
+            "medico": usuarios_map.get(c["medico_id"], "Desconocido"),
+            "sucursal": sucursales_map.get(c["sucursal_id"], "Desconocido")
+        })
+    return citas_enriquecidas
+
+
+def generar_datos(n_citas: int, semilla: int = 7):
+    rnd = random.Random(semilla)
+    pacientes = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(2000)]
+    medicos = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(40)]
+    sucursales = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(5)]
+    usuarios = {u: f"Usuario {i}" for i, u in enumerate(pacientes + medicos)}
+    nombres_suc = {s: f"Sucursal {i}" for i, s in enumerate(sucursales)}
+    hoy = date.today()
+    citas = []
+    for _ in range(n_citas):
+        # Dos años de historial: ~730 fechas distintas
+        citas.append({
+            "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+            "paciente_id": rnd.choice(pacientes),
+            "medico_id": rnd.choice(medicos),
+            "sucursal_id": rnd.choice(sucursales),
+            "fecha": (hoy - timedelta(days=rnd.randint(0, 730))).isoformat(),
+            "hora": f"{rnd.randint(8, 16):02d}:00",
+            "estado": rnd.choice(["pendiente", "completada", "cancelada"]),
+            "comentarios": rnd.choice(["", "Control", "Primera consulta"]),
+        })
+    return citas, usuarios, nombres_suc
+
+
+def medir(funcion, repeticiones: int) -> float:
+    # Mejor tiempo en ms (menos ruido que el promedio)
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = _time.perf_counter()
+        funcion()
+        mejor = min(mejor, _time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo por fila de enriquecer y serializar listados de citas")
+    parser.add_argument("--filas", type=int, default=50_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    citas, usuarios, sucursales = generar_datos(args.filas)
+    n = len(citas)
+    print(f"{n} citas, orjson {'sí' if orjson is not None else 'no (json estándar)'}\n")
+
+    casos = (
+        ("/citas/todas", enriquecer_anterior, _CAMPOS_TODAS.seleccionar(None)),
+        ("/citas/historial", historial_anterior, _CAMPOS_HISTORIAL.seleccionar(None)),
+    )
+    print(f"{'listado':<18}{'etapa':<14}{'anterior µs/fila':>18}{'nuevo µs/fila':>15}{'x':>7}")
+    for nombre, anterior, seleccion in casos:
+        antes = anterior(citas, usuarios, sucursales)
+        despues = seleccion.armar(citas, usuarios, sucursales)
+        assert antes == despues, "los resultados difieren"
+        assert JSONResponse(jsonable_encoder(antes)).body == RespuestaJSON(despues).body, "el JSON difiere"
+
+        etapas = (
+            ("enriquecer",
+             lambda: anterior(citas, usuarios, sucursales),
+             lambda: seleccion.armar(citas, usuarios, sucursales)),
+            ("serializar",
+             lambda: JSONResponse(jsonable_encoder(antes)),
+             lambda: RespuestaJSON(despues)),
+            ("total",
+             lambda: JSONResponse(jsonable_encoder(anterior(citas, usuarios, sucursales))),
+             lambda: RespuestaJSON(seleccion.armar(citas, usuarios, sucursales))),
+        )
+        for etapa, viejo, nuevo in etapas:
+            t_viejo = medir(viejo, args.repeticiones)
+            t_nuevo = medir(nuevo, args.repeticiones)
+            print(f"{nombre:<18}{etapa:<14}{t_viejo * 1000 / n:>18.2f}{t_nuevo * 1000 / n:>15.2f}{t_viejo / t_nuevo:>7.1f}")
+
+    # NDJSON por páginas de 1000, como _citas_ndjson
+    seleccion = _CAMPOS_TODAS.seleccionar(None)
+
+    def ndjson_anterior():
+        for i in range(0, n, 1000):
+            filas = enriquecer_anterior(citas[i:i + 1000], usuarios, sucursales)
+            "".join(json.dumps(f, ensure_ascii=False, default=str) + "\n" for f in filas).encode("utf-8")
+
+    def ndjson_nuevo():
+        for i in range(0, n, 1000):
+            a_ndjson(seleccion.filas(citas[i:i + 1000], usuarios, sucursales))
+
+    t_viejo = medir(ndjson_anterior, args.repeticiones)
+    t_nuevo = medir(ndjson_nuevo, args.repeticiones)
+    print(f"{'/citas/todas':<18}{'ndjson':<14}{t_viejo * 1000 / n:>18.2f}{t_nuevo * 1000 / n:>15.2f}{t_viejo / t_nuevo:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
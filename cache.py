@@ -0,0 +1,100 @@
+# cache.py
+# Caché en memoria del proceso con expiración (TTL) y tamaño acotado (LRU).
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+_FALTA = object()
+
+
+class CacheTTL:
+    def __init__(self, nombre: str, ttl_segundos: float, max_entradas: int):
+        self.nombre = nombre
+        self.ttl = ttl_segundos
+        self.max_entradas = max_entradas
+        self._datos: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expiradas = 0
+        self.desalojadas = 0
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def get(self, clave: Hashable, defecto: Any = None) -> Any:
+        entrada = self._datos.get(clave, _FALTA)
+        if entrada is _FALTA:
+            self.misses += 1
+            return defecto
+
+        expira, valor = entrada
+        if expira < time.monotonic():
+            del self._datos[clave]
+            self.expiradas += 1
+            self.misses += 1
+            return defecto
+
+        self._datos.move_to_end(clave)
+        self.hits += 1
+        return valor
+
+    def get_many(self, claves: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], list]:
+        # Devuelve (encontrados, faltantes)
+        encontrados, faltantes = {}, []
+        for clave in claves:
+            valor = self.get(clave, _FALTA)
+            if valor is _FALTA:
+                faltantes.append(clave)
+            else:
+                encontrados[clave] = valor
+        return encontrados, faltantes
+
+    def set(self, clave: Hashable, valor: Any) -> None:
+        self._datos[clave] = (time.monotonic() + self.ttl, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+            self.desalojadas += 1
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        # Entradas vigentes, sin tocar el orden LRU ni las estadísticas
+        ahora = time.monotonic()
+        return [(clave, valor) for clave, (expira, valor) in self._datos.items() if expira >= ahora]
+
+    def invalidar(self, clave: Hashable = _FALTA) -> None:
+        if clave is _FALTA:
+            self._datos.clear()
+        else:
+            self._datos.pop(clave, None)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._datos),
+            "max_entradas": self.max_entradas,
+            "ttl_segundos": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expiradas": self.expiradas,
+            "desalojadas": self.desalojadas,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_registro: Dict[str, CacheTTL] = {}
+
+
+def crear_cache(nombre: str, ttl_segundos: float, max_entradas: int) -> CacheTTL:
+    cache = CacheTTL(nombre, ttl_segundos, max_entradas)
+    _registro[nombre] = cache
+    return cache
+
+
+def invalidar(nombre: str) -> None:
+    cache = _registro.get(nombre)
+    if cache is not None:
+        cache.invalidar()
+
+
+def estadisticas() -> Dict[str, Dict[str, Any]]:
+    return {nombre: cache.estadisticas() for nombre, cache in _registro.items()}
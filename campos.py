@@ -0,0 +1,130 @@
+# campos.py
+# Proyección de columnas para los listados de citas (`?fields=`). Cada campo de
+# la respuesta declara qué columnas de `citas` necesita y cómo se arma con la
+# fila y los nombres resueltos; cada endpoint define qué campos ofrece y cuáles
+# devuelve por defecto. La consulta pide solo las columnas de los campos
+# elegidos (nunca `*`) y los nombres de usuario/sucursal se resuelven solo si
+# algún campo los usa. Las filas se arman con un generador y las fechas se
+# formatean una sola vez por fecha distinta (`partes_fecha`).
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from datos import db
+from disponibilidad import DIAS_ES
+from nombres import fetch_name_maps, nombres_sucursales
+
+
+class CamposInvalidos(ValueError):
+    pass
+
+
+class Campo:
+    __slots__ = ("columnas", "extraer", "usuario", "sucursal")
+
+    def __init__(self, columnas: Tuple[str, ...], extraer: Callable[[Dict[str, Any], Dict[str, str], Dict[str, str]], Any],
+                 usuario: Optional[str] = None, sucursal: bool = False):
+        self.columnas = columnas
+        # extraer(fila, nombres de usuario, nombres de sucursal)
+        self.extraer = extraer
+        # Columna con el id de usuario cuyo nombre hay que resolver
+        self.usuario = usuario
+        self.sucursal = sucursal
+
+
+# 🧱 Campos de cita
+def columna(nombre: str, defecto: Any = None) -> Campo:
+    return Campo((nombre,), lambda c, u, s: c.get(nombre, defecto))
+
+
+@lru_cache(maxsize=4096)
+def partes_fecha(fecha: str) -> Tuple[str, str, str]:
+    # "2026-10-19" -> ("Lunes", "19/10/2026", "Lunes 19/10/2026"); en un listado
+    # se repiten pocas fechas, así que casi siempre sale de la tabla
+    dia = date.fromisoformat(fecha)
+    corta = f"{dia.day:02d}/{dia.month:02d}/{dia.year:04d}"
+    return DIAS_ES[dia.weekday()], corta, f"{DIAS_ES[dia.weekday()]} {corta}"
+
+
+def fecha_larga() -> Campo:
+    # "Lunes 19/10/2026"
+    return Campo(("fecha",), lambda c, u, s: partes_fecha(c["fecha"])[2])
+
+
+def fecha_corta() -> Campo:
+    # "19/10/2026"
+    return Campo(("fecha",), lambda c, u, s: partes_fecha(c["fecha"])[1])
+
+
+def dia_semana() -> Campo:
+    return Campo(("fecha",), lambda c, u, s: partes_fecha(c["fecha"])[0])
+
+
+def nombre_usuario(columna_id: str) -> Campo:
+    return Campo((columna_id,), lambda c, u, s: u.get(str(c[columna_id]), "Desconocido"), usuario=columna_id)
+
+
+def nombre_sucursal(defecto: str = "Desconocida") -> Campo:
+    return Campo(("sucursal_id",), lambda c, u, s: s.get(str(c["sucursal_id"]), defecto), sucursal=True)
+
+
+class Seleccion:
+    # Campos elegidos para una petición, con su `select()` ya armado
+    __slots__ = ("campos", "columnas", "usuarios", "sucursales")
+
+    def __init__(self, campos: List[Tuple[str, Campo]], siempre: Sequence[str]):
+        self.campos = campos
+        columnas = dict.fromkeys(siempre)
+        for _, campo in campos:
+            columnas.update(dict.fromkeys(campo.columnas))
+        self.columnas = ",".join(columnas)
+        self.usuarios = tuple(dict.fromkeys(campo.usuario for _, campo in campos if campo.usuario))
+        self.sucursales = any(campo.sucursal for _, campo in campos)
+
+    async def nombres(self, filas: List[Dict[str, Any]]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        if self.usuarios:
+            ids = {f[col] for f in filas for col in self.usuarios}
+            maps = await fetch_name_maps(db, ids)
+            return maps["usuarios"], maps["sucursales"]
+        if self.sucursales:
+            return {}, await nombres_sucursales(db)
+        return {}, {}
+
+    def filas(self, filas: List[Dict[str, Any]], usuarios: Dict[str, str], sucursales: Dict[str, str]) -> Iterator[Dict[str, Any]]:
+        extractores = [(nombre, campo.extraer) for nombre, campo in self.campos]
+        for f in filas:
+            yield {nombre: extraer(f, usuarios, sucursales) for nombre, extraer in extractores}
+
+    def armar(self, filas: List[Dict[str, Any]], usuarios: Dict[str, str], sucursales: Dict[str, str]) -> List[Dict[str, Any]]:
+        return list(self.filas(filas, usuarios, sucursales))
+
+    async def enriquecer(self, filas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        usuarios, sucursales = await self.nombres(filas)
+        return self.armar(filas, usuarios, sucursales)
+
+
+class Proyeccion:
+    def __init__(self, campos: Dict[str, Campo], por_defecto: Optional[Sequence[str]] = None, siempre: Sequence[str] = ()):
+        self.campos = campos
+        # Columnas que se piden aunque ningún campo las use (p. ej. las del cursor)
+        self.siempre = tuple(siempre)
+        self._defecto = self._seleccion(por_defecto or tuple(campos))
+
+    def _seleccion(self, nombres: Sequence[str]) -> Seleccion:
+        return Seleccion([(n, self.campos[n]) for n in dict.fromkeys(nombres)], self.siempre)
+
+    def seleccionar(self, fields: Optional[str]) -> Seleccion:
+        # `fields` tal como llega en la query: "id,fecha,medico"
+        if fields is None:
+            return self._defecto
+        nombres = [n.strip() for n in fields.split(",") if n.strip()]
+        desconocidos = [n for n in nombres if n not in self.campos]
+        if desconocidos or not nombres:
+            raise CamposInvalidos(
+                f"Campos desconocidos: {', '.join(desconocidos) or '(vacío)'}. "
+                f"Disponibles: {', '.join(self.campos)}"
+            )
+        return self._seleccion(nombres)
+
+    def descripcion(self) -> str:
+        return f"Campos separados por coma. Disponibles: {', '.join(self.campos)}"
@@ -0,0 +1,90 @@
+# condicional.py
+# GET condicional para datos de referencia (roles, sucursales, médicos,
+# pacientes). Cada recurso guarda en memoria su respuesta ya serializada junto
+# con un ETag (hash del contenido); una petición con `If-None-Match` que
+# coincide recibe 304 sin tocar el backend ni volver a enviar el cuerpo. Las
+# escrituras de la API invalidan el recurso (`invalidar`), y una carga que se
+# cruzó con una invalidación no queda guardada. Las cargas concurrentes se
+# comparten (ver vuelo.py).
+import hashlib
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+import vuelo
+from cache import crear_cache
+from respuestas import a_json
+
+# ⚙️ Configuración
+REFERENCIA_CACHE_TTL = float(os.getenv("REFERENCIA_CACHE_TTL", "60"))
+REFERENCIA_MAX_AGE = int(os.getenv("REFERENCIA_MAX_AGE", "60"))
+
+PUBLICO = f"public, max-age={REFERENCIA_MAX_AGE}"
+# Datos personales: el navegador puede guardarlos pero debe revalidar siempre
+PRIVADO = "private, no-cache"
+
+
+def calcular_etag(cuerpo: bytes) -> str:
+    return '"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"'
+
+
+def coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(e.strip().removeprefix("W/") == etag for e in if_none_match.split(","))
+
+
+class Recurso:
+    def __init__(self, nombre: str, ttl_segundos: float, cache_control: str):
+        self.nombre = nombre
+        self.cache_control = cache_control
+        self.version = 0
+        self._respuesta = crear_cache(f"{nombre}_respuesta", ttl_segundos, 1)
+
+    def invalidar(self) -> None:
+        self.version += 1
+        self._respuesta.invalidar()
+
+    async def _cargar(self, cargar: Callable[[], Awaitable[Any]]):
+        # (etag, cuerpo), o la respuesta de error de `cargar` tal cual
+        version = self.version
+        datos = await cargar()
+        if isinstance(datos, Response):
+            return datos
+        cuerpo = a_json(datos)
+        entrada = (calcular_etag(cuerpo), cuerpo)
+        if version == self.version:
+            self._respuesta.set("actual", entrada)
+        return entrada
+
+    async def responder(self, request: Request, cargar: Callable[[], Awaitable[Any]]) -> Response:
+        entrada: Optional[Tuple[str, bytes]] = self._respuesta.get("actual")
+        if entrada is None:
+            entrada = await vuelo.compartir(self.nombre, self.version, lambda: self._cargar(cargar))
+            if isinstance(entrada, Response):
+                return entrada
+
+        etag, cuerpo = entrada
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if coincide(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(cuerpo, media_type="application/json", headers=headers)
+
+
+_registro: Dict[str, Recurso] = {}
+
+
+def crear_recurso(nombre: str, ttl_segundos: float = REFERENCIA_CACHE_TTL, cache_control: str = PUBLICO) -> Recurso:
+    recurso = Recurso(nombre, ttl_segundos, cache_control)
+    _registro[nombre] = recurso
+    return recurso
+
+
+def invalidar(*nombres: str) -> None:
+    for nombre in nombres:
+        recurso = _registro.get(nombre)
+        if recurso is not None:
+            recurso.invalidar()
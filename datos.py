@@ -0,0 +1,47 @@
+# datos.py
+# Capa de acceso a datos asíncrona. El backend (Supabase, memoria o SQLite) se elige
+# con DATA_BACKEND; ver repositorio/. Los módulos importan `db` y `storage` de aquí.
+import asyncio
+
+from repositorio import crear_repositorio, crear_storage
+
+
+class _Perezoso:
+    # Construye el cliente en el primer uso y delega el resto de atributos
+    def __init__(self, fabrica):
+        self._fabrica = fabrica
+        self._cliente = None
+
+    def _obtener(self):
+        if self._cliente is None:
+            self._cliente = self._fabrica()
+        return self._cliente
+
+    def __getattr__(self, nombre):
+        return getattr(self._obtener(), nombre)
+
+    async def cerrar(self):
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+
+
+db = _Perezoso(crear_repositorio)
+storage = _Perezoso(crear_storage)
+
+
+def usar_repositorio(repositorio):
+    # Sustituye el backend en caliente (benchmarks, scripts); todos los módulos
+    # comparten el mismo proxy `db`
+    db._cliente = repositorio
+    return repositorio
+
+
+async def en_paralelo(*consultas, return_exceptions: bool = False):
+    # Ejecuta consultas independientes de forma concurrente
+    return await asyncio.gather(*(q.execute() for q in consultas), return_exceptions=return_exceptions)
+
+
+async def cerrar_conexiones():
+    await db.cerrar()
+    await storage.cerrar()
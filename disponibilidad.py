@@ -0,0 +1,205 @@
+# disponibilidad.py
+# Motor de disponibilidad: los horarios se indexan por día de la semana y sucursal
+# (en minutos del día) y las citas ocupadas se guardan por fecha en sets
+# (sucursal, minuto), de modo que cada slot se resuelve en O(1).
+import heapq
+import itertools
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Container, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+DIAS_ES = ["Lunes","Martes","Miércoles","Jueves","Viernes","Sábado","Domingo"]
+DURACION_SLOT_MINUTOS = int(os.getenv("DURACION_SLOT_MINUTOS", "60"))
+
+_INDICE_DIA = {nombre: i for i, nombre in enumerate(DIAS_ES)}
+
+Intervalo = Tuple[int, int, int]  # (inicio, fin, duración) en minutos
+
+
+def minutos(hora: Any) -> Optional[int]:
+    # "HH:MM" o "HH:MM:SS" -> minutos desde medianoche
+    try:
+        partes = str(hora).split(":")
+        h, m = int(partes[0]), int(partes[1])
+    except (ValueError, IndexError):
+        return None
+    if not (0 <= h < 24 and 0 <= m < 60):
+        return None
+    return h * 60 + m
+
+
+def formato_hora(minuto: int) -> str:
+    return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+
+def duracion_de(horario: Dict[str, Any], defecto: int) -> int:
+    # Cada fila de horario puede fijar su propia duración de slot
+    try:
+        duracion = int(horario.get("duracion_slot") or defecto)
+    except (TypeError, ValueError):
+        duracion = defecto
+    return duracion if duracion > 0 else defecto
+
+
+def indexar_horarios(horarios: Iterable[Dict[str, Any]],
+                     duracion: int = DURACION_SLOT_MINUTOS) -> Dict[int, Dict[Any, List[Intervalo]]]:
+    indice: Dict[int, Dict[Any, List[Intervalo]]] = defaultdict(lambda: defaultdict(list))
+    for h in horarios:
+        dia = _INDICE_DIA.get(h.get("dia_semana"))
+        inicio, fin = minutos(h.get("hora_inicio")), minutos(h.get("hora_fin"))
+        if dia is None or inicio is None or fin is None:
+            continue
+        indice[dia][h["sucursal_id"]].append((inicio, fin, duracion_de(h, duracion)))
+    return indice
+
+
+class HorarioMedico:
+    # Horario de un médico ya parseado: para cada día de la semana (0 = lunes),
+    # sucursal -> intervalos en minutos. Se construye una vez por médico y lo
+    # comparten la disponibilidad y la validación de reservas.
+    __slots__ = ("dias", "sucursales")
+
+    def __init__(self, horarios: Iterable[Dict[str, Any]], duracion: int = DURACION_SLOT_MINUTOS):
+        horarios = list(horarios)
+        indice = indexar_horarios(horarios, duracion)
+        self.dias: Tuple[Dict[Any, Tuple[Intervalo, ...]], ...] = tuple(
+            {sucursal_id: tuple(intervalos) for sucursal_id, intervalos in indice.get(dia, {}).items()}
+            for dia in range(7)
+        )
+        # Sucursales con alguna fila de horario, aunque la fila no sea válida
+        self.sucursales: FrozenSet[str] = frozenset(str(h["sucursal_id"]) for h in horarios)
+
+    def del_dia(self, fecha: date) -> Dict[Any, Tuple[Intervalo, ...]]:
+        return self.dias[fecha.weekday()]
+
+    def cubre(self, sucursal_id: Any, fecha: date, minuto: int) -> bool:
+        suc_str = str(sucursal_id)
+        return any(
+            inicio <= minuto < fin
+            for suc, intervalos in self.dias[fecha.weekday()].items() if str(suc) == suc_str
+            for inicio, fin, _ in intervalos
+        )
+
+
+def indexar_citas(citas: Iterable[Dict[str, Any]]) -> Dict[str, Set[Tuple[str, int]]]:
+    # fecha -> {(sucursal, minuto)} de las citas pendientes
+    ocupadas: Dict[str, Set[Tuple[str, int]]] = defaultdict(set)
+    for c in citas:
+        if c.get("estado") != "pendiente":
+            continue
+        minuto = minutos(c.get("hora"))
+        if minuto is not None:
+            ocupadas[c["fecha"]].add((str(c.get("sucursal_id")), minuto))
+    return ocupadas
+
+
+def _minuto_limite(ahora: datetime) -> int:
+    # Primer minuto reservable de hoy (los slots ya iniciados no cuentan)
+    return ahora.hour * 60 + ahora.minute + (1 if ahora.second or ahora.microsecond else 0)
+
+
+def libres_por_sucursal(intervalos: Dict[Any, Sequence[Intervalo]], ocupadas: Container[Tuple[str, int]],
+                        limite: int) -> Dict[Any, Set[int]]:
+    # Slots libres de un día: `intervalos` son los del día por sucursal y
+    # `ocupadas` contiene (sucursal, minuto) de las citas pendientes
+    libres_por_suc = {}
+    for sucursal_id, intervalos_suc in intervalos.items():
+        suc_str = str(sucursal_id)
+        libres = set()
+        for inicio, fin, duracion in intervalos_suc:
+            for minuto in range(inicio, fin, duracion):
+                if minuto >= limite and (suc_str, minuto) not in ocupadas:
+                    libres.add(minuto)
+        if libres:
+            libres_por_suc[sucursal_id] = libres
+    return libres_por_suc
+
+
+def _libres_del_dia(indice: Dict[int, Dict[Any, List[Intervalo]]], ocupadas: Dict[str, Set[Tuple[str, int]]],
+                    fecha_actual: date, limite: int) -> Dict[Any, Set[int]]:
+    return libres_por_sucursal(indice.get(fecha_actual.weekday(), {}),
+                               ocupadas.get(fecha_actual.isoformat(), ()), limite)
+
+
+def disponibilidad_por_dia(dias: Iterable[Tuple[date, Dict[Any, Sequence[Intervalo]], Container[Tuple[str, int]]]],
+                           ahora: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    # `dias` da (fecha, intervalos del día por sucursal, ocupadas) en orden
+    ahora = ahora or datetime.now()
+    hoy = ahora.date()
+
+    disponibilidad: List[Dict[str, Any]] = []
+    for fecha_actual, intervalos, ocupadas in dias:
+        if fecha_actual < hoy:
+            continue
+        limite = _minuto_limite(ahora) if fecha_actual == hoy else 0
+
+        for sucursal_id, libres in libres_por_sucursal(intervalos, ocupadas, limite).items():
+            disponibilidad.append({
+                "fecha": fecha_actual.isoformat(),
+                "dia_semana": DIAS_ES[fecha_actual.weekday()],
+                "sucursal_id": sucursal_id,
+                "horas_disponibles": [formato_hora(m) for m in sorted(libres)],
+            })
+
+    return disponibilidad
+
+
+def calcular_disponibilidad(horarios: List[Dict[str, Any]], citas: List[Dict[str, Any]],
+                            dias_a_ver: int, slot_duration_minutes: int = DURACION_SLOT_MINUTOS,
+                            desde: Optional[date] = None,
+                            ahora: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    ahora = ahora or datetime.now()
+    desde = desde or ahora.date()
+
+    indice = indexar_horarios(horarios, slot_duration_minutes)
+    ocupadas = indexar_citas(citas)
+
+    fechas = (desde + timedelta(days=n) for n in range(dias_a_ver))
+    return disponibilidad_por_dia(
+        ((f, indice.get(f.weekday(), {}), ocupadas.get(f.isoformat(), ())) for f in fechas),
+        ahora,
+    )
+
+
+def iterar_slots_libres(horarios: List[Dict[str, Any]], citas: List[Dict[str, Any]],
+                        desde: date, dias_a_ver: int,
+                        slot_duration_minutes: int = DURACION_SLOT_MINUTOS,
+                        ahora: Optional[datetime] = None) -> Iterator[Tuple[str, int, str]]:
+    # Genera (fecha, minuto, sucursal_id) libres en orden cronológico, de forma perezosa
+    ahora = ahora or datetime.now()
+    hoy = ahora.date()
+
+    indice = indexar_horarios(horarios, slot_duration_minutes)
+    ocupadas = indexar_citas(citas)
+
+    for dia_offset in range(dias_a_ver):
+        fecha_actual = desde + timedelta(days=dia_offset)
+        if fecha_actual < hoy:
+            continue
+        limite = _minuto_limite(ahora) if fecha_actual == hoy else 0
+
+        libres = _libres_del_dia(indice, ocupadas, fecha_actual, limite)
+        fecha_str = fecha_actual.isoformat()
+        for minuto, suc_str in sorted((m, str(suc)) for suc, minutos_libres in libres.items() for m in minutos_libres):
+            yield fecha_str, minuto, suc_str
+
+
+def _slots_de_medico(medico_id: str, slots: Iterator[Tuple[str, int, str]]) -> Iterator[Tuple[str, int, str, str]]:
+    for fecha, minuto, suc in slots:
+        yield fecha, minuto, suc, medico_id
+
+
+def primeros_slots(agendas: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+                   desde: date, dias_a_ver: int, limite: int,
+                   slot_duration_minutes: int = DURACION_SLOT_MINUTOS,
+                   ahora: Optional[datetime] = None) -> List[Tuple[str, int, str, str]]:
+    # Mezcla (heap) los slots libres de varios médicos y devuelve los `limite` más
+    # tempranos como (fecha, minuto, sucursal_id, medico_id)
+    ahora = ahora or datetime.now()
+    flujos = [
+        _slots_de_medico(medico_id, iterar_slots_libres(horarios, citas, desde, dias_a_ver,
+                                                        slot_duration_minutes, ahora))
+        for medico_id, (horarios, citas) in agendas.items()
+    ]
+    return list(itertools.islice(heapq.merge(*flujos), limite))
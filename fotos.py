@@ -0,0 +1,145 @@
+# fotos.py
+# Subida de fotos de perfil. Las peticiones cuyo Content-Length ya supera el
+# tope se rechazan antes de leer el formulario (`MiddlewareTopeFoto`); si no,
+# el archivo que dejó Starlette se lee por bloques con el mismo tope, el tipo
+# se detecta por la firma del primer bloque y el original se sube al bucket
+# `usuarios` sin copiarlo a otro temporal. Después de la respuesta, las
+# miniaturas se generan en un pool de procesos, se suben y sus URLs quedan en
+# `usuarios.foto_miniaturas` (sql/005_usuarios_miniaturas.sql).
+#
+# En Vercel el trabajo posterior a la respuesta puede cortarse cuando la
+# función se congela; en ese caso el usuario queda solo con `foto_url`.
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+import condicional
+import imagenes
+from datos import db, storage
+
+# ⚙️ Configuración
+FOTO_MAX_BYTES = int(os.getenv("FOTO_MAX_BYTES", str(5 * 1024 * 1024)))
+FOTO_BLOQUE_BYTES = 64 * 1024
+# Holgura para los demás campos del formulario y los separadores multipart
+FOTO_MARGEN_FORMULARIO = 64 * 1024
+MINIATURAS_TAMANOS = tuple(int(t) for t in os.getenv("MINIATURAS_TAMANOS", "64,128,256").split(",") if t.strip())
+MINIATURAS_WORKERS = int(os.getenv("MINIATURAS_WORKERS", "1"))
+
+BUCKET = "usuarios"
+RUTAS_CON_FOTO = ("/usuarios", "/usuarios/")
+NO_SOPORTADA = "Formato de imagen no soportado (JPEG, PNG, WEBP o GIF)"
+DEMASIADO_GRANDE = f"La foto supera el máximo de {round(FOTO_MAX_BYTES / (1024 * 1024), 1):g} MB"
+
+
+class FotoInvalida(Exception):
+    def __init__(self, mensaje: str, status_code: int):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status_code = status_code
+
+
+class MiddlewareTopeFoto:
+    # Middleware ASGI puro: con un Content-Length mayor que la foto más grande
+    # admitida responde 413 sin leer el cuerpo. Las subidas sin Content-Length
+    # (chunked) siguen limitadas por `guardar_foto`
+    def __init__(self, app):
+        self.app = app
+
+    def _excede(self, scope) -> bool:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in RUTAS_CON_FOTO:
+            return False
+        for clave, valor in scope["headers"]:
+            if clave == b"content-length":
+                try:
+                    return int(valor) > FOTO_MAX_BYTES + FOTO_MARGEN_FORMULARIO
+                except ValueError:
+                    return False
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if self._excede(scope):
+            await JSONResponse({"error": DEMASIADO_GRANDE}, status_code=413)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+async def _leer_foto(foto) -> Tuple[bytes, Tuple[str, str]]:
+    # Lee por bloques con el total acumulado: corta con 413 en cuanto pasa el
+    # tope (también sin Content-Length) y con 415 si el primer bloque no es imagen
+    bloques = []
+    total = 0
+    tipo = None
+    while bloque := await foto.read(FOTO_BLOQUE_BYTES):
+        if tipo is None:
+            tipo = imagenes.detectar_tipo(bloque[:imagenes.BYTES_FIRMA])
+            if tipo is None:
+                raise FotoInvalida(NO_SOPORTADA, 415)
+        total += len(bloque)
+        if total > FOTO_MAX_BYTES:
+            raise FotoInvalida(DEMASIADO_GRANDE, 413)
+        bloques.append(bloque)
+    if tipo is None:
+        raise FotoInvalida(NO_SOPORTADA, 415)
+    return b"".join(bloques), tipo
+
+
+async def guardar_foto(foto) -> Tuple[str, str, bytes]:
+    # Sube el original y devuelve (url pública, nombre en el bucket, contenido).
+    # El contenido (a lo sumo FOTO_MAX_BYTES) se pasa a `generar_miniaturas`
+    if foto.size is not None and foto.size > FOTO_MAX_BYTES:
+        raise FotoInvalida(DEMASIADO_GRANDE, 413)
+
+    contenido, (content_type, extension) = await _leer_foto(foto)
+    nombre = f"{uuid.uuid4()}.{extension}"
+    await storage.from_(BUCKET).upload(nombre, contenido, {"content-type": content_type})
+    url = await storage.from_(BUCKET).get_public_url(nombre)
+    return url, nombre, contenido
+
+
+# 🖼️ Miniaturas (después de la respuesta)
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _pool_miniaturas() -> ProcessPoolExecutor:
+    # spawn: el proceso hijo no hereda los hilos del servidor (bcrypt, event loop)
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MINIATURAS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def generar_miniaturas(usuario_id: str, nombre: str, contenido: bytes) -> Optional[Dict[str, str]]:
+    # Genera, sube y registra las miniaturas a partir del original ya subido
+    try:
+        if not MINIATURAS_TAMANOS or not imagenes.hay_pillow():
+            print("Miniaturas desactivadas (sin MINIATURAS_TAMANOS o sin Pillow)")
+            return None
+
+        miniaturas = await asyncio.get_running_loop().run_in_executor(
+            _pool_miniaturas(), imagenes.generar_miniaturas, contenido, MINIATURAS_TAMANOS
+        )
+        base = nombre.rsplit(".", 1)[0]
+        urls = {}
+        for lado, contenido in miniaturas:
+            destino = f"miniaturas/{base}_{lado}.jpg"
+            await storage.from_(BUCKET).upload(destino, contenido, {"content-type": "image/jpeg"})
+            urls[str(lado)] = await storage.from_(BUCKET).get_public_url(destino)
+
+        await db.table("usuarios").update({"foto_miniaturas": urls}).eq("id", usuario_id).execute()
+        condicional.invalidar("medicos", "pacientes")
+        return urls
+    except Exception as e:
+        print(f"Error al generar miniaturas de {usuario_id}: {e}")
+        return None
+
+
+def cerrar_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
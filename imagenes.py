@@ -0,0 +1,64 @@
+# imagenes.py
+# Detección del tipo real de una imagen por sus primeros bytes y generación de
+# miniaturas cuadradas. `generar_miniaturas` corre en un proceso aparte (ver
+# fotos.py), así que este módulo solo importa la biblioteca estándar; Pillow se
+# carga dentro del proceso de trabajo y es opcional.
+import importlib.util
+import io
+from typing import List, Optional, Sequence, Tuple
+
+# (prefijo, desplazamiento) -> (content-type, extensión)
+_FIRMAS = (
+    (b"\xff\xd8\xff", 0, "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", 0, "image/png", "png"),
+    (b"GIF87a", 0, "image/gif", "gif"),
+    (b"GIF89a", 0, "image/gif", "gif"),
+    (b"WEBP", 8, "image/webp", "webp"),
+)
+BYTES_FIRMA = 12
+
+# Tope de píxeles al decodificar (evita bombas de descompresión)
+MAX_PIXELES = 40_000_000
+
+
+def detectar_tipo(cabecera: bytes) -> Optional[Tuple[str, str]]:
+    # (content-type, extensión) según la firma, o None si no es un formato admitido
+    for firma, desde, tipo, extension in _FIRMAS:
+        if cabecera[desde:desde + len(firma)] == firma:
+            if tipo == "image/webp" and cabecera[:4] != b"RIFF":
+                continue
+            return tipo, extension
+    return None
+
+
+def hay_pillow() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+def generar_miniaturas(contenido: bytes, tamanos: Sequence[int], calidad: int = 85) -> List[Tuple[int, bytes]]:
+    # [(lado, JPEG)] recortadas al centro; se ejecuta en el pool de procesos
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELES
+    miniaturas = []
+    with Image.open(io.BytesIO(contenido)) as imagen:
+        # Pillow solo falla por encima del doble de MAX_IMAGE_PIXELS (entre 1x y
+        # 2x apenas avisa), así que el tope se verifica antes de decodificar
+        if imagen.width * imagen.height > MAX_PIXELES:
+            raise ValueError(f"Imagen demasiado grande ({imagen.width}x{imagen.height} px)")
+        # JPEG puede decodificar directamente a una escala menor
+        imagen.draft("RGB", (max(tamanos) * 2, max(tamanos) * 2))
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode in ("RGBA", "LA", "P"):
+            imagen = imagen.convert("RGBA")
+            fondo = Image.new("RGB", imagen.size, (255, 255, 255))
+            fondo.paste(imagen, mask=imagen.getchannel("A"))
+            imagen = fondo
+        elif imagen.mode != "RGB":
+            imagen = imagen.convert("RGB")
+
+        for lado in sorted(tamanos, reverse=True):
+            salida = io.BytesIO()
+            ImageOps.fit(imagen, (lado, lado), Image.LANCZOS).save(salida, "JPEG", quality=calidad, optimize=True)
+            miniaturas.append((lado, salida.getvalue()))
+    return miniaturas
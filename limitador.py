@@ -0,0 +1,117 @@
+# limitador.py
+# Limitación de intentos de login en memoria (ventana deslizante por IP y por email)
+# y caché negativa de emails inexistentes. Se evalúa antes de consultar Supabase
+# o ejecutar bcrypt, para que un ataque de fuerza bruta no consuma recursos.
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict
+
+from cache import crear_cache
+
+LOGIN_VENTANA_SEGUNDOS = float(os.getenv("LOGIN_VENTANA_SEGUNDOS", "60"))
+LOGIN_MAX_POR_IP = int(os.getenv("LOGIN_MAX_POR_IP", "20"))
+LOGIN_MAX_FALLOS_POR_EMAIL = int(os.getenv("LOGIN_MAX_FALLOS_POR_EMAIL", "5"))
+LOGIN_NEGATIVO_TTL = float(os.getenv("LOGIN_NEGATIVO_TTL", "60"))
+LIMITADOR_MAX_CLAVES = int(os.getenv("LIMITADOR_MAX_CLAVES", "10000"))
+# Solo detrás de un proxy que reescribe X-Forwarded-For (Vercel); si no, el
+# cliente puede inventar el header y saltarse el límite por IP
+LOGIN_CONFIAR_PROXY = os.getenv("LOGIN_CONFIAR_PROXY", "0") == "1"
+
+
+class VentanaDeslizante:
+    def __init__(self, limite: int, ventana_segundos: float, max_claves: int):
+        self.limite = limite
+        self.ventana = ventana_segundos
+        self.max_claves = max_claves
+        self._marcas: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def _vigentes(self, clave: str, ahora: float) -> Deque[float]:
+        marcas = self._marcas.get(clave)
+        if marcas is None:
+            return deque()
+        while marcas and marcas[0] <= ahora - self.ventana:
+            marcas.popleft()
+        if not marcas:
+            del self._marcas[clave]
+        return marcas
+
+    def espera(self, clave: str) -> float:
+        # Segundos hasta que `clave` vuelva a tener cupo (0 si hay cupo)
+        ahora = time.monotonic()
+        marcas = self._vigentes(clave, ahora)
+        if len(marcas) < self.limite:
+            return 0.0
+        return marcas[0] + self.ventana - ahora
+
+    def registrar(self, clave: str) -> None:
+        ahora = time.monotonic()
+        marcas = self._vigentes(clave, ahora)
+        if clave not in self._marcas:
+            self._marcas[clave] = marcas
+        marcas.append(ahora)
+        self._marcas.move_to_end(clave)
+        while len(self._marcas) > self.max_claves:
+            self._marcas.popitem(last=False)
+
+    def limpiar(self, clave: str) -> None:
+        self._marcas.pop(clave, None)
+
+    def __len__(self) -> int:
+        return len(self._marcas)
+
+
+class LimitadorLogin:
+    def __init__(self):
+        self.por_ip = VentanaDeslizante(LOGIN_MAX_POR_IP, LOGIN_VENTANA_SEGUNDOS, LIMITADOR_MAX_CLAVES)
+        self.fallos_por_email = VentanaDeslizante(LOGIN_MAX_FALLOS_POR_EMAIL, LOGIN_VENTANA_SEGUNDOS, LIMITADOR_MAX_CLAVES)
+        self.emails_desconocidos = crear_cache("login_emails_desconocidos", LOGIN_NEGATIVO_TTL, LIMITADOR_MAX_CLAVES)
+        self.permitidos = 0
+        self.rechazados_ip = 0
+        self.rechazados_email = 0
+        self.rechazados_desconocido = 0
+
+    def verificar(self, ip: str, email: str) -> float:
+        # Devuelve los segundos de espera si el intento debe rechazarse (0 si se permite)
+        espera = self.por_ip.espera(ip)
+        if espera:
+            self.rechazados_ip += 1
+            return espera
+        espera = self.fallos_por_email.espera(email)
+        if espera:
+            self.rechazados_email += 1
+            return espera
+        self.por_ip.registrar(ip)
+        self.permitidos += 1
+        return 0.0
+
+    def es_desconocido(self, email: str) -> bool:
+        if self.emails_desconocidos.get(email):
+            self.rechazados_desconocido += 1
+            return True
+        return False
+
+    def registrar_fallo(self, email: str, desconocido: bool = False) -> None:
+        self.fallos_por_email.registrar(email)
+        if desconocido:
+            self.emails_desconocidos.set(email, True)
+
+    def registrar_exito(self, email: str) -> None:
+        self.fallos_por_email.limpiar(email)
+
+    def olvidar_email(self, email: str) -> None:
+        # El email acaba de registrarse: ya no es desconocido
+        self.emails_desconocidos.invalidar(email)
+
+    def estadisticas(self) -> Dict[str, int]:
+        return {
+            "permitidos": self.permitidos,
+            "rechazados_ip": self.rechazados_ip,
+            "rechazados_email": self.rechazados_email,
+            "rechazados_desconocido": self.rechazados_desconocido,
+            "ips_rastreadas": len(self.por_ip),
+            "emails_rastreados": len(self.fallos_por_email),
+        }
+
+
+limitador_login = LimitadorLogin()
@@ -1,9 +1,41 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+import cache
+import fotos
+import metricas
+import perfilado
+import seguridad
+import vuelo
+from limitador import limitador_login
+from datos import cerrar_conexiones
+from respuestas import RespuestaJSON
 from routes import auth, usuarios, roles, sucursales, medicos, citas, pacientes
 
-app = FastAPI()
+# Arranque rápido (serverless): el cliente de datos, passlib/bcrypt y python-jose
+# se construyen en el primer uso. Sin él, un servidor de larga duración los
+# prepara al iniciar para que la primera petición no pague ese costo.
+ARRANQUE_RAPIDO = os.getenv("ARRANQUE_RAPIDO", "0") == "1"
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not ARRANQUE_RAPIDO:
+        seguridad.precalentar()
+        auth.precalentar()
+    yield
+    # Liberar el pool HTTP compartido hacia Supabase y el pool de miniaturas
+    await cerrar_conexiones()
+    fotos.cerrar_pool()
+
+
+# orjson para todas las respuestas (ver respuestas.py)
+app = FastAPI(lifespan=lifespan, default_response_class=RespuestaJSON)
+
+# Fotos demasiado grandes: 413 sin leer el cuerpo (ver fotos.py)
+app.add_middleware(fotos.MiddlewareTopeFoto)
 # CORS
 origins = ["http://localhost:5173"]
 app.add_middleware(
@@ -12,10 +44,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Siguiente-Cursor", "Link", "X-Perfil-Id", "ETag"],
 )
+# Perfilado opcional por petición (ver perfilado.py)
+app.add_middleware(perfilado.MiddlewarePerfil)
+# Métricas por ruta y header Server-Timing
+app.add_middleware(metricas.MiddlewareMetricas)
+
 @app.get("/")
 def read_root():
     return {"message": "Servidor desplegado"}
+
+@app.get("/estadisticas")
+def estadisticas():
+    return {
+        "cache": cache.estadisticas(),
+        "bcrypt": seguridad.pool_hash.estadisticas(),
+        "login": limitador_login.estadisticas(),
+        "single_flight": vuelo.estadisticas(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(metricas.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Registrar rutas
 app.include_router(auth.router)
 app.include_router(usuarios.router)
@@ -24,3 +76,7 @@ app.include_router(sucursales.router)
 app.include_router(medicos.router)
 app.include_router(citas.router)
 app.include_router(pacientes.router)
+# Sin PERFIL_SECRETO los perfiles no existen para la API: ni se importa el router
+if perfilado.PERFIL_SECRETO:
+    from routes import perfiles
+    app.include_router(perfiles.router)
@@ -0,0 +1,183 @@
+# metricas.py
+# Métricas por ruta en formato de texto de Prometheus (sin dependencias externas):
+# latencia de cada petición y, por petición, cuántas llamadas hace al backend de
+# datos, cuánto tardan, cuántos bytes traen y cuántas fallan. El middleware abre
+# una medición por petición (contextvar) y los backends la alimentan con
+# `registrar_upstream`; cada respuesta lleva además un header Server-Timing.
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SIN_RUTA = "sin_ruta"
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        _registro.append(self)
+
+    def inc(self, *valores_etiquetas: str, cantidad: float = 1) -> None:
+        self._valores[valores_etiquetas] = self._valores.get(valores_etiquetas, 0) + cantidad
+
+    def valor(self, *valores_etiquetas: str) -> float:
+        return self._valores.get(valores_etiquetas, 0)
+
+    def series(self) -> Dict[Tuple[str, ...], float]:
+        return dict(self._valores)
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        for clave, valor in sorted(self._valores.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str], limites: Sequence[float]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(sorted(limites))
+        # clave -> [conteos por bucket (+Inf al final), suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        _registro.append(self)
+
+    def observar(self, valor: float, *valores_etiquetas: str) -> None:
+        serie = self._series.get(valores_etiquetas)
+        if serie is None:
+            serie = self._series[valores_etiquetas] = [[0] * (len(self.limites) + 1), 0.0, 0]
+        serie[0][bisect_left(self.limites, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for clave, (conteos, suma, total) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.limites + (float("inf"),), conteos):
+                acumulado += conteo
+                le = "+Inf" if limite == float("inf") else _numero(limite)
+                lineas.append(
+                    f"{self.nombre}_bucket{_etiquetas(self.etiquetas + ('le',), clave + (le,))} {acumulado}"
+                )
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}")
+        return lineas
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...]) -> str:
+    if not nombres:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)) + "}"
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+_registro: List = []
+
+
+def exponer() -> str:
+    return "\n".join(linea for metrica in _registro for linea in metrica.exponer()) + "\n"
+
+
+# 📊 Métricas de la API
+peticiones = Contador("http_requests_total", "Peticiones atendidas", ("method", "route", "status"))
+latencia = Histograma(
+    "http_request_duration_seconds", "Latencia de las peticiones", ("method", "route"),
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+llamadas_por_peticion = Histograma(
+    "upstream_calls_per_request", "Llamadas al backend de datos por petición", ("method", "route"),
+    (0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+upstream_llamadas = Contador("upstream_calls_total", "Llamadas al backend de datos", ("method", "route"))
+upstream_segundos = Contador("upstream_seconds_total", "Tiempo acumulado en el backend de datos", ("method", "route"))
+upstream_bytes = Contador("upstream_bytes_total", "Bytes recibidos del backend de datos", ("method", "route"))
+upstream_errores = Contador("upstream_errors_total", "Llamadas al backend de datos con error", ("method", "route"))
+
+
+class Medicion:
+    __slots__ = ("llamadas", "segundos", "bytes", "errores")
+
+    def __init__(self):
+        self.llamadas = 0
+        self.segundos = 0.0
+        self.bytes = 0
+        self.errores = 0
+
+
+_medicion: ContextVar[Optional[Medicion]] = ContextVar("medicion", default=None)
+
+
+def medicion_actual() -> Optional[Medicion]:
+    return _medicion.get()
+
+
+def registrar_upstream(segundos: float, bytes_recibidos: int = 0, error: bool = False) -> None:
+    # La llaman los backends por cada viaje; fuera de una petición no hace nada
+    medicion = _medicion.get()
+    if medicion is None:
+        return
+    medicion.llamadas += 1
+    medicion.segundos += segundos
+    medicion.bytes += bytes_recibidos
+    medicion.errores += int(error)
+
+
+def server_timing(medicion: Medicion, total: float) -> str:
+    return (
+        f'upstream;dur={medicion.segundos * 1000:.1f};desc="{medicion.llamadas} llamadas", '
+        f"total;dur={total * 1000:.1f}"
+    )
+
+
+class MiddlewareMetricas:
+    # Middleware ASGI puro: no envuelve el cuerpo, solo agrega Server-Timing al
+    # iniciar la respuesta y registra las métricas al terminar (incluidas las
+    # tareas en segundo plano, que también consultan el backend)
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                encabezado = server_timing(medicion, time.perf_counter() - inicio)
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"server-timing", encabezado.encode())]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion.reset(token)
+            ruta = getattr(scope.get("route"), "path", SIN_RUTA)
+            metodo = scope["method"]
+            peticiones.inc(metodo, ruta, str(estado))
+            latencia.observar(time.perf_counter() - inicio, metodo, ruta)
+            llamadas_por_peticion.observar(medicion.llamadas, metodo, ruta)
+            if medicion.llamadas:
+                upstream_llamadas.inc(metodo, ruta, cantidad=medicion.llamadas)
+                upstream_segundos.inc(metodo, ruta, cantidad=medicion.segundos)
+                upstream_bytes.inc(metodo, ruta, cantidad=medicion.bytes)
+            if medicion.errores:
+                upstream_errores.inc(metodo, ruta, cantidad=medicion.errores)
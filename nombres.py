@@ -0,0 +1,88 @@
+# nombres.py
+# Resolución de nombres (usuarios y sucursales) con caché compartida en el proceso.
+# Los usuarios se resuelven por id bajo demanda; las sucursales se guardan completas.
+# Las cargas concurrentes idénticas se comparten (ver vuelo.py).
+import asyncio
+import os
+from typing import Dict, Iterable
+
+import vuelo
+from cache import crear_cache
+
+NOMBRES_CACHE_TTL = float(os.getenv("NOMBRES_CACHE_TTL", "300"))
+NOMBRES_CACHE_MAX = int(os.getenv("NOMBRES_CACHE_MAX", "10000"))
+# Tamaño de lote para las consultas `in` (evita URLs demasiado largas)
+LOTE_IN = 200
+
+_usuarios = crear_cache("usuarios_nombres", NOMBRES_CACHE_TTL, NOMBRES_CACHE_MAX)
+_sucursales = crear_cache("sucursales_nombres", NOMBRES_CACHE_TTL, 1)
+
+
+async def nombres_sucursales(db) -> Dict[str, str]:
+    cacheado = _sucursales.get("todas")
+    if cacheado is not None:
+        return cacheado
+    return await vuelo.compartir("sucursales_nombres", "todas", lambda: _cargar_sucursales(db))
+
+
+async def _cargar_sucursales(db) -> Dict[str, str]:
+    try:
+        res = await db.table("sucursales").select("id, nombre").execute()
+    except Exception as e:
+        print(f"Error al cargar sucursales: {e}")
+        return {}
+
+    mapa = {str(s["id"]): s["nombre"] for s in res.data}
+    _sucursales.set("todas", mapa)
+    return mapa
+
+
+async def nombres_usuarios(db, usuario_ids: Iterable[str]) -> Dict[str, str]:
+    ids = {str(i) for i in usuario_ids if i is not None}
+    mapa, faltantes = _usuarios.get_many(ids)
+    if not faltantes:
+        return mapa
+
+    faltantes.sort()
+    mapa.update(await vuelo.compartir("usuarios_nombres", tuple(faltantes), lambda: _cargar_usuarios(db, faltantes)))
+    return mapa
+
+
+async def _cargar_usuarios(db, faltantes) -> Dict[str, str]:
+    encontrados = {}
+    lotes = [faltantes[i:i + LOTE_IN] for i in range(0, len(faltantes), LOTE_IN)]
+    resultados = await asyncio.gather(
+        *(db.table("usuarios").select("id, nombre").in_("id", lote).execute() for lote in lotes),
+        return_exceptions=True,
+    )
+    for res in resultados:
+        if isinstance(res, Exception):
+            print(f"Error al cargar usuarios: {res}")
+            continue
+        for u in res.data:
+            encontrados[str(u["id"])] = u["nombre"]
+            _usuarios.set(str(u["id"]), u["nombre"])
+
+    return encontrados
+
+
+async def fetch_name_maps(db, usuario_ids: Iterable[str] = ()) -> Dict[str, Dict[str, str]]:
+    sucursales, usuarios = await asyncio.gather(
+        nombres_sucursales(db),
+        nombres_usuarios(db, usuario_ids),
+    )
+    return {"sucursales": sucursales, "usuarios": usuarios}
+
+
+# ✍️ Escritura directa: mantener la caché al día sin esperar al TTL
+def registrar_usuario(usuario: dict) -> None:
+    if usuario.get("id") is not None and usuario.get("nombre") is not None:
+        _usuarios.set(str(usuario["id"]), usuario["nombre"])
+
+
+def invalidar_usuario(usuario_id: str) -> None:
+    _usuarios.invalidar(str(usuario_id))
+
+
+def invalidar_sucursales() -> None:
+    _sucursales.invalidar()
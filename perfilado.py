@@ -0,0 +1,190 @@
+# perfilado.py
+# Perfilado por petición, opcional. Dos formas de activarlo:
+#
+# - A pedido: header `X-Perfil: <PERFIL_SECRETO>` (o `?_perfil=<secreto>`). Por
+#   defecto usa cProfile y guarda un reporte pstats; con `X-Perfil-Formato:
+#   colapsado` (o `?_perfil_formato=colapsado`) usa el muestreador.
+# - Continuo: con PERFIL_MUESTREO_N=N se muestrea 1 de cada N peticiones con el
+#   muestreador, que tiene un costo bajo.
+#
+# El muestreador es un hilo que cada PERFIL_INTERVALO_MS toma la pila del hilo
+# del event loop y acumula pilas colapsadas ("a;b;c 12"), el formato que leen
+# flamegraph.pl y speedscope. Ambos perfiladores observan el hilo del event loop
+# completo, así que pueden incluir trabajo de peticiones concurrentes; por eso
+# solo se perfila una petición a la vez.
+#
+# Los reportes se guardan en memoria (los últimos PERFIL_MAX_REPORTES) y, si se
+# define PERFIL_DIR, también en archivos. La respuesta perfilada lleva el header
+# `X-Perfil-Id`; el reporte se consulta en GET /admin/perfiles/{id}.
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+# ⚙️ Configuración
+PERFIL_SECRETO = os.getenv("PERFIL_SECRETO", "")
+PERFIL_MUESTREO_N = int(os.getenv("PERFIL_MUESTREO_N", "0"))
+PERFIL_INTERVALO_MS = float(os.getenv("PERFIL_INTERVALO_MS", "5"))
+PERFIL_MAX_REPORTES = int(os.getenv("PERFIL_MAX_REPORTES", "50"))
+PERFIL_DIR = os.getenv("PERFIL_DIR", "")
+
+FORMATOS = ("pstats", "colapsado")
+
+
+def secreto_valido(valor: Optional[str]) -> bool:
+    if not PERFIL_SECRETO or not valor:
+        return False
+    # En bytes: compare_digest rechaza str con caracteres no ASCII
+    try:
+        return hmac.compare_digest(valor.encode(), PERFIL_SECRETO.encode())
+    except (TypeError, UnicodeEncodeError):
+        return False
+
+
+class Muestreador:
+    def __init__(self, hilo_id: int, intervalo_segundos: float):
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo_segundos
+        self.pilas: Counter = Counter()
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, name="perfil-muestreador", daemon=True)
+
+    def iniciar(self) -> None:
+        self._hilo.start()
+
+    def _correr(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            pila = []
+            while frame is not None:
+                codigo = frame.f_code
+                pila.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                frame = frame.f_back
+            if pila:
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def detener(self) -> None:
+        self._parar.set()
+        self._hilo.join()
+
+    def reporte(self) -> str:
+        return "\n".join(f"{pila} {n}" for pila, n in self.pilas.most_common()) + "\n"
+
+
+class Determinista:
+    def __init__(self):
+        import cProfile
+
+        self._perfil = cProfile.Profile()
+
+    def iniciar(self) -> None:
+        self._perfil.enable()
+
+    def detener(self) -> None:
+        self._perfil.disable()
+
+    def reporte(self) -> str:
+        import io
+        import pstats
+
+        salida = io.StringIO()
+        pstats.Stats(self._perfil, stream=salida).sort_stats("cumulative").print_stats(60)
+        return salida.getvalue()
+
+
+# 🗂️ Reportes
+_reportes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_ocupado = False
+
+
+def _guardar(reporte: Dict[str, Any]) -> None:
+    _reportes[reporte["id"]] = reporte
+    while len(_reportes) > PERFIL_MAX_REPORTES:
+        _reportes.popitem(last=False)
+    if PERFIL_DIR:
+        extension = "txt" if reporte["formato"] == "pstats" else "folded"
+        try:
+            os.makedirs(PERFIL_DIR, exist_ok=True)
+            with open(os.path.join(PERFIL_DIR, f"{reporte['id']}.{extension}"), "w", encoding="utf-8") as f:
+                f.write(reporte["reporte"])
+        except OSError as e:
+            print(f"No se pudo escribir el perfil {reporte['id']}: {e}")
+
+
+def listar_reportes() -> List[Dict[str, Any]]:
+    return [{k: v for k, v in r.items() if k != "reporte"} for r in reversed(_reportes.values())]
+
+
+def obtener_reporte(reporte_id: str) -> Optional[Dict[str, Any]]:
+    return _reportes.get(reporte_id)
+
+
+class MiddlewarePerfil:
+    def __init__(self, app):
+        self.app = app
+        self._contador = itertools.count(1)
+
+    def _formato(self, scope) -> Optional[str]:
+        # Formato pedido para esta petición, o None si no se perfila
+        opciones = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]
+                    if k in (b"x-perfil", b"x-perfil-formato")}
+        if b"_perfil" in scope["query_string"]:
+            query = parse_qs(scope["query_string"].decode("latin-1"))
+            opciones.setdefault("x-perfil", query.get("_perfil", [""])[0])
+            opciones.setdefault("x-perfil-formato", query.get("_perfil_formato", [""])[0])
+        if secreto_valido(opciones.get("x-perfil")):
+            formato = opciones.get("x-perfil-formato")
+            return formato if formato in FORMATOS else "pstats"
+        if PERFIL_MUESTREO_N > 0 and next(self._contador) % PERFIL_MUESTREO_N == 0:
+            return "colapsado"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        global _ocupado
+        if scope["type"] != "http" or _ocupado or not (PERFIL_SECRETO or PERFIL_MUESTREO_N):
+            await self.app(scope, receive, send)
+            return
+        formato = self._formato(scope)
+        if formato is None:
+            await self.app(scope, receive, send)
+            return
+
+        _ocupado = True
+        reporte_id = uuid.uuid4().hex[:12]
+        if formato == "pstats":
+            perfilador = Determinista()
+        else:
+            perfilador = Muestreador(threading.get_ident(), PERFIL_INTERVALO_MS / 1000)
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"x-perfil-id", reporte_id.encode())]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        perfilador.iniciar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            perfilador.detener()
+            _ocupado = False
+            _guardar({
+                "id": reporte_id,
+                "metodo": scope["method"],
+                "ruta": getattr(scope.get("route"), "path", scope["path"]),
+                "estado": estado,
+                "formato": formato,
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                "fecha": datetime.utcnow().isoformat(),
+                "reporte": perfilador.reporte(),
+            })
@@ -0,0 +1,61 @@
+# repositorio/
+# Backends de datos intercambiables. Todos exponen la interfaz de PostgREST que usan
+# las rutas (table().select().eq()...execute(), rpc()), así que se eligen por entorno
+# sin tocar el código de la API:
+#
+#   DATA_BACKEND=supabase  (por defecto) PostgREST de Supabase
+#   DATA_BACKEND=memoria   tablas en memoria, para pruebas de carga y perfilado
+#   DATA_BACKEND=sqlite    archivo SQLite (SQLITE_RUTA), para desarrollo sin red
+import json
+import os
+
+from repositorio.base import Consulta, RepositorioLocal, Respuesta
+from repositorio.memoria import RepositorioMemoria
+from repositorio.sqlite import RepositorioSQLite
+
+# ⚙️ Configuración
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase").strip().lower()
+DATA_LATENCIA_MS = float(os.getenv("DATA_LATENCIA_MS", "0"))
+DATA_SEMILLA = os.getenv("DATA_SEMILLA", "")
+SQLITE_RUTA = os.getenv("SQLITE_RUTA", "clinica_local.db")
+
+BACKENDS = ("supabase", "memoria", "sqlite")
+
+
+def crear_repositorio(backend: str = None):
+    backend = (backend or DATA_BACKEND).strip().lower()
+    if backend == "supabase":
+        # Import diferido: postgrest/httpx solo se cargan con este backend
+        from repositorio.supabase import RepositorioSupabase
+        return RepositorioSupabase()
+
+    latencia = DATA_LATENCIA_MS / 1000
+    if backend == "memoria":
+        repo = RepositorioMemoria(latencia=latencia)
+    elif backend == "sqlite":
+        repo = RepositorioSQLite(SQLITE_RUTA, latencia=latencia)
+    else:
+        raise ValueError(f"DATA_BACKEND desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+
+    if DATA_SEMILLA:
+        with open(DATA_SEMILLA, encoding="utf-8") as f:
+            repo.cargar(json.load(f))
+    return repo
+
+
+def crear_storage():
+    # Storage (fotos de usuario) solo existe en Supabase
+    from repositorio.supabase import StorageSupabase
+    return StorageSupabase()
+
+
+__all__ = [
+    "BACKENDS",
+    "Consulta",
+    "RepositorioLocal",
+    "RepositorioMemoria",
+    "RepositorioSQLite",
+    "Respuesta",
+    "crear_repositorio",
+    "crear_storage",
+]
@@ -0,0 +1,219 @@
+# repositorio/base.py
+# Piezas comunes de los backends locales (memoria y SQLite): un constructor de
+# consultas con la misma forma que el de PostgREST (table().select().eq()...
+# .execute()) y la clase base que aplica la latencia simulada y atiende las RPC.
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+import metricas
+
+TABLAS = ("usuarios", "citas", "horarios", "sucursales", "roles")
+
+
+class Respuesta:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def columnas(seleccion: str) -> Optional[List[str]]:
+    # "id, nombre" -> ["id", "nombre"]; "*" -> None (todas)
+    cols = [c.strip() for c in seleccion.split(",") if c.strip()]
+    if not cols or "*" in cols:
+        return None
+    for c in cols:
+        if "(" in c or ":" in c:
+            raise APIError({"code": "PGRST100", "message": f"Relaciones embebidas no soportadas: {c}"})
+    return cols
+
+
+def _partes(texto: str) -> List[str]:
+    # Separa por comas de primer nivel: "a.eq.1,and(b.gt.2,c.lt.3)" -> 2 partes
+    partes, nivel, actual = [], 0, []
+    for caracter in texto:
+        if caracter == "(":
+            nivel += 1
+        elif caracter == ")":
+            nivel -= 1
+        if caracter == "," and nivel == 0:
+            partes.append("".join(actual))
+            actual = []
+        else:
+            actual.append(caracter)
+    partes.append("".join(actual))
+    return partes
+
+
+def _nodo(texto: str):
+    texto = texto.strip()
+    for conector in ("and", "or"):
+        if texto.startswith(conector + "(") and texto.endswith(")"):
+            return (conector, [_nodo(p) for p in _partes(texto[len(conector) + 1:-1])])
+    try:
+        columna, op, valor = texto.split(".", 2)
+    except ValueError:
+        raise APIError({"code": "PGRST100", "message": f"Filtro inválido: {texto}"})
+    if op not in ("eq", "neq", "gt", "gte", "lt", "lte"):
+        raise APIError({"code": "PGRST100", "message": f"Operador no soportado: {op}"})
+    return (op, columna, valor)
+
+
+def logica(texto: str):
+    # Árbol de un filtro or=(...) de PostgREST: ("or", [nodos]), con nodos
+    # ("and"|"or", [nodos]) u (op, columna, valor)
+    return ("or", [_nodo(p) for p in _partes(texto)])
+
+
+class Consulta:
+    def __init__(self, repositorio: "RepositorioLocal", tabla: str):
+        if tabla not in TABLAS:
+            raise APIError({"code": "42P01", "message": f'relation "public.{tabla}" does not exist'})
+        self._repositorio = repositorio
+        self.tabla = tabla
+        self.operacion = "select"
+        self.columnas: Optional[List[str]] = None
+        self.valores: Any = None
+        self.filtros: List[Tuple[str, str, Any]] = []
+        self.orden: List[Tuple[str, bool]] = []
+        self.limite: Optional[int] = None
+        self.desplazamiento = 0
+        self.contar = False
+
+    # Operaciones
+    def select(self, *cols: str, count: Optional[str] = None):
+        self.operacion = "select"
+        self.columnas = columnas(",".join(cols) or "*")
+        self.contar = count is not None
+        return self
+
+    def insert(self, valores):
+        self.operacion = "insert"
+        self.valores = valores
+        return self
+
+    def update(self, valores: Dict[str, Any]):
+        self.operacion = "update"
+        self.valores = valores
+        return self
+
+    def delete(self):
+        self.operacion = "delete"
+        return self
+
+    # Filtros
+    def _filtro(self, op: str, columna: str, valor: Any):
+        self.filtros.append((op, columna, valor))
+        return self
+
+    def eq(self, columna, valor):
+        return self._filtro("eq", columna, valor)
+
+    def neq(self, columna, valor):
+        return self._filtro("neq", columna, valor)
+
+    def gt(self, columna, valor):
+        return self._filtro("gt", columna, valor)
+
+    def gte(self, columna, valor):
+        return self._filtro("gte", columna, valor)
+
+    def lt(self, columna, valor):
+        return self._filtro("lt", columna, valor)
+
+    def lte(self, columna, valor):
+        return self._filtro("lte", columna, valor)
+
+    def in_(self, columna, valores):
+        return self._filtro("in", columna, [v for v in valores])
+
+    def or_(self, filtros: str, **_):
+        return self._filtro("or", None, logica(filtros))
+
+    # Modificadores
+    def order(self, columna: str, desc: bool = False, **_):
+        self.orden.append((columna, desc))
+        return self
+
+    def limit(self, cantidad: int, **_):
+        self.limite = cantidad
+        return self
+
+    def range(self, inicio: int, fin: int, **_):
+        self.desplazamiento = inicio
+        self.limite = fin - inicio + 1
+        return self
+
+    async def execute(self) -> Respuesta:
+        return await self._repositorio._ejecutar_async(self)
+
+
+class _RPC:
+    def __init__(self, repositorio: "RepositorioLocal", funcion: str, params: Dict[str, Any]):
+        self._repositorio = repositorio
+        self.funcion = funcion
+        self.params = params
+
+    async def execute(self) -> Respuesta:
+        return await self._repositorio._rpc_async(self.funcion, self.params)
+
+
+class RepositorioLocal:
+    # Subclases: implementan `ejecutar(consulta)` síncrono y `transaccion()`
+    def __init__(self, latencia: float = 0.0, funciones: bool = True):
+        self.latencia = latencia
+        self.funciones = funciones
+        self.llamadas = 0
+
+    def table(self, tabla: str) -> Consulta:
+        return Consulta(self, tabla)
+
+    from_ = table
+
+    def rpc(self, funcion: str, params: Dict[str, Any], **_) -> _RPC:
+        return _RPC(self, funcion, params)
+
+    @asynccontextmanager
+    async def _viaje(self):
+        # Un viaje simulado al backend: latencia, conteo y métricas (sin bytes: no hay red)
+        self.llamadas += 1
+        inicio = time.perf_counter()
+        error = False
+        try:
+            if self.latencia:
+                await asyncio.sleep(self.latencia)
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            metricas.registrar_upstream(time.perf_counter() - inicio, error=error)
+
+    async def _ejecutar_async(self, consulta: Consulta) -> Respuesta:
+        async with self._viaje():
+            return self.ejecutar(consulta)
+
+    async def _rpc_async(self, funcion: str, params: Dict[str, Any]) -> Respuesta:
+        from repositorio import funciones
+
+        async with self._viaje():
+            implementacion = getattr(funciones, funcion, None) if self.funciones else None
+            if implementacion is None:
+                raise APIError({"code": "PGRST202", "message": f"Could not find the function public.{funcion}"})
+            with self.transaccion():
+                return Respuesta(implementacion(self, **params))
+
+    def ejecutar(self, consulta: Consulta) -> Respuesta:
+        raise NotImplementedError
+
+    def transaccion(self):
+        raise NotImplementedError
+
+    def cargar(self, tablas: Dict[str, List[Dict[str, Any]]]) -> None:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
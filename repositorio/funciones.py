@@ -0,0 +1,97 @@
+# repositorio/funciones.py
+# Equivalentes locales de las funciones SQL de sql/ (reservar_cita, reagendar_cita,
+# resumen_citas) para los backends en memoria y SQLite. Se ejecutan dentro de la transacción del
+# backend, con los mismos errores que devuelve PostgREST.
+from datetime import datetime
+from typing import Any, Dict
+
+from postgrest.exceptions import APIError
+
+from disponibilidad import DIAS_ES, minutos
+from resumen import Acumulador, slots_agendados
+
+
+def _error(mensaje: str) -> APIError:
+    return APIError({"code": "P0001", "message": mensaje})
+
+
+def _en_horario(repo, medico_id, sucursal_id, fecha, hora) -> bool:
+    dia = DIAS_ES[datetime.strptime(str(fecha), "%Y-%m-%d").weekday()]
+    minuto = minutos(hora)
+    horarios = repo.ejecutar(
+        repo.table("horarios").select("hora_inicio,hora_fin")
+            .eq("medico_id", medico_id).eq("sucursal_id", sucursal_id).eq("dia_semana", dia)
+    ).data
+    for h in horarios:
+        inicio, fin = minutos(h["hora_inicio"]), minutos(h["hora_fin"])
+        if inicio is not None and fin is not None and inicio <= minuto < fin:
+            return True
+    return False
+
+
+def _insertar(repo, fila: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return repo.ejecutar(repo.table("citas").insert(fila)).data[0]
+    except APIError as e:
+        if str(e.code) == "23505":
+            raise _error("no_disponible")
+        raise
+
+
+def reservar_cita(repo, p_paciente_id, p_medico_id, p_sucursal_id, p_fecha, p_hora,
+                  p_estado="pendiente", p_comentarios="") -> Dict[str, Any]:
+    existe = repo.ejecutar(
+        repo.table("horarios").select("id").eq("medico_id", p_medico_id).eq("sucursal_id", p_sucursal_id).limit(1)
+    ).data
+    if not existe:
+        raise _error("sin_horario")
+    if not _en_horario(repo, p_medico_id, p_sucursal_id, p_fecha, p_hora):
+        raise _error("no_disponible")
+
+    return _insertar(repo, {
+        "paciente_id": p_paciente_id,
+        "medico_id": p_medico_id,
+        "sucursal_id": p_sucursal_id,
+        "fecha": p_fecha,
+        "hora": p_hora,
+        "estado": p_estado,
+        "comentarios": p_comentarios,
+    })
+
+
+def reagendar_cita(repo, p_cita_id, p_fecha, p_hora, p_sucursal_id, p_medico_id=None) -> Dict[str, Any]:
+    originales = repo.ejecutar(repo.table("citas").select("*").eq("id", p_cita_id)).data
+    if not originales:
+        raise _error("no_encontrada")
+    original = originales[0]
+    medico_id = p_medico_id or original["medico_id"]
+
+    if not _en_horario(repo, medico_id, p_sucursal_id, p_fecha, p_hora):
+        raise _error("no_disponible")
+
+    if original["estado"] == "pendiente":
+        repo.ejecutar(repo.table("citas").update({"estado": "cancelada"}).eq("id", p_cita_id))
+
+    return _insertar(repo, {
+        "paciente_id": original["paciente_id"],
+        "medico_id": medico_id,
+        "sucursal_id": p_sucursal_id,
+        "fecha": p_fecha,
+        "hora": p_hora,
+        "estado": "pendiente",
+        "comentarios": "Reagendada desde cita anterior",
+    })
+
+
+def resumen_citas(repo, p_desde, p_hasta, p_duracion=60) -> Dict[str, Any]:
+    desde = datetime.strptime(str(p_desde), "%Y-%m-%d").date()
+    hasta = datetime.strptime(str(p_hasta), "%Y-%m-%d").date()
+    acumulador = Acumulador()
+    acumulador.agregar(repo.ejecutar(
+        repo.table("citas").select("estado,medico_id,sucursal_id,fecha")
+            .gte("fecha", desde.isoformat()).lte("fecha", hasta.isoformat())
+    ).data)
+    horarios = repo.ejecutar(
+        repo.table("horarios").select("dia_semana,sucursal_id,hora_inicio,hora_fin,duracion_slot")
+    ).data
+    return acumulador.resultado(slots_agendados(horarios, desde, hasta, int(p_duracion)))
@@ -0,0 +1,270 @@
+# repositorio/memoria.py
+# Backend en memoria: listas de dicts por tabla. Pensado para pruebas de carga y
+# perfilado sin red; reproduce los filtros, el orden, el índice único de slots
+# pendientes y las funciones RPC del esquema real. Los filtros de igualdad sobre
+# columnas de clave usan índices hash perezosos, como lo haría Postgres.
+import uuid
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+from repositorio.base import TABLAS, Consulta, RepositorioLocal, Respuesta
+
+_COMPARADORES: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a is not None and str(a) == str(b),
+    "neq": lambda a, b: a is not None and str(a) != str(b),
+    "gt": lambda a, b: a is not None and str(a) > str(b),
+    "gte": lambda a, b: a is not None and str(a) >= str(b),
+    "lt": lambda a, b: a is not None and str(a) < str(b),
+    "lte": lambda a, b: a is not None and str(a) <= str(b),
+    "in": lambda a, b: a is not None and str(a) in {str(v) for v in b},
+}
+
+INDEXABLES = {"id", "email", "rol_id", "medico_id", "paciente_id", "sucursal_id"}
+
+
+def _cumple(fila: Dict[str, Any], nodo) -> bool:
+    if nodo[0] == "and":
+        return all(_cumple(fila, n) for n in nodo[1])
+    if nodo[0] == "or":
+        return any(_cumple(fila, n) for n in nodo[1])
+    op, columna, valor = nodo
+    return _COMPARADORES[op](fila.get(columna), valor)
+
+
+def _predicado(filtros) -> Callable[[Dict[str, Any]], bool]:
+    condiciones = []
+    for op, columna, valor in filtros:
+        if op == "or":
+            condiciones.append(lambda f, nodo=valor: _cumple(f, nodo))
+        elif op == "in":
+            valores = {str(v) for v in valor}
+            condiciones.append(lambda f, c=columna, vs=valores: f.get(c) is not None and str(f.get(c)) in vs)
+        else:
+            condiciones.append(lambda f, c=columna, v=valor, comparar=_COMPARADORES[op]: comparar(f.get(c), v))
+    return lambda f: all(condicion(f) for condicion in condiciones)
+
+
+def _clave_orden(columna: str):
+    # NULL al final en orden ascendente y al principio en descendente, como Postgres
+    return lambda f: (f.get(columna) is None, str(f.get(columna) or ""))
+
+
+def _clave_compuesta(columnas: List[str]):
+    return lambda f: tuple((f.get(c) is None, str(f.get(c) or "")) for c in columnas)
+
+
+def _cota_keyset(orden, nodo) -> Optional[tuple]:
+    # Reconoce el filtro de paginación por cursor (c1, c2, ...) > (v1, v2, ...),
+    # escrito como or=(c1.gt.v1,and(c1.eq.v1,c2.gt.v2),...), y devuelve (v1, v2, ...)
+    columnas = [c for c, _ in orden]
+    if nodo[0] != "or" or len(nodo[1]) != len(columnas):
+        return None
+    valores = []
+    for i, rama in enumerate(nodo[1]):
+        condiciones = [rama] if i == 0 else (rama[1] if rama[0] == "and" else [])
+        if len(condiciones) != i + 1:
+            return None
+        for k, (op, columna, valor) in enumerate(condiciones):
+            if columna != columnas[k] or op != ("gt" if k == i else "eq") or (k < i and valor != valores[k]):
+                return None
+        valores.append(condiciones[i][2])
+    return tuple(valores)
+
+
+def _clave_slot(fila: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    return (str(fila.get("medico_id")), str(fila.get("sucursal_id")), str(fila.get("fecha")), str(fila.get("hora")))
+
+
+class RepositorioMemoria(RepositorioLocal):
+    def __init__(self, tablas: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 latencia: float = 0.0, funciones: bool = True):
+        super().__init__(latencia=latencia, funciones=funciones)
+        self.tablas: Dict[str, List[Dict[str, Any]]] = {t: [] for t in TABLAS}
+        self._indices: Dict[Tuple[str, str], Dict[str, List[Dict[str, Any]]]] = {}
+        self._versiones: Counter = Counter()
+        self._orden_cache: Dict[Tuple[str, tuple], Tuple[int, List[Dict[str, Any]]]] = {}
+        self._pendientes: Counter = Counter()
+        self._deshacer: Optional[List[Callable[[], None]]] = None
+        if tablas:
+            self.cargar(tablas)
+
+    def cargar(self, tablas: Dict[str, List[Dict[str, Any]]]) -> None:
+        for tabla, filas in tablas.items():
+            self.tablas[tabla].extend(dict(f, id=f.get("id") or str(uuid.uuid4())) for f in filas)
+        self._reindexar()
+
+    # Índices
+    def _reindexar(self) -> None:
+        self._indices.clear()
+        self._orden_cache.clear()
+        self._pendientes = Counter(_clave_slot(f) for f in self.tablas["citas"] if f.get("estado") == "pendiente")
+
+    def _indice(self, tabla: str, columna: str) -> Dict[str, List[Dict[str, Any]]]:
+        indice = self._indices.get((tabla, columna))
+        if indice is None:
+            indice = defaultdict(list)
+            for f in self.tablas[tabla]:
+                indice[str(f.get(columna))].append(f)
+            self._indices[(tabla, columna)] = indice
+        return indice
+
+    def _invalidar_indices(self, tabla: str, columnas=None) -> None:
+        for clave in [k for k in self._indices if k[0] == tabla and (columnas is None or k[1] in columnas)]:
+            del self._indices[clave]
+
+    # Transacciones (para las RPC): registro de deshacer
+    @contextmanager
+    def transaccion(self):
+        self._deshacer = []
+        try:
+            yield
+        except Exception:
+            for accion in reversed(self._deshacer):
+                accion()
+            self._reindexar()
+            raise
+        finally:
+            self._deshacer = None
+
+    def _registrar_deshacer(self, accion: Callable[[], None]) -> None:
+        if self._deshacer is not None:
+            self._deshacer.append(accion)
+
+    def _filtrar(self, consulta: Consulta) -> List[Dict[str, Any]]:
+        filas = None
+        filtros = list(consulta.filtros)
+        for i, (op, columna, valor) in enumerate(filtros):
+            if op in ("eq", "in") and columna in INDEXABLES:
+                indice = self._indice(consulta.tabla, columna)
+                if op == "eq":
+                    filas = list(indice.get(str(valor), ()))
+                else:
+                    filas = [f for v in dict.fromkeys(str(v) for v in valor) for f in indice.get(v, ())]
+                del filtros[i]
+                break
+        if filas is None:
+            filas = self.tablas[consulta.tabla]
+        if not filtros:
+            return list(filas)
+        cumple = _predicado(filtros)
+        return [f for f in filas if cumple(f)]
+
+    def _usa_indice(self, consulta: Consulta) -> bool:
+        return any(op in ("eq", "in") and columna in INDEXABLES for op, columna, _ in consulta.filtros)
+
+    def _ordenadas(self, tabla: str, orden: Tuple[Tuple[str, bool], ...]):
+        # Orden de la tabla completa (y sus claves si es todo ascendente), cacheado
+        # hasta la siguiente escritura: hace el papel de un índice de ORDER BY
+        version = self._versiones[tabla]
+        guardada = self._orden_cache.get((tabla, orden))
+        if guardada is not None and guardada[0] == version:
+            return guardada[1], guardada[2]
+        claves = None
+        if not any(desc for _, desc in orden):
+            clave = _clave_compuesta([c for c, _ in orden])
+            filas = sorted(self.tablas[tabla], key=clave)
+            claves = [clave(f) for f in filas]
+        else:
+            filas = self.tablas[tabla]
+            for columna, desc in reversed(orden):
+                filas = sorted(filas, key=_clave_orden(columna), reverse=desc)
+        self._orden_cache[(tabla, orden)] = (version, filas, claves)
+        return filas, claves
+
+    def _verificar_unicidad(self, filas: List[Dict[str, Any]], liberadas: Counter = None) -> None:
+        # Índice único parcial: un solo registro pendiente por slot
+        liberadas = liberadas or Counter()
+        nuevas = Counter()
+        for fila in filas:
+            if fila.get("estado") != "pendiente":
+                continue
+            clave = _clave_slot(fila)
+            if self._pendientes[clave] - liberadas[clave] > 0 or nuevas[clave]:
+                raise APIError({"code": "23505", "message": "duplicate key value violates unique constraint \"citas_slot_pendiente_unico\""})
+            nuevas[clave] += 1
+
+    def _contar_pendientes(self, filas: List[Dict[str, Any]]) -> Counter:
+        return Counter(_clave_slot(f) for f in filas if f.get("estado") == "pendiente")
+
+    def ejecutar(self, consulta: Consulta) -> Respuesta:
+        tabla = self.tablas[consulta.tabla]
+        es_citas = consulta.tabla == "citas"
+        if consulta.operacion != "select":
+            self._versiones[consulta.tabla] += 1
+
+        if consulta.operacion == "insert":
+            nuevas = consulta.valores if isinstance(consulta.valores, list) else [consulta.valores]
+            nuevas = [dict(f, id=f.get("id") or str(uuid.uuid4())) for f in nuevas]
+            if es_citas:
+                self._verificar_unicidad(nuevas)
+                self._pendientes.update(self._contar_pendientes(nuevas))
+            tabla.extend(nuevas)
+            for (t, columna), indice in self._indices.items():
+                if t == consulta.tabla:
+                    for f in nuevas:
+                        indice[str(f.get(columna))].append(f)
+            self._registrar_deshacer(lambda: [tabla.remove(f) for f in nuevas])
+            return Respuesta([dict(f) for f in nuevas])
+
+        if consulta.operacion == "select":
+            return self._seleccionar(consulta)
+
+        filas = self._filtrar(consulta)
+
+        if consulta.operacion == "update":
+            anteriores = [(f, dict(f)) for f in filas]
+            if es_citas:
+                antes = self._contar_pendientes(filas)
+                despues = [dict(f, **consulta.valores) for f in filas]
+                self._verificar_unicidad(despues, liberadas=antes)
+                self._pendientes.subtract(antes)
+                self._pendientes.update(self._contar_pendientes(despues))
+            for f in filas:
+                f.update(consulta.valores)
+            self._invalidar_indices(consulta.tabla, set(consulta.valores))
+            self._registrar_deshacer(lambda: [f.clear() or f.update(copia) for f, copia in anteriores])
+            return Respuesta([dict(f) for f in filas])
+
+        if consulta.operacion == "delete":
+            borradas = {id(f) for f in filas}
+            self.tablas[consulta.tabla] = [f for f in tabla if id(f) not in borradas]
+            if es_citas:
+                self._pendientes.subtract(self._contar_pendientes(filas))
+            self._invalidar_indices(consulta.tabla)
+            self._registrar_deshacer(lambda: self.tablas[consulta.tabla].extend(filas))
+            return Respuesta([dict(f) for f in filas])
+
+    def _seleccionar(self, consulta: Consulta) -> Respuesta:
+        fin = None if consulta.limite is None else consulta.desplazamiento + consulta.limite
+        if consulta.orden and not self._usa_indice(consulta):
+            # Recorre el orden cacheado y corta al completar la página; un filtro
+            # de cursor sobre las columnas del orden se resuelve con bisección
+            ordenadas, claves = self._ordenadas(consulta.tabla, tuple(consulta.orden))
+            inicio = 0
+            for op, _, valor in consulta.filtros:
+                cota = _cota_keyset(consulta.orden, valor) if op == "or" and claves is not None else None
+                if cota is not None:
+                    inicio = bisect_right(claves, tuple((False, str(v)) for v in cota))
+                    break
+            cumple = _predicado(consulta.filtros)
+            coinciden = (f for f in islice(ordenadas, inicio, None) if cumple(f))
+            if fin is None or consulta.contar:
+                filas = list(coinciden)
+            else:
+                filas = list(islice(coinciden, fin))
+        else:
+            filas = self._filtrar(consulta)
+            for columna, desc in reversed(consulta.orden):
+                filas = sorted(filas, key=_clave_orden(columna), reverse=desc)
+
+        total = len(filas) if consulta.contar else None
+        if consulta.desplazamiento or fin is not None:
+            filas = filas[consulta.desplazamiento:fin]
+        if consulta.columnas is not None:
+            return Respuesta([{c: f.get(c) for c in consulta.columnas} for f in filas], total)
+        return Respuesta([dict(f) for f in filas], total)
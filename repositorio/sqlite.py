@@ -0,0 +1,156 @@
+# repositorio/sqlite.py
+# Backend SQLite (archivo o ":memory:"): mismo esquema que Supabase, con el índice
+# único de slots pendientes y los índices por médico/paciente y fecha. Útil para
+# desarrollo sin red y para perfilar consultas con planes reales.
+import json
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from postgrest.exceptions import APIError
+
+from repositorio.base import Consulta, RepositorioLocal, Respuesta
+
+ESQUEMA = {
+    "usuarios": ("id", "nombre", "email", "password", "rol", "rol_id", "sucursal_id",
+                 "telefono", "foto_url", "foto_miniaturas", "especialidad", "fecha_creacion"),
+    "roles": ("id", "nombre", "descripcion"),
+    "sucursales": ("id", "nombre", "direccion", "telefono"),
+    "horarios": ("id", "medico_id", "sucursal_id", "dia_semana", "hora_inicio", "hora_fin", "duracion_slot"),
+    "citas": ("id", "paciente_id", "medico_id", "sucursal_id", "fecha", "hora", "estado", "comentarios"),
+}
+
+_DDL = """
+create index if not exists usuarios_email on usuarios (email);
+create index if not exists usuarios_rol on usuarios (rol_id);
+create index if not exists horarios_medico on horarios (medico_id, sucursal_id);
+create index if not exists citas_medico_fecha on citas (medico_id, fecha);
+create index if not exists citas_paciente_fecha on citas (paciente_id, fecha);
+create index if not exists citas_fecha_hora_id on citas (fecha, hora, id);
+create unique index if not exists citas_slot_pendiente_unico
+    on citas (medico_id, sucursal_id, fecha, hora) where estado = 'pendiente';
+"""
+
+# Columnas jsonb en Supabase: se guardan como texto JSON
+_COLUMNAS_JSON = {"foto_miniaturas"}
+
+_OPERADORES = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class RepositorioSQLite(RepositorioLocal):
+    def __init__(self, ruta: str = ":memory:", latencia: float = 0.0, funciones: bool = True):
+        super().__init__(latencia=latencia, funciones=funciones)
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta, isolation_level=None, check_same_thread=False)
+        self._conexion.row_factory = sqlite3.Row
+        for tabla, cols in ESQUEMA.items():
+            definicion = ", ".join(
+                "id text primary key" if c == "id" else f"{c} integer" if c == "duracion_slot" else f"{c} text"
+                for c in cols
+            )
+            self._conexion.execute(f"create table if not exists {tabla} ({definicion})")
+        self._conexion.executescript(_DDL)
+
+    def cargar(self, tablas: Dict[str, List[Dict[str, Any]]]) -> None:
+        with self.transaccion():
+            for tabla, filas in tablas.items():
+                for fila in filas:
+                    self.ejecutar(Consulta(self, tabla).insert(fila))
+
+    @contextmanager
+    def transaccion(self):
+        self._conexion.execute("begin immediate")
+        try:
+            yield
+        except Exception:
+            self._conexion.execute("rollback")
+            raise
+        else:
+            self._conexion.execute("commit")
+
+    def _validar(self, tabla: str, cols) -> None:
+        desconocidas = [c for c in cols if c not in ESQUEMA[tabla]]
+        if desconocidas:
+            raise APIError({"code": "42703", "message": f'column {tabla}.{desconocidas[0]} does not exist'})
+
+    def _logica(self, tabla: str, nodo, params: list) -> str:
+        if nodo[0] in ("and", "or"):
+            return "(" + f" {nodo[0]} ".join(self._logica(tabla, n, params) for n in nodo[1]) + ")"
+        op, columna, valor = nodo
+        self._validar(tabla, [columna])
+        params.append(valor)
+        return f"{columna} {_OPERADORES[op]} ?"
+
+    def _where(self, consulta: Consulta):
+        condiciones, params = [], []
+        for op, columna, valor in consulta.filtros:
+            if op == "or":
+                condiciones.append(self._logica(consulta.tabla, valor, params))
+                continue
+            self._validar(consulta.tabla, [columna])
+            if op == "in":
+                if not valor:
+                    condiciones.append("0")
+                    continue
+                condiciones.append(f"{columna} in ({', '.join('?' * len(valor))})")
+                params.extend(valor)
+            else:
+                condiciones.append(f"{columna} {_OPERADORES[op]} ?")
+                params.append(valor)
+        return (" where " + " and ".join(condiciones) if condiciones else ""), params
+
+    def _correr(self, sql: str, params) -> List[Dict[str, Any]]:
+        params = [json.dumps(p) if isinstance(p, (dict, list)) else p for p in params]
+        try:
+            filas = [dict(f) for f in self._conexion.execute(sql, params).fetchall()]
+        except sqlite3.IntegrityError as e:
+            raise APIError({"code": "23505", "message": str(e)})
+        for fila in filas:
+            for columna in _COLUMNAS_JSON.intersection(fila):
+                if fila[columna] is not None:
+                    fila[columna] = json.loads(fila[columna])
+        return filas
+
+    def ejecutar(self, consulta: Consulta) -> Respuesta:
+        tabla = consulta.tabla
+
+        if consulta.operacion == "insert":
+            nuevas = consulta.valores if isinstance(consulta.valores, list) else [consulta.valores]
+            creadas = []
+            for fila in nuevas:
+                fila = dict(fila, id=fila.get("id") or str(uuid.uuid4()))
+                self._validar(tabla, fila)
+                cols = ", ".join(fila)
+                marcas = ", ".join("?" * len(fila))
+                creadas += self._correr(f"insert into {tabla} ({cols}) values ({marcas}) returning *", list(fila.values()))
+            return Respuesta(creadas)
+
+        where, params = self._where(consulta)
+
+        if consulta.operacion == "update":
+            self._validar(tabla, consulta.valores)
+            asignaciones = ", ".join(f"{c} = ?" for c in consulta.valores)
+            return Respuesta(self._correr(
+                f"update {tabla} set {asignaciones}{where} returning *", list(consulta.valores.values()) + params
+            ))
+
+        if consulta.operacion == "delete":
+            return Respuesta(self._correr(f"delete from {tabla}{where} returning *", params))
+
+        cols = consulta.columnas or ESQUEMA[tabla]
+        self._validar(tabla, cols)
+        total = None
+        if consulta.contar:
+            total = self._conexion.execute(f"select count(*) from {tabla}{where}", params).fetchone()[0]
+        sql = f"select {', '.join(cols)} from {tabla}{where}"
+        if consulta.orden:
+            sql += " order by " + ", ".join(
+                f"{c} desc nulls first" if desc else f"{c} asc nulls last" for c, desc in consulta.orden
+            )
+        if consulta.limite is not None or consulta.desplazamiento:
+            sql += f" limit {-1 if consulta.limite is None else int(consulta.limite)} offset {int(consulta.desplazamiento)}"
+        return Respuesta(self._correr(sql, params), total)
+
+    async def aclose(self) -> None:
+        self._conexion.close()
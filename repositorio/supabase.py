@@ -0,0 +1,87 @@
+# repositorio/supabase.py
+# Backend por defecto: PostgREST/Storage de Supabase sobre un pool HTTP compartido
+# (keep-alive, HTTP/2). Cada viaje HTTP se reporta a metricas (tiempo hasta leer
+# el cuerpo, bytes recibidos, errores).
+import os
+import time
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from storage3 import AsyncStorageClient
+
+import metricas
+from supabase_client import SUPABASE_URL, SUPABASE_KEY
+
+# ⚙️ Configuración del pool
+POOL_MAX_CONEXIONES = int(os.getenv("SUPABASE_POOL_MAX", "20"))
+POOL_KEEPALIVE = int(os.getenv("SUPABASE_POOL_KEEPALIVE", "10"))
+TIMEOUT_SEGUNDOS = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+
+_LIMITES = httpx.Limits(
+    max_connections=POOL_MAX_CONEXIONES,
+    max_keepalive_connections=POOL_KEEPALIVE,
+    keepalive_expiry=30,
+)
+
+
+def _headers() -> dict:
+    return {"apiKey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+
+
+class _FlujoMedido(httpx.AsyncByteStream):
+    # Cuenta los bytes del cuerpo y registra el viaje cuando se termina de leer
+    def __init__(self, flujo: httpx.AsyncByteStream, inicio: float, error: bool):
+        self._flujo = flujo
+        self._inicio = inicio
+        self._error = error
+        self._bytes = 0
+        self._registrado = False
+
+    async def __aiter__(self):
+        async for parte in self._flujo:
+            self._bytes += len(parte)
+            yield parte
+
+    async def aclose(self) -> None:
+        await self._flujo.aclose()
+        if not self._registrado:
+            self._registrado = True
+            metricas.registrar_upstream(time.perf_counter() - self._inicio, self._bytes, self._error)
+
+
+class _TransporteMedido(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        inicio = time.perf_counter()
+        try:
+            respuesta = await super().handle_async_request(request)
+        except Exception:
+            metricas.registrar_upstream(time.perf_counter() - inicio, error=True)
+            raise
+        respuesta.stream = _FlujoMedido(respuesta.stream, inicio, respuesta.status_code >= 400)
+        return respuesta
+
+
+def _crear_sesion(base_url: str, headers: dict, timeout, verify: bool = True) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=timeout,
+        follow_redirects=True,
+        transport=_TransporteMedido(verify=verify, http2=True, limits=_LIMITES),
+    )
+
+
+class RepositorioSupabase(AsyncPostgrestClient):
+    def __init__(self):
+        super().__init__(f"{SUPABASE_URL}/rest/v1", headers=_headers(), timeout=TIMEOUT_SEGUNDOS)
+
+    def create_session(self, base_url, headers, timeout, verify=True):
+        return _crear_sesion(base_url, headers, timeout, verify)
+
+
+class StorageSupabase(AsyncStorageClient):
+    def __init__(self):
+        super().__init__(f"{SUPABASE_URL}/storage/v1", _headers(), int(TIMEOUT_SEGUNDOS))
+
+    def _create_session(self, base_url, headers, timeout, verify=True):
+        return _crear_sesion(base_url, headers, timeout, verify)
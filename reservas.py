@@ -0,0 +1,190 @@
+# reservas.py
+# Reserva y reagendado atómicos de citas. La vía principal son las funciones RPC
+# `reservar_cita` y `reagendar_cita` (sql/): validan el horario y escriben en un
+# solo viaje, con un índice único que impide dos citas pendientes en el mismo slot.
+# Si una función no está instalada se usa un candado en memoria por
+# (médico, sucursal, fecha, hora); para reagendar esa vía no es atómica (ver
+# `reagendar_cita`).
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+import agenda
+from datos import db
+from disponibilidad import HorarioMedico, minutos
+
+log = logging.getLogger(__name__)
+
+MSG_SIN_HORARIO = "El médico no tiene horarios en esta sucursal"
+MSG_NO_DISPONIBLE = "El médico no está disponible en la fecha y hora seleccionadas (fuera de horario o ya reservado)"
+
+MSG_NO_ENCONTRADA = "Cita no encontrada"
+
+_ERRORES_RPC = {"sin_horario": MSG_SIN_HORARIO, "no_disponible": MSG_NO_DISPONIBLE}
+_rpc_disponible = {"reservar_cita": True, "reagendar_cita": True}
+_candados: Dict[Tuple[str, ...], list] = {}
+
+
+class ReservaRechazada(Exception):
+    def __init__(self, mensaje: str):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+
+
+class CitaNoEncontrada(Exception):
+    pass
+
+
+@asynccontextmanager
+async def candado_slot(*clave: str):
+    # Candado por slot; la entrada se elimina cuando nadie más lo espera
+    entrada = _candados.setdefault(clave, [asyncio.Lock(), 0])
+    entrada[1] += 1
+    try:
+        async with entrada[0]:
+            yield
+    finally:
+        entrada[1] -= 1
+        if entrada[1] == 0:
+            _candados.pop(clave, None)
+
+
+def _es_violacion_unica(e: APIError) -> bool:
+    return str(e.code) == "23505"
+
+
+async def _llamar_rpc(funcion: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Devuelve la fila creada, o None si la función no existe en esta base
+    if not _rpc_disponible[funcion]:
+        return None
+    try:
+        res = await db.rpc(funcion, params).execute()
+    except APIError as e:
+        if e.message == "no_encontrada":
+            raise CitaNoEncontrada(MSG_NO_ENCONTRADA)
+        if e.message in _ERRORES_RPC:
+            raise ReservaRechazada(_ERRORES_RPC[e.message])
+        if e.code != "PGRST202":
+            raise
+        if _rpc_disponible[funcion]:
+            print(f"{funcion} RPC no disponible; usando candado en memoria")
+            _rpc_disponible[funcion] = False
+        return None
+
+    cita = res.data[0] if isinstance(res.data, list) else res.data
+    if not cita:
+        raise ReservaRechazada("No se pudo crear la cita")
+    return cita
+
+
+def validar_slot(horario: HorarioMedico, sucursal_id: Any, citas_del_dia, fecha: str, hora: str,
+                 excluir_id: Any = None) -> None:
+    # Lanza ReservaRechazada si el slot está fuera de horario u ocupado
+    if str(sucursal_id) not in horario.sucursales:
+        raise ReservaRechazada(MSG_SIN_HORARIO)
+
+    minuto = minutos(hora)
+    en_horario = horario.cubre(sucursal_id, date.fromisoformat(fecha), minuto)
+    ocupada = any(
+        c["estado"] == "pendiente" and minutos(c["hora"]) == minuto and str(c.get("id")) != str(excluir_id)
+        for c in citas_del_dia
+    )
+    if not en_horario or ocupada:
+        raise ReservaRechazada(MSG_NO_DISPONIBLE)
+
+
+async def _verificar_slot(medico_id, sucursal_id, fecha: str, hora: str, excluir_id: Any = None) -> None:
+    # El horario sale de la caché compartida con la disponibilidad (agenda.py);
+    # las citas del slot se leen siempre de la base, dentro del candado
+    horario, citas_res = await asyncio.gather(
+        agenda.horario_medico(medico_id),
+        db.table("citas").select("id,hora,estado")
+          .eq("medico_id", medico_id).eq("sucursal_id", sucursal_id)
+          .eq("fecha", fecha).eq("estado", "pendiente").execute(),
+    )
+    validar_slot(horario, sucursal_id, citas_res.data or [], fecha, hora, excluir_id)
+
+
+async def _insertar(data: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        insert_res = await db.table("citas").insert(data).execute()
+    except APIError as e:
+        if _es_violacion_unica(e):
+            raise ReservaRechazada(MSG_NO_DISPONIBLE)
+        raise
+    if not insert_res.data:
+        raise ReservaRechazada("No se pudo crear la cita")
+    return insert_res.data[0]
+
+
+async def reservar_cita(data: Dict[str, Any]) -> Dict[str, Any]:
+    cita = await _llamar_rpc("reservar_cita", {f"p_{k}": v for k, v in data.items()})
+    if cita is not None:
+        return cita
+
+    async with candado_slot(str(data["medico_id"]), str(data["sucursal_id"]), data["fecha"], data["hora"]):
+        await _verificar_slot(data["medico_id"], data["sucursal_id"], data["fecha"], data["hora"])
+        return await _insertar(data)
+
+
+async def _restaurar_original(cita_id: str) -> None:
+    try:
+        await db.table("citas").update({"estado": "pendiente"}).eq("id", cita_id).execute()
+    except Exception:
+        # Otro paciente tomó el slot original entre medio, o falló el backend:
+        # el paciente queda sin cita y hay que revisarla a mano
+        log.exception("No se pudo restaurar la cita %s tras fallar el reagendado; quedó cancelada", cita_id)
+
+
+# La vía soportada es la función `reagendar_cita` de sql/002_reagendar_cita.sql,
+# que cancela la original e inserta la nueva en una sola transacción. Sin ella,
+# la vía alternativa hace lo mejor posible pero NO es atómica: son tres
+# escrituras separadas (cancelar, insertar y, si la inserción falla, restaurar),
+# y si el proceso muere entre la cancelación y la inserción el paciente se queda
+# sin cita
+async def reagendar_cita(cita_id: str, fecha: str, hora: str, sucursal_id: str,
+                         medico_id: Optional[str] = None) -> Dict[str, Any]:
+    cita = await _llamar_rpc("reagendar_cita", {
+        "p_cita_id": cita_id,
+        "p_fecha": fecha,
+        "p_hora": hora,
+        "p_sucursal_id": sucursal_id,
+        "p_medico_id": medico_id,
+    })
+    if cita is not None:
+        return cita
+
+    # Vía alternativa: dentro del candado del slot nuevo se cancela la original
+    # y luego se inserta la nueva (así reagendar al mismo slot no choca con el
+    # índice único); si la inserción falla, la original vuelve a quedar pendiente
+    original_res = await db.table("citas").select("id,paciente_id,medico_id,estado").eq("id", cita_id).execute()
+    if not original_res.data:
+        raise CitaNoEncontrada(MSG_NO_ENCONTRADA)
+    original = original_res.data[0]
+    medico_id = medico_id or original["medico_id"]
+    pendiente = original["estado"] == "pendiente"
+
+    async with candado_slot(str(medico_id), str(sucursal_id), fecha, hora):
+        await _verificar_slot(medico_id, sucursal_id, fecha, hora, excluir_id=cita_id)
+        if pendiente:
+            await db.table("citas").update({"estado": "cancelada"}).eq("id", cita_id).execute()
+        try:
+            nueva = await _insertar({
+                "paciente_id": original["paciente_id"],
+                "medico_id": medico_id,
+                "sucursal_id": sucursal_id,
+                "fecha": fecha,
+                "hora": hora,
+                "estado": "pendiente",
+                "comentarios": "Reagendada desde cita anterior"
+            })
+        except Exception:
+            if pendiente:
+                await _restaurar_original(cita_id)
+            raise
+
+    return nueva
@@ -0,0 +1,43 @@
+# respuestas.py
+# Serialización JSON con orjson. `RespuestaJSON` es la clase de respuesta por
+# defecto de la app (main.py); los listados grandes la devuelven directamente,
+# lo que además evita el paso de `jsonable_encoder` de FastAPI sobre cada fila.
+# Sin orjson instalado se usa `json` con la misma salida compacta.
+import json
+from datetime import date, datetime, time
+from typing import Any, Iterable
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _por_defecto(valor: Any) -> str:
+    # Tipos que ninguno de los dos caminos serializa solo (Decimal, etc.) van como
+    # texto; las fechas en ISO 8601, como las escribe orjson
+    if isinstance(valor, (date, datetime, time)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def a_json(contenido: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_por_defecto).encode("utf-8")
+
+
+def a_ndjson(filas: Iterable[Any]) -> bytes:
+    # Una fila por línea
+    if orjson is not None:
+        return b"".join(orjson.dumps(f, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS) + b"\n" for f in filas)
+    return "".join(json.dumps(f, ensure_ascii=False, separators=(",", ":"), default=_por_defecto) + "\n"
+                   for f in filas).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return a_json(content)
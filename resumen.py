@@ -0,0 +1,131 @@
+# resumen.py
+# Agregados del tablero de administración: citas por estado, médico, sucursal y
+# día, y ocupación (slots reservados ÷ slots agendados en `horarios`). Se calculan
+# en la base con la función resumen_citas (sql/004_resumen_citas.sql) y devuelven
+# unos pocos KB. Sin esa función, se recorren las citas del rango por páginas
+# acumulando contadores, sin materializar el rango completo en memoria.
+import asyncio
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List
+
+from postgrest.exceptions import APIError
+
+from datos import db
+from disponibilidad import DURACION_SLOT_MINUTOS, indexar_horarios
+
+PAGINA_RESUMEN = 1000
+COLUMNAS_RESUMEN = "id,estado,medico_id,sucursal_id,fecha"
+
+_rpc_disponible = True
+
+
+def slots_agendados(horarios: Iterable[Dict[str, Any]], desde: date, hasta: date,
+                    duracion: int = DURACION_SLOT_MINUTOS) -> int:
+    # Slots de todos los horarios en el rango, con la misma regla que la disponibilidad
+    indice = indexar_horarios(horarios, duracion)
+    por_dia = {
+        dia: sum(len(range(inicio, fin, dur)) for intervalos in sucursales.values() for inicio, fin, dur in intervalos)
+        for dia, sucursales in indice.items()
+    }
+    return sum(por_dia.get((desde + timedelta(days=n)).weekday(), 0) for n in range((hasta - desde).days + 1))
+
+
+class Acumulador:
+    def __init__(self):
+        self.total = 0
+        self.reservados = 0
+        self.por_estado: Counter = Counter()
+        self.por_medico: Counter = Counter()
+        self.por_sucursal: Counter = Counter()
+        self.por_dia: Counter = Counter()
+
+    def agregar(self, citas: Iterable[Dict[str, Any]]) -> None:
+        for c in citas:
+            self.total += 1
+            self.por_estado[c["estado"]] += 1
+            self.por_medico[str(c["medico_id"])] += 1
+            self.por_sucursal[str(c["sucursal_id"])] += 1
+            self.por_dia[str(c["fecha"])] += 1
+            if c["estado"] != "cancelada":
+                self.reservados += 1
+
+    def resultado(self, slots: int) -> Dict[str, Any]:
+        # Misma forma que devuelve la función SQL
+        return {
+            "total": self.total,
+            "por_estado": dict(self.por_estado),
+            "por_medico": [{"medico_id": k, "total": n} for k, n in self.por_medico.most_common()],
+            "por_sucursal": [{"sucursal_id": k, "total": n} for k, n in self.por_sucursal.most_common()],
+            "por_dia": [{"fecha": k, "total": n} for k, n in sorted(self.por_dia.items())],
+            "slots_agendados": slots,
+            "slots_reservados": self.reservados,
+        }
+
+
+async def _recorrer_citas(desde: date, hasta: date) -> Acumulador:
+    acumulador = Acumulador()
+    ultimo = None
+    while True:
+        consulta = db.table("citas").select(COLUMNAS_RESUMEN) \
+            .gte("fecha", desde.isoformat()) \
+            .lte("fecha", hasta.isoformat())
+        if ultimo is not None:
+            consulta = consulta.gt("id", ultimo)
+        pagina = (await consulta.order("id").limit(PAGINA_RESUMEN).execute()).data or []
+        acumulador.agregar(pagina)
+        if len(pagina) < PAGINA_RESUMEN:
+            return acumulador
+        ultimo = pagina[-1]["id"]
+
+
+async def resumen_citas(desde: date, hasta: date) -> Dict[str, Any]:
+    global _rpc_disponible
+    if _rpc_disponible:
+        try:
+            res = await db.rpc("resumen_citas", {
+                "p_desde": desde.isoformat(),
+                "p_hasta": hasta.isoformat(),
+                "p_duracion": DURACION_SLOT_MINUTOS,
+            }).execute()
+            return res.data
+        except APIError as e:
+            if e.code != "PGRST202":
+                raise
+            print("resumen_citas RPC no disponible; agregando por páginas")
+            _rpc_disponible = False
+
+    horarios_res, acumulador = await asyncio.gather(
+        # duracion_slot es opcional en el esquema de Supabase
+        db.table("horarios").select("*").execute(),
+        _recorrer_citas(desde, hasta),
+    )
+    return acumulador.resultado(slots_agendados(horarios_res.data or [], desde, hasta))
+
+
+def con_nombres(resumen: Dict[str, Any], usuarios: Dict[str, str], sucursales: Dict[str, str]) -> Dict[str, Any]:
+    agendados = resumen["slots_agendados"] or 0
+    reservados = resumen["slots_reservados"] or 0
+    return {
+        "total": resumen["total"],
+        "por_estado": resumen["por_estado"],
+        "por_medico": [
+            {"medico_id": m["medico_id"], "medico": usuarios.get(str(m["medico_id"]), "Desconocido"), "total": m["total"]}
+            for m in resumen["por_medico"]
+        ],
+        "por_sucursal": [
+            {"sucursal_id": s["sucursal_id"], "sucursal": sucursales.get(str(s["sucursal_id"]), "Desconocida"),
+             "total": s["total"]}
+            for s in resumen["por_sucursal"]
+        ],
+        "por_dia": resumen["por_dia"],
+        "ocupacion": {
+            "slots_agendados": agendados,
+            "slots_reservados": reservados,
+            "tasa": round(reservados / agendados, 4) if agendados else 0.0,
+        },
+    }
+
+
+def ids_medicos(resumen: Dict[str, Any]) -> List[str]:
+    return [str(m["medico_id"]) for m in resumen["por_medico"]]
@@ -1,11 +1,14 @@
 # auth.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from supabase_client import supabase
+from datos import db
+from nombres import registrar_usuario
 from datetime import datetime, timedelta
-from jose import jwt
-from passlib.context import CryptContext
+from seguridad import PoolSaturado, hash_password, verify_and_update
+from limitador import LOGIN_CONFIAR_PROXY, limitador_login
+import condicional
+import math
 import os
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
@@ -14,7 +17,10 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 SECRET_KEY = os.getenv("JWT_SECRET", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Columnas que necesita el login: el hash para verificar y el perfil que se
+# devuelve (sin el hash): la fila original de `usuarios` más las URLs de las
+# miniaturas de la foto (sql/005_usuarios_miniaturas.sql)
+COLUMNAS_LOGIN = "id,nombre,email,password,rol,rol_id,sucursal_id,telefono,foto_url,foto_miniaturas,fecha_creacion"
 
 # 📦 Modelos de entrada
 class RegisterRequest(BaseModel):
@@ -29,21 +35,36 @@ class LoginRequest(BaseModel):
 
 
 # 🔒 Funciones auxiliares
-def hash_password(password: str) -> str:
-    truncated = password[:72]
-    return pwd_context.hash(truncated)
+def ip_cliente(request: Request) -> str:
+    # Detrás del proxy de Vercel la IP real llega en X-Forwarded-For; sin proxy
+    # configurado el header lo controla el cliente y se ignora
+    reenviada = request.headers.get("x-forwarded-for") if LOGIN_CONFIAR_PROXY else None
+    if reenviada:
+        return reenviada.split(",")[0].strip()
+    return request.client.host if request.client else "desconocida"
+
+def precalentar() -> None:
+    # Importa python-jose (y cryptography) antes del primer login
+    from jose import jwt  # noqa: F401
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    truncated = plain_password[:72]
-    return pwd_context.verify(truncated, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
+    # python-jose se importa en el primer login, no al arrancar
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM), expire
 
 
+async def _actualizar_hash(user_id, nuevo_hash: str):
+    try:
+        await db.table("usuarios").update({"password": nuevo_hash}).eq("id", user_id).execute()
+    except Exception as e:
+        print(f"Error al actualizar hash de contraseña: {e}")
+
+
 # 🧩 Registro de usuario (JSON)
 @router.post("/register")
 async def register(request: RegisterRequest):
@@ -53,11 +74,11 @@ async def register(request: RegisterRequest):
         password = request.password[:72]
 
         # Verificar si el usuario ya existe
-        existing = supabase.table("usuarios").select("*").eq("email", email).execute()
+        existing = await db.table("usuarios").select("id").eq("email", email).execute()
         if existing.data:
             raise HTTPException(status_code=400, detail="El usuario ya existe")
 
-        hashed_password = hash_password(password)
+        hashed_password = await hash_password(password)
 
         new_user = {
             "nombre": nombre,
@@ -67,31 +88,57 @@ async def register(request: RegisterRequest):
             "fecha_creacion": datetime.utcnow().isoformat()
         }
 
-        supabase.table("usuarios").insert(new_user).execute()
+        insert_res = await db.table("usuarios").insert(new_user).execute()
+        if insert_res.data:
+            registrar_usuario(insert_res.data[0])
+        limitador_login.olvidar_email(email)
+        condicional.invalidar("medicos", "pacientes")
 
         return {"message": "Usuario registrado correctamente"}
 
     except HTTPException as e:
         raise e
+    except PoolSaturado as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
 
 
 # 🔐 Inicio de sesión (JSON)
 @router.post("/login")
-async def login(request: LoginRequest):
+async def login(request: LoginRequest, http_request: Request, background_tasks: BackgroundTasks):
     try:
         email = request.email.strip().lower()
         password = request.password[:72]
 
-        res = supabase.table("usuarios").select("*").eq("email", email).execute()
+        # 🚦 Rechazar antes de tocar Supabase o bcrypt
+        espera = limitador_login.verificar(ip_cliente(http_request), email)
+        if espera:
+            return JSONResponse(
+                {"error": "Demasiados intentos de inicio de sesión. Intente más tarde"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(espera))}
+            )
+        if limitador_login.es_desconocido(email):
+            raise HTTPException(status_code=404, detail="Credenciales no válidas")
+
+        res = await db.table("usuarios").select(COLUMNAS_LOGIN).eq("email", email).execute()
         if not res.data:
+            limitador_login.registrar_fallo(email, desconocido=True)
             raise HTTPException(status_code=404, detail="Credenciales no válidas")
 
         user = res.data[0]
-        if not verify_password(password, user.get("password", "")):
+        valido, nuevo_hash = await verify_and_update(password, user.get("password", ""))
+        if not valido:
+            limitador_login.registrar_fallo(email)
             raise HTTPException(status_code=401, detail="Credenciales no válidas")
 
+        limitador_login.registrar_exito(email)
+
+        # El costo de bcrypt cambió: re-hash transparente después de responder
+        if nuevo_hash:
+            background_tasks.add_task(_actualizar_hash, user["id"], nuevo_hash)
+
         access_token, expire = create_access_token({"sub": str(user["id"])})
         user_data = {k: v for k, v in user.items() if k != "password"}
 
@@ -104,5 +151,7 @@ async def login(request: LoginRequest):
 
     except HTTPException as e:
         raise e
+    except PoolSaturado as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
@@ -1,183 +1,258 @@
-from fastapi import APIRouter, Form, Query
-from fastapi.responses import JSONResponse
-
-from supabase_client import supabase 
+import asyncio
+import base64
+import json
+import re
+from collections import defaultdict
+from fastapi import APIRouter, Form, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from datos import db
+from nombres import fetch_name_maps, nombres_sucursales
+from campos import (CamposInvalidos, Proyeccion, columna, dia_semana, fecha_corta, fecha_larga, nombre_sucursal,
+                    nombre_usuario, partes_fecha)
+from respuestas import RespuestaJSON, a_ndjson
+import agenda
+import reservas
+import resumen
+import vuelo
+from disponibilidad import DURACION_SLOT_MINUTOS, disponibilidad_por_dia, formato_hora, minutos, primeros_slots
 from datetime import datetime, timedelta, time
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 router = APIRouter()
 
 # UUID del rol médico 
 MEDICO_ROLE_ID = "5770e7d5-c449-4094-bbe1-fd52ee6fe75f"
-DIAS_ES = ["Lunes","Martes","Miércoles","Jueves","Viernes","Sábado","Domingo"]
-
-
-async def fetch_name_maps(supabase) -> Dict[str, Dict[str, str]]:
-
-    maps = {"sucursales": {}, "usuarios": {}}
-    
-
-    try:
-        suc_res = supabase.table("sucursales").select("id, nombre").execute()
-        maps["sucursales"] = {str(s["id"]): s["nombre"] for s in suc_res.data}
-    except Exception as e:
-        print(f"Error al cargar sucursales: {e}")
-
-
-    try:
-        user_res = supabase.table("usuarios").select("id, nombre").execute()
-        maps["usuarios"] = {str(u["id"]): u["nombre"] for u in user_res.data}
-    except Exception as e:
-        print(f"Error al cargar usuarios: {e}")
-        
-    return maps
-
-def _get_disponibilidad_slots(horarios: List[Dict[str, Any]], citas: List[Dict[str, Any]], 
-                              dias_a_ver: int, slot_duration_minutes: int) -> List[Dict[str, Any]]:
-
-    disponibilidad: List[Dict[str, Any]] = []
+# Ventana de disponibilidad por defecto y máxima (días)
+DIAS_DISPONIBILIDAD = 14
+MAX_DIAS_DISPONIBILIDAD = 90
+# Paginación de /citas/todas (opcional: sin `limite` ni `cursor` se devuelve todo)
+LIMITE_CITAS = 200
+MAX_LIMITE_CITAS = 1000
+# Páginas internas al leer el rango completo (lista completa y NDJSON)
+PAGINA_RANGO = 1000
+_ID_CURSOR = re.compile(r"^[\w-]+$")
+# Rango por defecto (días antes y después de hoy) y máximo del resumen
+DIAS_RESUMEN = 30
+MAX_DIAS_RESUMEN = 366
+
+# Campos de los listados (`?fields=`); por defecto, la forma de siempre
+_CAMPOS_TODAS = Proyeccion(
+    {
+        "id": columna("id"),
+        "paciente": nombre_usuario("paciente_id"),
+        "medico": nombre_usuario("medico_id"),
+        "sucursal": nombre_sucursal(),
+        "fecha": columna("fecha"),
+        "hora": columna("hora"),
+        "fecha_formateada": fecha_larga(),
+        "estado": columna("estado"),
+        "comentarios": columna("comentarios", ""),
+        "paciente_id": columna("paciente_id"),
+        "medico_id": columna("medico_id"),
+        "sucursal_id": columna("sucursal_id"),
+    },
+    por_defecto=("id", "paciente", "medico", "sucursal", "fecha", "hora", "fecha_formateada", "estado"),
+    # El cursor se arma con (fecha, hora, id)
+    siempre=("id", "fecha", "hora"),
+)
+_CAMPOS_FUTURAS = Proyeccion(
+    {
+        "id": columna("id"),
+        "fecha": columna("fecha"),
+        "fecha_formateada": fecha_larga(),
+        "hora": columna("hora"),
+        "estado": columna("estado"),
+        "comentarios": columna("comentarios", ""),
+        "medico": nombre_usuario("medico_id"),
+        "sucursal": nombre_sucursal(),
+        "medico_id": columna("medico_id"),
+        "sucursal_id": columna("sucursal_id"),
+    },
+    por_defecto=("id", "fecha", "fecha_formateada", "hora", "estado", "comentarios", "medico", "sucursal"),
+)
+_CAMPOS_HISTORIAL = Proyeccion(
+    {
+        "id": columna("id"),
+        "fecha": columna("fecha"),
+        "hora": columna("hora"),
+        "estado": columna("estado"),
+        "comentarios": columna("comentarios", ""),
+        "fecha_formateada": fecha_corta(),
+        "dia": dia_semana(),
+        "medico": nombre_usuario("medico_id"),
+        "sucursal": nombre_sucursal("Desconocido"),
+        "medico_id": columna("medico_id"),
+        "sucursal_id": columna("sucursal_id"),
+    },
+    por_defecto=("id", "fecha", "hora", "estado", "comentarios", "fecha_formateada", "dia", "medico", "sucursal"),
+)
+# Cita devuelta por PATCH /citas/{id}/reagendar
+_CAMPOS_REAGENDADA = Proyeccion({
+    "id": columna("id"),
+    "fecha": columna("fecha"),
+    "hora": columna("hora"),
+    "estado": columna("estado"),
+    "comentarios": columna("comentarios"),
+    "fecha_formateada": fecha_larga(),
+    "paciente": nombre_usuario("paciente_id"),
+    "medico": nombre_usuario("medico_id"),
+    "sucursal": nombre_sucursal(),
+}).seleccionar(None)
+
+
+def _rango_disponibilidad(fecha: Optional[str], desde: Optional[str], hasta: Optional[str]):
+    # Devuelve (inicio, fin, error). `fecha` equivale a desde = hasta = fecha
     hoy = datetime.now().date()
-    
-
-    resultado_agrupado: Dict[str, Dict[str, List[str]]] = {} 
-
-    for dia_offset in range(dias_a_ver):
-        fecha_actual = hoy + timedelta(days=dia_offset)
-        fecha_str = fecha_actual.strftime("%Y-%m-%d")
-        dia_semana_str = DIAS_ES[fecha_actual.weekday()]
-
-
-        horarios_dia = [h for h in horarios if h["dia_semana"] == dia_semana_str]
-        
-        sucursales_con_horario = set(h["sucursal_id"] for h in horarios_dia)
-
-        for sucursal_id in sucursales_con_horario:
-            horas_disponibles: List[str] = []
-            
-            horarios_sucursal = [h for h in horarios_dia if str(h["sucursal_id"]) == str(sucursal_id)]
-
-            for h in horarios_sucursal:
-                try:
+    if fecha:
+        desde = hasta = fecha
 
-                    hora_inicio = datetime.strptime(h["hora_inicio"], "%H:%M:%S")
-                    hora_fin = datetime.strptime(h["hora_fin"], "%H:%M:%S")
-                except ValueError:
-                    continue 
-
-                dt_actual = hora_inicio
-
-                while dt_actual < hora_fin:
-                    hora_str = dt_actual.strftime("%H:%M")
-
-                    if fecha_actual == hoy and dt_actual.time() < datetime.now().time():
-                        dt_actual += timedelta(minutes=slot_duration_minutes)
-                        continue
+    try:
+        inicio = datetime.strptime(desde, "%Y-%m-%d").date() if desde else hoy
+        fin = datetime.strptime(hasta, "%Y-%m-%d").date() if hasta else inicio + timedelta(days=DIAS_DISPONIBILIDAD - 1)
+    except ValueError:
+        return None, None, JSONResponse({"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status_code=400)
 
+    if inicio < hoy:
+        return None, None, JSONResponse({"error": "La fecha solicitada es anterior a hoy"}, status_code=400)
+    if fin < inicio:
+        return None, None, JSONResponse({"error": "La fecha 'hasta' es anterior a 'desde'"}, status_code=400)
+    if (fin - inicio).days + 1 > MAX_DIAS_DISPONIBILIDAD:
+        return None, None, JSONResponse({"error": f"El rango no puede superar {MAX_DIAS_DISPONIBILIDAD} días"}, status_code=400)
 
-                    ocupada = any(
-                        c["fecha"] == fecha_str and
-                        c["hora"] == hora_str and
-                        c["estado"] == "pendiente" and
-                        str(c["sucursal_id"]) == str(sucursal_id)
-                        for c in citas
-                    )
+    return inicio, fin, None
 
-                    if not ocupada:
-                        horas_disponibles.append(hora_str)
-                    
-                    dt_actual += timedelta(minutes=slot_duration_minutes)
-            
-            if horas_disponibles:
 
-                key = f"{fecha_str}-{sucursal_id}"
-                if key not in resultado_agrupado:
-                    resultado_agrupado[key] = {
-                        "fecha": fecha_str,
-                        "dia_semana": dia_semana_str,
-                        "sucursal_id": sucursal_id,
-                        "horas_disponibles": []
-                    }
+async def _agenda_medico(medico_id: str, sucursal_id: Optional[str], inicio, fin):
+    # Días del rango desde la agenda en memoria (ver agenda.py) y nombres de
+    # sucursal en paralelo. Devuelve (días, tiene_horarios, nombres de sucursal)
+    dias, sucursales_nombres = await asyncio.gather(
+        agenda.agenda_medico(medico_id, inicio, fin),
+        nombres_sucursales(db),
+    )
+    sucursales = dias[0][1].sucursales
+    if sucursal_id:
+        return [(f, a.de_sucursal(sucursal_id), a.ocupadas) for f, a in dias], sucursal_id in sucursales, sucursales_nombres
+    return [(f, a.intervalos, a.ocupadas) for f, a in dias], bool(sucursales), sucursales_nombres
 
-                resultado_agrupado[key]["horas_disponibles"].extend(horas_disponibles)
-    
 
-    for key, data in resultado_agrupado.items():
-        data["horas_disponibles"] = sorted(list(set(data["horas_disponibles"])))
-        disponibilidad.append(data)
-    
-    return disponibilidad
+def codificar_cursor(cita: Dict[str, Any]) -> str:
+    crudo = json.dumps([cita["fecha"], cita["hora"], str(cita["id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
 
 
-
-@router.get("/medicos")
-async def get_medicos():
+def decodificar_cursor(cursor: str) -> Optional[Tuple[str, str, str]]:
+    # El cursor viaja al filtro or=(...) de PostgREST: se valida cada parte
     try:
+        fecha, hora, cita_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not (_fecha_valida(fecha) and minutos(hora) is not None and _ID_CURSOR.match(str(cita_id))):
+        return None
+    return fecha, hora, str(cita_id)
 
-        maps = await fetch_name_maps(supabase)
-        sucursales_map = maps["sucursales"]
-        
-
-        res = supabase.table("usuarios").select("id,nombre,email,rol_id,sucursal_id").eq("rol_id", MEDICO_ROLE_ID).execute()
-        medicos = res.data
-
-        for medico in medicos:
-            horarios_res = supabase.table("horarios").select("*").eq("medico_id", medico["id"]).execute()
-            medico["horarios"] = horarios_res.data or []
-            
-            suc_id = str(medico["sucursal_id"])
-            medico["sucursal_nombre"] = sucursales_map.get(suc_id, "Desconocida")
-
-        return medicos
 
-    except Exception as e:
-        print(f"Error en get_medicos: {e}")
-        return JSONResponse({"error": "Error interno del servidor", "detalle": str(e)}, status_code=500)
+def _fecha_valida(fecha: Any) -> bool:
+    try:
+        datetime.strptime(str(fecha), "%Y-%m-%d")
+        return True
+    except ValueError:
+        return False
+
+
+async def _pagina_citas(filtros: Dict[str, Optional[str]], desde, hasta, posicion, limite: int, columnas: str):
+    # Una página en orden (fecha, hora, id) a partir de `posicion`; devuelve las
+    # citas y el cursor de la siguiente página (None si es la última)
+    consulta = db.table("citas").select(columnas)
+    for campo_filtro, valor in filtros.items():
+        if valor:
+            consulta = consulta.eq(campo_filtro, valor)
+    if desde:
+        consulta = consulta.gte("fecha", desde)
+    if hasta:
+        consulta = consulta.lte("fecha", hasta)
+    if posicion:
+        fecha, hora, cita_id = posicion
+        consulta = consulta.or_(
+            f"fecha.gt.{fecha},"
+            f"and(fecha.eq.{fecha},hora.gt.{hora}),"
+            f"and(fecha.eq.{fecha},hora.eq.{hora},id.gt.{cita_id})"
+        )
+    res = await consulta.order("fecha").order("hora").order("id").limit(limite + 1).execute()
+    citas = res.data or []
+    if len(citas) > limite:
+        citas = citas[:limite]
+        return citas, codificar_cursor(citas[-1])
+    return citas, None
+
+
+async def _todas_las_citas(filtros: Dict[str, Optional[str]], desde, hasta, columnas: str):
+    # Todo el rango filtrado, leído por páginas con el mismo cursor
+    citas, posicion = [], None
+    while True:
+        pagina, siguiente = await _pagina_citas(filtros, desde, hasta, posicion, PAGINA_RANGO, columnas)
+        citas.extend(pagina)
+        if not siguiente:
+            return citas
+        posicion = decodificar_cursor(siguiente)
+
+
+async def _citas_ndjson(filtros: Dict[str, Optional[str]], desde, hasta, posicion, seleccion):
+    # Trae el rango por páginas y emite cada página enriquecida apenas llega
+    while True:
+        citas, siguiente = await _pagina_citas(filtros, desde, hasta, posicion, PAGINA_RANGO, seleccion.columnas)
+        if citas:
+            usuarios, sucursales = await seleccion.nombres(citas)
+            yield a_ndjson(seleccion.filas(citas, usuarios, sucursales))
+        if not siguiente:
+            return
+        posicion = decodificar_cursor(siguiente)
+
+
+async def _disponibilidad(medico_id: str, sucursal_id: Optional[str], inicio, fin):
+    # Slots libres con nombre de sucursal, o None si el médico no tiene horarios
+    # (en la sucursal pedida)
+    dias, tiene_horarios, sucursales_nombres = await _agenda_medico(medico_id, sucursal_id, inicio, fin)
+    if not tiene_horarios:
+        return None
+
+    disponibilidad_calculada = disponibilidad_por_dia(dias)
+    for slot in disponibilidad_calculada:
+        slot["sucursal_nombre"] = sucursales_nombres.get(str(slot["sucursal_id"]), "Desconocida")
+    return disponibilidad_calculada
+
+
+async def _disponibilidad_compartida(medico_id: str, sucursal_id: Optional[str], inicio, fin):
+    # Pacientes y admin que piden lo mismo a la vez comparten la carga y el cálculo
+    return await vuelo.compartir(
+        "disponibilidad",
+        (str(medico_id), sucursal_id or "", inicio, fin),
+        lambda: _disponibilidad(medico_id, sucursal_id, inicio, fin),
+    )
 
 
 # Obtener disponibilidad de un médico 
 @router.get("/medicos/{medico_id}/disponibilidad")
-async def get_disponibilidad(medico_id: str, sucursal_id: Optional[str] = None, fecha: Optional[str] = None):
+async def get_disponibilidad(
+    medico_id: str,
+    sucursal_id: Optional[str] = None,
+    fecha: Optional[str] = None,
+    desde: Optional[str] = Query(None, description="Inicio del rango (YYYY-MM-DD), por defecto hoy"),
+    hasta: Optional[str] = Query(None, description="Fin del rango (YYYY-MM-DD), por defecto desde + 13 días")
+):
     try:
 
-        maps = await fetch_name_maps(supabase)
-        sucursales_map = maps["sucursales"]
+        inicio, fin, error = _rango_disponibilidad(fecha, desde, hasta)
+        if error:
+            return error
 
-        horarios_q = supabase.table("horarios").select("*").eq("medico_id", medico_id)
-        if sucursal_id:
-            horarios_q = horarios_q.eq("sucursal_id", sucursal_id)
-        horarios = horarios_q.execute().data or []
+        disponibilidad_calculada = await _disponibilidad_compartida(medico_id, sucursal_id, inicio, fin)
 
-        if not horarios:
+        if disponibilidad_calculada is None:
             return JSONResponse({"error": "No hay horarios para este médico (o en esta sucursal)"}, status_code=400)
 
-        citas = supabase.table("citas").select("fecha,hora,estado,sucursal_id").eq("medico_id", medico_id).execute().data or []
-        
-
-        dias_a_ver = 14
-        if fecha:
-            hoy = datetime.now().date()
-            fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
-            if fecha_obj < hoy:
-                return JSONResponse({"error": "La fecha solicitada es anterior a hoy"}, status_code=400)
-
-            dias_a_ver = (fecha_obj - hoy).days + 1
-            if dias_a_ver < 0: dias_a_ver = 0
-
-        disponibilidad_calculada = _get_disponibilidad_slots(
-            horarios=horarios, 
-            citas=citas, 
-            dias_a_ver=dias_a_ver, 
-            slot_duration_minutes=60
-        )
-        
-
-        for slot in disponibilidad_calculada:
-            slot["sucursal_nombre"] = sucursales_map.get(str(slot["sucursal_id"]), "Desconocida")
-
-        if fecha:
-            disponibilidad_calculada = [d for d in disponibilidad_calculada if d["fecha"] == fecha]
-            if not disponibilidad_calculada and dias_a_ver > 0:
-                return JSONResponse({"message": f"No hay disponibilidad para el médico en la fecha {fecha}"}, status_code=200)
+        if fecha and not disponibilidad_calculada:
+            return JSONResponse({"message": f"No hay disponibilidad para el médico en la fecha {fecha}"}, status_code=200)
 
         return disponibilidad_calculada
 
@@ -188,55 +263,124 @@ async def get_disponibilidad(medico_id: str, sucursal_id: Optional[str] = None,
 
 # Obtener disponibilidad de un médico (Vista Admin - Slots de 1 hora)
 @router.get("/admin/medicos/{medico_id}/disponibilidad")
-async def admin_disponibilidad(medico_id: str, fecha: Optional[str] = None):
+async def admin_disponibilidad(
+    medico_id: str,
+    fecha: Optional[str] = None,
+    sucursal_id: Optional[str] = None,
+    desde: Optional[str] = Query(None, description="Inicio del rango (YYYY-MM-DD), por defecto hoy"),
+    hasta: Optional[str] = Query(None, description="Fin del rango (YYYY-MM-DD), por defecto desde + 13 días")
+):
     try:
 
-        maps = await fetch_name_maps(supabase)
-        sucursales_map = maps["sucursales"]
+        inicio, fin, error = _rango_disponibilidad(fecha, desde, hasta)
+        if error:
+            return error
 
-        horarios = supabase.table("horarios").select("*").eq("medico_id", medico_id).execute().data or []
+        disponibilidad_calculada = await _disponibilidad_compartida(medico_id, sucursal_id, inicio, fin)
 
-        if not horarios:
+        if disponibilidad_calculada is None:
             return JSONResponse({"error": "No hay horarios para este médico"}, status_code=400)
 
-        citas = supabase.table("citas").select("fecha,hora,estado,sucursal_id").eq("medico_id", medico_id).eq("estado", "pendiente").execute().data or []
+        if fecha and not disponibilidad_calculada:
+            return JSONResponse({"message": f"No hay disponibilidad para el médico en la fecha {fecha}"}, status_code=200)
 
+        return disponibilidad_calculada
 
-        dias_a_ver = 14
-        if fecha:
-            hoy = datetime.now().date()
-            fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
-            if fecha_obj < hoy:
-                return JSONResponse({"error": "La fecha solicitada es anterior a hoy"}, status_code=400)
-            
+    except Exception as e:
+        print(f"Error en admin_disponibilidad: {e}")
+        return JSONResponse({"error": "Error interno del servidor", "detalle": str(e)}, status_code=500)
 
-            dias_a_ver = (fecha_obj - hoy).days + 1
-            if dias_a_ver < 0: dias_a_ver = 0
 
+# Primeros horarios libres entre todos los médicos de una sucursal
+@router.get("/disponibilidad/primeros")
+async def primeros_disponibles(
+    sucursal_id: str,
+    desde: Optional[str] = Query(None, description="Inicio del rango (YYYY-MM-DD), por defecto hoy"),
+    hasta: Optional[str] = Query(None, description="Fin del rango (YYYY-MM-DD), por defecto desde + 13 días"),
+    especialidad: Optional[str] = Query(None, description="Filtrar médicos por especialidad"),
+    medico_id: Optional[str] = Query(None, description="Limitar la búsqueda a un médico"),
+    limite: int = Query(10, ge=1, le=100, description="Cantidad de slots a devolver")
+):
+    try:
 
-        disponibilidad_calculada = _get_disponibilidad_slots(
-            horarios=horarios, 
-            citas=citas, 
-            dias_a_ver=dias_a_ver, 
-            slot_duration_minutes=60
+        inicio, fin, error = _rango_disponibilidad(None, desde, hasta)
+        if error:
+            return error
+
+        # Tres consultas en bloque (médicos, horarios y citas de la sucursal) en paralelo
+        medicos_q = db.table("usuarios").select("id, nombre").eq("rol_id", MEDICO_ROLE_ID)
+        horarios_q = db.table("horarios").select("*").eq("sucursal_id", sucursal_id)
+        citas_q = db.table("citas").select("medico_id,fecha,hora,estado,sucursal_id") \
+            .eq("sucursal_id", sucursal_id) \
+            .eq("estado", "pendiente") \
+            .gte("fecha", inicio.isoformat()) \
+            .lte("fecha", fin.isoformat())
+        if especialidad:
+            medicos_q = medicos_q.eq("especialidad", especialidad)
+        if medico_id:
+            medicos_q = medicos_q.eq("id", medico_id)
+            horarios_q = horarios_q.eq("medico_id", medico_id)
+            citas_q = citas_q.eq("medico_id", medico_id)
+
+        medicos_res, horarios_res, citas_res, sucursales_nombres = await asyncio.gather(
+            medicos_q.execute(),
+            horarios_q.execute(),
+            citas_q.execute(),
+            nombres_sucursales(db),
         )
-        
-
-        for slot in disponibilidad_calculada:
-            slot["sucursal_nombre"] = sucursales_map.get(str(slot["sucursal_id"]), "Desconocida")
 
-        if fecha:
-            disponibilidad_calculada = [d for d in disponibilidad_calculada if d["fecha"] == fecha]
-            if not disponibilidad_calculada and dias_a_ver > 0:
-                return JSONResponse({"message": f"No hay disponibilidad para el médico en la fecha {fecha}"}, status_code=200)
+        medicos = {str(m["id"]): m["nombre"] for m in medicos_res.data or []}
+        horarios_por_medico = defaultdict(list)
+        for h in horarios_res.data or []:
+            if str(h["medico_id"]) in medicos:
+                horarios_por_medico[str(h["medico_id"])].append(h)
+        citas_por_medico = defaultdict(list)
+        for c in citas_res.data or []:
+            citas_por_medico[str(c["medico_id"])].append(c)
+
+        agendas = {mid: (horarios, citas_por_medico.get(mid, [])) for mid, horarios in horarios_por_medico.items()}
+        slots = primeros_slots(
+            agendas,
+            desde=inicio,
+            dias_a_ver=(fin - inicio).days + 1,
+            limite=limite,
+            slot_duration_minutes=DURACION_SLOT_MINUTOS
+        )
 
-        return disponibilidad_calculada
+        return [
+            {
+                "fecha": fecha,
+                "dia_semana": partes_fecha(fecha)[0],
+                "hora": formato_hora(minuto),
+                "medico_id": mid,
+                "medico_nombre": medicos[mid],
+                "sucursal_id": suc,
+                "sucursal_nombre": sucursales_nombres.get(suc, "Desconocida")
+            }
+            for fecha, minuto, suc, mid in slots
+        ]
 
     except Exception as e:
-        print(f"Error en admin_disponibilidad: {e}")
+        print(f"Error en primeros_disponibles: {e}")
         return JSONResponse({"error": "Error interno del servidor", "detalle": str(e)}, status_code=500)
 
 
+def _validar_fecha_hora(fecha: str, hora: str):
+    # Devuelve (hora normalizada HH:MM, error)
+    if hora.count(':') == 2:
+        hora = hora[:-3]
+
+    try:
+        nueva_dt = datetime.strptime(f"{fecha} {hora}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return hora, JSONResponse({"error": "Formato de fecha u hora inválido. Use YYYY-MM-DD y HH:MM"}, status_code=400)
+
+    if nueva_dt < datetime.now():
+        return hora, JSONResponse({"error": "No se puede agendar una cita en el pasado"}, status_code=400)
+
+    return hora, None
+
+
 # Crear cita con validación de disponibilidad real
 @router.post("/citas")
 async def create_cita(
@@ -250,61 +394,9 @@ async def create_cita(
 ):
     try:
 
-        now = datetime.now()
-        
-
-        if hora.count(':') == 2:
-            hora = hora[:-3] 
-
-        try:
-            nueva_dt = datetime.strptime(f"{fecha} {hora}", "%Y-%m-%d %H:%M")
-        except ValueError:
-            return JSONResponse({"error": "Formato de fecha u hora inválido. Use YYYY-MM-DD y HH:MM"}, status_code=400)
-            
-        if nueva_dt < now:
-            return JSONResponse({"error": "No se puede agendar una cita en el pasado"}, status_code=400)
-
-        horarios_res = supabase.table("horarios").select("*").eq("medico_id", medico_id).eq("sucursal_id", sucursal_id).execute()
-        horarios = horarios_res.data or []
-
-        if not horarios:
-            return JSONResponse({"error": "El médico no tiene horarios en esta sucursal"}, status_code=400)
-
-
-        citas_res = supabase.table("citas").select("fecha, hora, estado").eq("medico_id", medico_id).eq("sucursal_id", sucursal_id).eq("fecha", fecha).execute()
-        citas_pendientes = citas_res.data or []
-
-
-        disponible = False
-        fecha_dt = datetime.strptime(fecha, "%Y-%m-%d")
-        dia_semana_str = DIAS_ES[fecha_dt.weekday()]
-        hora_dt = datetime.strptime(hora, "%H:%M")
-
-        for h in horarios:
-            if h["dia_semana"] != dia_semana_str:
-                continue
-            
-            try:
-                hora_inicio = datetime.strptime(h["hora_inicio"], "%H:%M:%S")
-                hora_fin = datetime.strptime(h["hora_fin"], "%H:%M:%S")
-            except ValueError:
-                continue
-
-            if hora_inicio.time() <= hora_dt.time() < hora_fin.time():
-
-                ocupada = any(
-                    c["fecha"] == fecha and
-                    c["hora"] == hora and
-                    c["estado"] == "pendiente"
-                    for c in citas_pendientes
-                )
-                if not ocupada:
-                    disponible = True
-                    break
-
-        if not disponible:
-            return JSONResponse({"error": "El médico no está disponible en la fecha y hora seleccionadas (fuera de horario o ya reservado)"}, status_code=400)
-
+        hora, error = _validar_fecha_hora(fecha, hora)
+        if error:
+            return error
 
         data = {
             "paciente_id": paciente_id,
@@ -316,11 +408,14 @@ async def create_cita(
             "comentarios": comentarios
         }
 
-        insert_res = supabase.table("citas").insert(data).execute()
-        if not insert_res.data:
-            return JSONResponse({"error": "No se pudo crear la cita"}, status_code=400)
+        # Validación de horario + inserción atómicas (ver reservas.py)
+        try:
+            cita = await reservas.reservar_cita(data)
+        except reservas.ReservaRechazada as e:
+            return JSONResponse({"error": e.mensaje}, status_code=400)
+        agenda.registrar_cita(cita)
 
-        return JSONResponse({"message": "Cita creada correctamente", "cita": insert_res.data[0]}, status_code=201)
+        return JSONResponse({"message": "Cita creada correctamente", "cita": cita}, status_code=201)
 
     except Exception as e:
         print(f"Error en create_cita: {e}")
@@ -329,44 +424,27 @@ async def create_cita(
 
 # Obtener todas las citas futuras de un paciente 
 @router.get("/citas/futuras/{paciente_id}")
-async def get_citas_futuras(paciente_id: str):
+async def get_citas_futuras(
+    paciente_id: str,
+    fields: Optional[str] = Query(None, description=_CAMPOS_FUTURAS.descripcion()),
+):
     try:
 
-        maps = await fetch_name_maps(supabase)
-        usuarios_map = maps["usuarios"]
-        sucursales_map = maps["sucursales"]
+        seleccion = _CAMPOS_FUTURAS.seleccionar(fields)
         hoy = datetime.now().strftime("%Y-%m-%d")
 
 
-        res = supabase.table("citas").select("*") \
+        res = await db.table("citas").select(seleccion.columnas) \
             .eq("paciente_id", paciente_id) \
             .gte("fecha", hoy) \
             .order("fecha", desc=False) \
             .order("hora", desc=False) \
             .execute()
 
-        citas = res.data or []
-
-
-        citas_enriquecidas = []
-        for cita in citas:
-            fecha_dt = datetime.strptime(cita["fecha"], "%Y-%m-%d")
-            dia_semana = DIAS_ES[fecha_dt.weekday()]
-            
-            cita_enrich = {
-                "id": cita["id"],
-                "fecha": cita["fecha"],
-                "fecha_formateada": f"{dia_semana} {fecha_dt.strftime('%d/%m/%Y')}",
-                "hora": cita["hora"],
-                "estado": cita["estado"],
-                "comentarios": cita.get("comentarios", ""),
-                "medico": usuarios_map.get(cita["medico_id"], "Desconocido"),
-                "sucursal": sucursales_map.get(cita["sucursal_id"], "Desconocida")
-            }
-            citas_enriquecidas.append(cita_enrich)
-
-        return citas_enriquecidas
+        return RespuestaJSON(await seleccion.enriquecer(res.data or []))
 
+    except CamposInvalidos as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         print(f"Error en get_citas_futuras: {e}")
         return JSONResponse({"error": "Error interno del servidor", "detalle": str(e)}, status_code=500)
@@ -376,9 +454,10 @@ async def get_citas_futuras(paciente_id: str):
 @router.patch("/citas/{cita_id}/cancelar")
 async def cancelar_cita(cita_id: str):
     try:
-        update_res = supabase.table("citas").update({"estado": "cancelada"}).eq("id", cita_id).execute()
+        update_res = await db.table("citas").update({"estado": "cancelada"}).eq("id", cita_id).execute()
         if not update_res.data:
             return JSONResponse({"error": "No se encontró la cita"}, status_code=404)
+        agenda.liberar_cita(update_res.data[0])
 
         return JSONResponse({"message": "Cita cancelada correctamente"}, status_code=200)
     except Exception as e:
@@ -387,36 +466,19 @@ async def cancelar_cita(cita_id: str):
     
 # Historial de citas de un paciente 
 @router.get("/citas/historial/{paciente_id}")
-async def get_historial_citas(paciente_id: str):
+async def get_historial_citas(
+    paciente_id: str,
+    fields: Optional[str] = Query(None, description=_CAMPOS_HISTORIAL.descripcion()),
+):
     try:
 
-        maps = await fetch_name_maps(supabase)
-        usuarios_map = maps["usuarios"]
-        sucursales_map = maps["sucursales"]
+        seleccion = _CAMPOS_HISTORIAL.seleccionar(fields)
+        res = await db.table("citas").select(seleccion.columnas).eq("paciente_id", paciente_id).order("fecha", desc=True).execute()
 
+        return RespuestaJSON(await seleccion.enriquecer(res.data or []))
 
-        res = supabase.table("citas").select("*").eq("paciente_id", paciente_id).order("fecha", desc=True).execute()
-        citas = res.data or []
-
-
-        citas_enriquecidas = []
-        for c in citas:
-            fecha_dt = datetime.strptime(c["fecha"], "%Y-%m-%d").date()
-            
-            citas_enriquecidas.append({
-                "id": c["id"],
-                "fecha": c["fecha"],
-                "hora": c["hora"],
-                "estado": c["estado"],
-                "comentarios": c.get("comentarios", ""),
-                "fecha_formateada": fecha_dt.strftime("%d/%m/%Y"),
-                "dia": DIAS_ES[fecha_dt.weekday()],
-                "medico": usuarios_map.get(c["medico_id"], "Desconocido"),
-                "sucursal": sucursales_map.get(c["sucursal_id"], "Desconocido")
-            })
-
-        return citas_enriquecidas
-
+    except CamposInvalidos as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         print(f"Error en get_historial_citas: {e}")
         return JSONResponse({"error": "Error interno del servidor", "detalle": str(e)}, status_code=500)
@@ -431,54 +493,23 @@ async def reagendar_cita(
 ):
     try:
 
-        cita_res = supabase.table("citas").select("*").eq("id", cita_id).execute()
-        if not cita_res.data:
-            return JSONResponse({"error": "Cita no encontrada"}, status_code=404)
-
-        cita_original = cita_res.data[0]
-        medico_id = medico_id_param or cita_original["medico_id"] 
-        paciente_id = cita_original["paciente_id"]
-        estado_original = cita_original["estado"]
-
-        if estado_original == "pendiente":
-            supabase.table("citas").update({"estado": "cancelada"}).eq("id", cita_id).execute()
+        hora, error = _validar_fecha_hora(fecha, hora)
+        if error:
+            return error
 
-        # Crear nueva cita
-        nueva_cita = {
-            "paciente_id": paciente_id,
-            "medico_id": medico_id,
-            "sucursal_id": sucursal_id,
-            "fecha": fecha,
-            "hora": hora,
-            "estado": "pendiente",
-            "comentarios": "Reagendada desde cita anterior"
-        }
+        # Validar el nuevo slot, cancelar la original y crear la nueva en una
+        # sola operación atómica (ver reservas.py)
+        try:
+            nueva_cita_creada = await reservas.reagendar_cita(cita_id, fecha, hora, sucursal_id, medico_id_param)
+        except reservas.CitaNoEncontrada:
+            return JSONResponse({"error": "Cita no encontrada"}, status_code=404)
+        except reservas.ReservaRechazada as e:
+            return JSONResponse({"error": e.mensaje}, status_code=400)
+        agenda.liberar_por_id(cita_id)
+        agenda.registrar_cita(nueva_cita_creada)
 
-        insert_res = supabase.table("citas").insert(nueva_cita).execute()
-        if not insert_res.data:
-            return JSONResponse({"error": "No se pudo crear la nueva cita"}, status_code=400)
-
-        nueva_cita_creada = insert_res.data[0]
-
-        # Enriquecer la respuesta
-        maps = await fetch_name_maps(supabase)
-        usuarios_map = maps["usuarios"]
-        sucursales_map = maps["sucursales"]
-
-        fecha_dt = datetime.strptime(nueva_cita_creada["fecha"], "%Y-%m-%d")
-        dia_semana = DIAS_ES[fecha_dt.weekday()]
-
-        cita_enrich = {
-            "id": nueva_cita_creada["id"],
-            "fecha": nueva_cita_creada["fecha"],
-            "hora": nueva_cita_creada["hora"],
-            "estado": nueva_cita_creada["estado"],
-            "comentarios": nueva_cita_creada["comentarios"],
-            "fecha_formateada": f"{dia_semana} {fecha_dt.strftime('%d/%m/%Y')}",
-            "paciente": usuarios_map.get(paciente_id, "Desconocido"),
-            "medico": usuarios_map.get(medico_id, "Desconocido"),
-            "sucursal": sucursales_map.get(sucursal_id, "Desconocida"),
-        }
+        # Enriquecer la respuesta (nombres desde la caché compartida)
+        cita_enrich = (await _CAMPOS_REAGENDADA.enriquecer([nueva_cita_creada]))[0]
 
         return JSONResponse(
             {"message": "Cita reagendada correctamente", "cita": cita_enrich},
@@ -489,35 +520,92 @@ async def reagendar_cita(
         print(f"Error en reagendar_cita: {e}")
         return JSONResponse({"error": "Error interno del servidor", "detalle": str(e)}, status_code=500)
 
-# Endpoint para que el admin vea las citas del paciente y del medico
+# Endpoint para que el admin vea las citas del paciente y del medico.
+# Sin `limite` ni `cursor` devuelve todas las citas filtradas, como siempre.
+# Con `limite` (o un `cursor`) pagina sobre (fecha, hora, id): la respuesta sigue
+# siendo una lista y el cursor de la página siguiente llega en
+# X-Siguiente-Cursor / Link. Con formato=ndjson se transmite todo el rango
+# filtrado, una cita por línea.
 @router.get("/citas/todas")
-async def get_all_citas():
+async def get_all_citas(
+    request: Request,
+    limite: Optional[int] = Query(None, ge=1, le=MAX_LIMITE_CITAS,
+                                  description=f"Tamaño de página; con cursor y sin limite, {LIMITE_CITAS}"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en X-Siguiente-Cursor"),
+    desde: Optional[str] = Query(None, description="Fecha inicial (YYYY-MM-DD)"),
+    hasta: Optional[str] = Query(None, description="Fecha final (YYYY-MM-DD)"),
+    estado: Optional[str] = Query(None),
+    medico_id: Optional[str] = Query(None),
+    sucursal_id: Optional[str] = Query(None),
+    formato: str = Query("json", pattern="^(json|ndjson)$"),
+    fields: Optional[str] = Query(None, description=_CAMPOS_TODAS.descripcion()),
+):
     try:
 
-        maps = await fetch_name_maps(supabase)
-        usuarios_map = maps["usuarios"]
-        sucursales_map = maps["sucursales"]
-
-        citas_res = supabase.table("citas").select("*").execute()
-        citas = citas_res.data or []
-
-        citas_enriquecidas = []
-        for c in citas:
-            fecha_dt = datetime.strptime(c["fecha"], "%Y-%m-%d").date()
-            dia_semana = DIAS_ES[fecha_dt.weekday()]
-
-            citas_enriquecidas.append({
-                "id": c["id"],
-                "paciente": usuarios_map.get(c["paciente_id"], "Desconocido"),
-                "medico": usuarios_map.get(c["medico_id"], "Desconocido"),
-                "sucursal": sucursales_map.get(c["sucursal_id"], "Desconocida"),
-                "fecha": c["fecha"],
-                "hora": c["hora"],
-                "fecha_formateada": f"{dia_semana} {fecha_dt.strftime('%d/%m/%Y')}",
-                "estado": c["estado"]
-            })
-
-        return citas_enriquecidas
+        seleccion = _CAMPOS_TODAS.seleccionar(fields)
+
+        for valor in (desde, hasta):
+            if valor and not _fecha_valida(valor):
+                return JSONResponse({"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status_code=400)
+        posicion = None
+        if cursor:
+            posicion = decodificar_cursor(cursor)
+            if posicion is None:
+                return JSONResponse({"error": "Cursor inválido"}, status_code=400)
+
+        filtros = {"estado": estado, "medico_id": medico_id, "sucursal_id": sucursal_id}
+        if formato == "ndjson":
+            return StreamingResponse(
+                _citas_ndjson(filtros, desde, hasta, posicion, seleccion),
+                media_type="application/x-ndjson",
+            )
+
+        if limite is None and posicion is None:
+            return RespuestaJSON(await seleccion.enriquecer(await _todas_las_citas(filtros, desde, hasta, seleccion.columnas)))
+
+        citas, siguiente = await _pagina_citas(filtros, desde, hasta, posicion, limite or LIMITE_CITAS, seleccion.columnas)
+        citas_enriquecidas = await seleccion.enriquecer(citas)
+
+        headers = {}
+        if siguiente:
+            headers["X-Siguiente-Cursor"] = siguiente
+            headers["Link"] = f'<{request.url.include_query_params(cursor=siguiente)}>; rel="next"'
+        return RespuestaJSON(citas_enriquecidas, headers=headers)
+    except CamposInvalidos as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         print(f"Error en get_all_citas: {e}")
         return JSONResponse({"error": "Error interno del servidor", "detalle": str(e)}, status_code=500)
+
+
+# 📊 Resumen para el tablero del admin: conteos por estado, médico, sucursal y
+# día, y ocupación del rango. Se agrega en la base (resumen_citas), así que la
+# respuesta pesa unos KB aunque el rango tenga miles de citas.
+@router.get("/admin/citas/resumen")
+async def resumen_citas(
+    desde: Optional[str] = Query(None, description="Fecha inicial (YYYY-MM-DD)"),
+    hasta: Optional[str] = Query(None, description="Fecha final (YYYY-MM-DD)"),
+):
+    try:
+        hoy = datetime.now().date()
+        try:
+            inicio = datetime.strptime(desde, "%Y-%m-%d").date() if desde else hoy - timedelta(days=DIAS_RESUMEN)
+            fin = datetime.strptime(hasta, "%Y-%m-%d").date() if hasta else hoy + timedelta(days=DIAS_RESUMEN)
+        except ValueError:
+            return JSONResponse({"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status_code=400)
+        if fin < inicio:
+            return JSONResponse({"error": "La fecha 'hasta' es anterior a 'desde'"}, status_code=400)
+        if (fin - inicio).days + 1 > MAX_DIAS_RESUMEN:
+            return JSONResponse({"error": f"El rango no puede superar {MAX_DIAS_RESUMEN} días"}, status_code=400)
+
+        agregados = await resumen.resumen_citas(inicio, fin)
+        maps = await fetch_name_maps(db, resumen.ids_medicos(agregados))
+
+        return {
+            "desde": inicio.isoformat(),
+            "hasta": fin.isoformat(),
+            **resumen.con_nombres(agregados, maps["usuarios"], maps["sucursales"]),
+        }
+    except Exception as e:
+        print(f"Error en resumen_citas: {e}")
+        return JSONResponse({"error": "Error interno del servidor", "detalle": str(e)}, status_code=500)
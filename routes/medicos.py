@@ -1,63 +1,90 @@
-from fastapi import APIRouter, Form
+from fastapi import APIRouter, Form, Query, Request
 from fastapi.responses import JSONResponse
-from supabase_client import supabase
-from datetime import datetime
+from datos import db, en_paralelo
+from nombres import nombres_sucursales
+from respuestas import RespuestaJSON
+from campos import Proyeccion, columna, dia_semana, fecha_corta, nombre_sucursal, nombre_usuario
+import agenda
+import condicional
+from collections import defaultdict
+from typing import Optional
+import os
 
 router = APIRouter()
 
 MEDICO_ROLE_ID = "5770e7d5-c449-4094-bbe1-fd52ee6fe75f"
+MEDICOS_CACHE_TTL = float(os.getenv("MEDICOS_CACHE_TTL", "60"))
+
+_directorio = condicional.crear_recurso("medicos", MEDICOS_CACHE_TTL)
+
+# Campos de /citas/medico/{id} (`?fields=`); por defecto, la forma de siempre
+_CAMPOS_CITAS_MEDICO = Proyeccion(
+    {
+        "id": columna("id"),
+        "fecha": columna("fecha"),
+        "fecha_formateada": fecha_corta(),
+        "dia": dia_semana(),
+        "hora": columna("hora"),
+        "estado": columna("estado"),
+        "comentarios": columna("comentarios", ""),
+        "paciente_nombre": nombre_usuario("paciente_id"),
+        "sucursal": nombre_sucursal(),
+        "paciente_id": columna("paciente_id"),
+        "sucursal_id": columna("sucursal_id"),
+    },
+    por_defecto=("id", "fecha", "fecha_formateada", "dia", "hora", "estado", "comentarios", "paciente_nombre", "sucursal"),
+)
+
+# Directorio de médicos: médicos y horarios se cargan en paralelo (una consulta
+# cada uno) y los horarios se agrupan en memoria; las sucursales salen de caché.
+# La respuesta serializada queda en memoria con su ETag (ver condicional.py)
+async def _cargar_directorio():
+    medicos_res, horarios_res = await en_paralelo(
+        db.table("usuarios").select(
+            "id, nombre, email, telefono, foto_url, foto_miniaturas, rol_id, sucursal_id"
+        ).eq("rol_id", MEDICO_ROLE_ID),
+        db.table("horarios").select("*"),
+    )
+
+    if not medicos_res.data:
+        return JSONResponse({"error": "No se encontraron médicos"}, status_code=404)
+
+    sucursales_map = await nombres_sucursales(db)
+
+    horarios_por_medico = defaultdict(list)
+    for h in horarios_res.data or []:
+        horarios_por_medico[str(h["medico_id"])].append(h)
+
+    medicos = medicos_res.data
+    for medico in medicos:
+        medico["horarios"] = horarios_por_medico.get(str(medico["id"]), [])
+        medico["sucursal_nombre"] = sucursales_map.get(str(medico["sucursal_id"]), "Desconocida")
+
+    return medicos
+
 
 @router.get("/medicos")
-async def get_medicos():
-    
-    try:
-        res = supabase.table("usuarios").select(
-            "id, nombre, email, telefono, foto_url"
-        ).eq("rol_id", MEDICO_ROLE_ID).execute()
-        
-        if not res.data:
-            return JSONResponse({"error": "No se encontraron médicos"}, status_code=404)
+async def get_medicos(request: Request):
 
-        return res.data
+    try:
+        return await _directorio.responder(request, _cargar_directorio)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
 
 
 
 @router.get("/citas/medico/{medico_id}")
-async def get_citas_medico(medico_id: str):
+async def get_citas_medico(
+    medico_id: str,
+    fields: Optional[str] = Query(None, description=_CAMPOS_CITAS_MEDICO.descripcion()),
+):
     try:
-        res = supabase.table("citas").select("*").eq("medico_id", medico_id).order("fecha", desc=False).order("hora", desc=False).execute()
-        citas = res.data or []
-
-        dias_es = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
-
-        citas_enriquecidas = []
-        for c in citas:
-
-            paciente_res = supabase.table("usuarios").select("nombre").eq("id", c["paciente_id"]).execute()
-            paciente_nombre = paciente_res.data[0]["nombre"] if paciente_res.data else "Desconocido"
-
-            sucursal_res = supabase.table("sucursales").select("nombre").eq("id", c["sucursal_id"]).execute()
-            sucursal_nombre = sucursal_res.data[0]["nombre"] if sucursal_res.data else "Desconocida"
-
-            fecha_dt = datetime.strptime(c["fecha"], "%Y-%m-%d")
-            dia_semana = dias_es[fecha_dt.weekday()]
-            fecha_formateada = fecha_dt.strftime("%d/%m/%Y")
-
-            citas_enriquecidas.append({
-                "id": c["id"],
-                "fecha": c["fecha"],
-                "fecha_formateada": fecha_formateada,
-                "dia": dia_semana,
-                "hora": c["hora"],
-                "estado": c["estado"],
-                "comentarios": c.get("comentarios", ""),
-                "paciente_nombre": paciente_nombre,
-                "sucursal": sucursal_nombre
-            })
+        seleccion = _CAMPOS_CITAS_MEDICO.seleccionar(fields)
+        res = await db.table("citas").select(seleccion.columnas).eq("medico_id", medico_id).order("fecha", desc=False).order("hora", desc=False).execute()
 
-        return citas_enriquecidas
+        # Nombres resueltos en lote (una consulta `in` + sucursales en caché),
+        # sin importar cuántas citas tenga el médico
+        return RespuestaJSON(await seleccion.enriquecer(res.data or []))
 
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
@@ -68,9 +95,10 @@ async def get_citas_medico(medico_id: str):
 async def completar_cita(cita_id: str):
 
     try:
-        res = supabase.table("citas").update({"estado": "completada"}).eq("id", cita_id).execute()
+        res = await db.table("citas").update({"estado": "completada"}).eq("id", cita_id).execute()
         if not res.data:
             return JSONResponse({"error": "Cita no encontrada"}, status_code=404)
+        agenda.liberar_cita(res.data[0])
         return {"message": "Cita completada", "cita": res.data[0]}
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
\ No newline at end of file
@@ -1,21 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from supabase_client import supabase  
+from fastapi import APIRouter, HTTPException, Request
+from datos import db
+import condicional
 
 router = APIRouter()
 
 ROL_PACIENTE_ID = "abc856dd-ba5f-41ae-8dea-27aa29f8ab47"
 
-@router.get("/pacientes")
-def obtener_pacientes():
-    try:
-        response = supabase.table("usuarios").select(
-            "nombre, email, telefono, foto_url"
-        ).eq("rol_id", ROL_PACIENTE_ID).execute()
+_pacientes = condicional.crear_recurso("pacientes", cache_control=condicional.PRIVADO)
+
+async def _cargar_pacientes():
+    response = await db.table("usuarios").select(
+        "nombre, email, telefono, foto_url, foto_miniaturas"
+    ).eq("rol_id", ROL_PACIENTE_ID).execute()
 
-        if not response.data:
-            raise HTTPException(status_code=404, detail="No se encontraron pacientes")
+    if not response.data:
+        raise HTTPException(status_code=404, detail="No se encontraron pacientes")
 
-        return {"pacientes": response.data}
+    return {"pacientes": response.data}
+
+@router.get("/pacientes")
+async def obtener_pacientes(request: Request):
+    try:
+        return await _pacientes.responder(request, _cargar_pacientes)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+import perfilado
+
+router = APIRouter(prefix="/admin/perfiles", tags=["Perfiles"])
+
+
+def _autorizar(secreto):
+    # Sin PERFIL_SECRETO configurado los perfiles no existen para la API
+    if not perfilado.secreto_valido(secreto):
+        raise HTTPException(status_code=404, detail="No encontrado")
+
+
+# 🔬 Perfiles guardados (más recientes primero)
+@router.get("/")
+async def listar_perfiles(x_perfil: str = Header(None)):
+    _autorizar(x_perfil)
+    return perfilado.listar_reportes()
+
+
+@router.get("/{perfil_id}")
+async def obtener_perfil(perfil_id: str, x_perfil: str = Header(None)):
+    _autorizar(x_perfil)
+    reporte = perfilado.obtener_reporte(perfil_id)
+    if reporte is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return PlainTextResponse(reporte["reporte"], headers={"X-Perfil-Formato": reporte["formato"]})
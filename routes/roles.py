@@ -1,9 +1,15 @@
-from fastapi import APIRouter
-from supabase_client import supabase
+from fastapi import APIRouter, Request
+from datos import db
+import condicional
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
-@router.get("/")
-async def get_roles():
-    res = supabase.table("roles").select("*").execute()
+_recurso = condicional.crear_recurso("roles")
+
+async def _cargar_roles():
+    res = await db.table("roles").select("*").execute()
     return res.data
+
+@router.get("/")
+async def get_roles(request: Request):
+    return await _recurso.responder(request, _cargar_roles)
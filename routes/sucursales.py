@@ -1,9 +1,15 @@
-from fastapi import APIRouter
-from supabase_client import supabase
+from fastapi import APIRouter, Request
+from datos import db
+import condicional
 
 router = APIRouter(prefix="/sucursales", tags=["Sucursales"])
 
-@router.get("/")
-async def get_sucursales():
-    res = supabase.table("sucursales").select("*").execute()
+_recurso = condicional.crear_recurso("sucursales")
+
+async def _cargar_sucursales():
+    res = await db.table("sucursales").select("*").execute()
     return res.data
+
+@router.get("/")
+async def get_sucursales(request: Request):
+    return await _recurso.responder(request, _cargar_sucursales)
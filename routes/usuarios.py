@@ -1,20 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form
 from fastapi.responses import JSONResponse
 from typing import Optional
-from supabase_client import supabase
-import uuid
-from passlib.context import CryptContext
+from datos import db
+from nombres import registrar_usuario
+import condicional
+import fotos
+from seguridad import PoolSaturado, hash_password
+from limitador import limitador_login
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password[:72])
 
 
 @router.post("/")
 async def crear_usuario(
+    background_tasks: BackgroundTasks,
     nombre: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
@@ -23,15 +22,14 @@ async def crear_usuario(
     telefono: str = Form(""),
     foto: Optional[UploadFile] = File(None)
 ):
-    foto_url = None
+    foto_url = foto_nombre = foto_contenido = None
     try:
-        if foto:
-            file_data = await foto.read()
-            unique_filename = f"{uuid.uuid4()}_{foto.filename}"
-            supabase.storage.from_("usuarios").upload(unique_filename, file_data)
-            foto_url = supabase.storage.from_("usuarios").get_public_url(unique_filename)
+        # Un campo de archivo vacío cuenta como sin foto
+        if foto and foto.size != 0:
+            # Valida tipo y tamaño y sube el original; las miniaturas se generan tras responder
+            foto_url, foto_nombre, foto_contenido = await fotos.guardar_foto(foto)
 
-        hashed_password = hash_password(password)
+        hashed_password = await hash_password(password)
         data = {
             "nombre": nombre,
             "email": email,
@@ -42,12 +40,21 @@ async def crear_usuario(
             "foto_url": foto_url
         }
 
-        res = supabase.table("usuarios").insert(data).execute()
+        res = await db.table("usuarios").insert(data).execute()
         if not res.data:
             return JSONResponse({"error": "No se pudo crear el usuario"}, status_code=400)
 
+        registrar_usuario(res.data[0])
+        limitador_login.olvidar_email(email.strip().lower())
+        condicional.invalidar("medicos", "pacientes")
+        if foto_contenido:
+            background_tasks.add_task(fotos.generar_miniaturas, res.data[0]["id"], foto_nombre, foto_contenido)
         user_data = {k: v for k, v in res.data[0].items() if k != "password"}
         return {"message": "Usuario creado correctamente", "user": user_data}
 
+    except fotos.FotoInvalida as e:
+        return JSONResponse({"error": e.mensaje}, status_code=e.status_code)
+    except PoolSaturado as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
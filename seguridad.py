@@ -0,0 +1,117 @@
+# seguridad.py
+# Hash y verificación de contraseñas (bcrypt) fuera del event loop, en un pool
+# de hilos acotado con cola limitada y métricas. passlib y su contexto se cargan
+# en el primer uso (o en `precalentar`) para no pesar en el arranque en frío.
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+# ⚙️ Configuración
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_MAX_COLA = int(os.getenv("BCRYPT_MAX_COLA", "64"))
+
+_contexto = None
+
+
+def contexto_hash():
+    # Contexto único; un hash con otro costo se marca para re-hash al iniciar sesión
+    global _contexto
+    if _contexto is None:
+        from passlib.context import CryptContext
+        _contexto = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=BCRYPT_ROUNDS,
+            bcrypt__min_rounds=BCRYPT_ROUNDS,
+            bcrypt__max_rounds=BCRYPT_ROUNDS,
+        )
+    return _contexto
+
+
+def precalentar() -> None:
+    # Carga el backend de bcrypt (passlib lo prueba en el primer uso)
+    contexto_hash().handler("bcrypt").get_backend()
+
+
+class PoolSaturado(Exception):
+    pass
+
+
+class PoolHash:
+    def __init__(self, workers: int, max_cola: int):
+        self.workers = workers
+        self.max_cola = max_cola
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.pendientes = 0
+        self.en_ejecucion = 0
+        self.completadas = 0
+        self.rechazadas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.ejecucion_total = 0.0
+
+    async def ejecutar(self, funcion, *args):
+        if self.pendientes >= self.workers + self.max_cola:
+            self.rechazadas += 1
+            raise PoolSaturado("Demasiadas operaciones de contraseña en cola")
+
+        self.pendientes += 1
+        encolado = time.perf_counter()
+
+        def tarea():
+            inicio = time.perf_counter()
+            with self._lock:
+                self.en_ejecucion += 1
+            try:
+                return funcion(*args), inicio - encolado, time.perf_counter() - inicio
+            finally:
+                with self._lock:
+                    self.en_ejecucion -= 1
+
+        try:
+            resultado, espera, duracion = await asyncio.get_running_loop().run_in_executor(self._executor, tarea)
+        finally:
+            self.pendientes -= 1
+
+        self.completadas += 1
+        self.espera_total += espera
+        self.espera_max = max(self.espera_max, espera)
+        self.ejecucion_total += duracion
+        return resultado
+
+    def estadisticas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_cola": self.max_cola,
+            "rounds": BCRYPT_ROUNDS,
+            "pendientes": self.pendientes,
+            "en_ejecucion": self.en_ejecucion,
+            "en_cola": max(self.pendientes - self.en_ejecucion, 0),
+            "completadas": self.completadas,
+            "rechazadas": self.rechazadas,
+            "espera_media_ms": round(self.espera_total / self.completadas * 1000, 2) if self.completadas else 0.0,
+            "espera_max_ms": round(self.espera_max * 1000, 2),
+            "ejecucion_media_ms": round(self.ejecucion_total / self.completadas * 1000, 2) if self.completadas else 0.0,
+        }
+
+
+pool_hash = PoolHash(BCRYPT_WORKERS, BCRYPT_MAX_COLA)
+
+
+# 🔒 API asíncrona
+async def hash_password(password: str) -> str:
+    return await pool_hash.ejecutar(contexto_hash().hash, password[:72])
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await pool_hash.ejecutar(contexto_hash().verify, plain_password[:72], hashed_password)
+
+
+async def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # (válida, nuevo_hash); nuevo_hash no es None si el costo configurado cambió
+    return await pool_hash.ejecutar(contexto_hash().verify_and_update, plain_password[:72], hashed_password)
@@ -0,0 +1,80 @@
+-- 001_reservar_cita.sql
+-- Reserva atómica de citas: índice único sobre los slots pendientes y función
+-- RPC que valida el horario e inserta en una sola transacción.
+-- Ejecutar en el editor SQL de Supabase.
+
+-- Antes del índice: la reserva anterior (consultar y luego insertar) pudo dejar
+-- varias citas pendientes en el mismo slot, y con ellas el índice único no se
+-- puede crear. Para revisarlas antes de migrar:
+--
+--   select medico_id, sucursal_id, fecha, hora, count(*)
+--   from public.citas
+--   where estado = 'pendiente'
+--   group by medico_id, sucursal_id, fecha, hora
+--   having count(*) > 1;
+--
+-- Se conserva una pendiente por slot (la primera insertada) y las demás quedan
+-- canceladas
+update public.citas c
+set estado = 'cancelada'
+from (
+    select ctid, row_number() over (
+        partition by medico_id, sucursal_id, fecha, hora
+        order by ctid
+    ) as n
+    from public.citas
+    where estado = 'pendiente'
+) d
+where c.ctid = d.ctid
+  and d.n > 1;
+
+-- Un slot (médico, sucursal, fecha, hora) solo puede tener una cita pendiente
+create unique index if not exists citas_slot_pendiente_unico
+    on public.citas (medico_id, sucursal_id, fecha, hora)
+    where estado = 'pendiente';
+
+create or replace function public.reservar_cita(
+    p_paciente_id citas.paciente_id%type,
+    p_medico_id   citas.medico_id%type,
+    p_sucursal_id citas.sucursal_id%type,
+    p_fecha       citas.fecha%type,
+    p_hora        citas.hora%type,
+    p_estado      citas.estado%type default 'pendiente',
+    p_comentarios citas.comentarios%type default ''
+)
+returns public.citas
+language plpgsql
+as $$
+declare
+    v_dia  text := (array['Lunes','Martes','Miércoles','Jueves','Viernes','Sábado','Domingo'])[extract(isodow from p_fecha::date)];
+    v_cita public.citas;
+begin
+    if not exists (
+        select 1 from public.horarios
+        where medico_id = p_medico_id and sucursal_id = p_sucursal_id
+    ) then
+        raise exception 'sin_horario' using errcode = 'P0001';
+    end if;
+
+    if not exists (
+        select 1 from public.horarios
+        where medico_id = p_medico_id
+          and sucursal_id = p_sucursal_id
+          and dia_semana = v_dia
+          and p_hora::time >= hora_inicio::time
+          and p_hora::time < hora_fin::time
+    ) then
+        raise exception 'no_disponible' using errcode = 'P0001';
+    end if;
+
+    begin
+        insert into public.citas (paciente_id, medico_id, sucursal_id, fecha, hora, estado, comentarios)
+        values (p_paciente_id, p_medico_id, p_sucursal_id, p_fecha, p_hora, p_estado, p_comentarios)
+        returning * into v_cita;
+    exception when unique_violation then
+        raise exception 'no_disponible' using errcode = 'P0001';
+    end;
+
+    return v_cita;
+end;
+$$;
@@ -0,0 +1,55 @@
+-- 002_reagendar_cita.sql
+-- Reagendado atómico: bloquea la cita original, valida el nuevo slot, cancela la
+-- original e inserta la nueva en una sola transacción. Requiere 001_reservar_cita.sql
+-- (índice único de slots pendientes).
+
+create or replace function public.reagendar_cita(
+    p_cita_id     citas.id%type,
+    p_fecha       citas.fecha%type,
+    p_hora        citas.hora%type,
+    p_sucursal_id citas.sucursal_id%type,
+    p_medico_id   citas.medico_id%type default null
+)
+returns public.citas
+language plpgsql
+as $$
+declare
+    v_original public.citas;
+    v_medico   citas.medico_id%type;
+    v_dia      text := (array['Lunes','Martes','Miércoles','Jueves','Viernes','Sábado','Domingo'])[extract(isodow from p_fecha::date)];
+    v_cita     public.citas;
+begin
+    select * into v_original from public.citas where id = p_cita_id for update;
+    if not found then
+        raise exception 'no_encontrada' using errcode = 'P0001';
+    end if;
+
+    v_medico := coalesce(p_medico_id, v_original.medico_id);
+
+    if not exists (
+        select 1 from public.horarios
+        where medico_id = v_medico
+          and sucursal_id = p_sucursal_id
+          and dia_semana = v_dia
+          and p_hora::time >= hora_inicio::time
+          and p_hora::time < hora_fin::time
+    ) then
+        raise exception 'no_disponible' using errcode = 'P0001';
+    end if;
+
+    if v_original.estado = 'pendiente' then
+        update public.citas set estado = 'cancelada' where id = p_cita_id;
+    end if;
+
+    begin
+        insert into public.citas (paciente_id, medico_id, sucursal_id, fecha, hora, estado, comentarios)
+        values (v_original.paciente_id, v_medico, p_sucursal_id, p_fecha, p_hora, 'pendiente',
+                'Reagendada desde cita anterior')
+        returning * into v_cita;
+    exception when unique_violation then
+        raise exception 'no_disponible' using errcode = 'P0001';
+    end;
+
+    return v_cita;
+end;
+$$;
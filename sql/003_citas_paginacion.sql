@@ -0,0 +1,7 @@
+-- 003_citas_paginacion.sql
+-- Índice para la paginación por cursor de GET /citas/todas: orden y comparación
+-- por (fecha, hora, id) sin ordenar la tabla completa en cada página.
+-- Ejecutar en el editor SQL de Supabase.
+
+create index if not exists citas_fecha_hora_id
+    on public.citas (fecha, hora, id);
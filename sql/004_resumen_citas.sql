@@ -0,0 +1,56 @@
+-- 004_resumen_citas.sql
+-- Agregados del tablero de administración en una sola llamada: citas del rango
+-- agrupadas por estado, médico, sucursal y día, y los slots agendados según
+-- `horarios` para calcular la ocupación. Usada por GET /admin/citas/resumen.
+-- Ejecutar en el editor SQL de Supabase (requiere 003_citas_paginacion.sql para
+-- filtrar por fecha con índice).
+
+create or replace function public.resumen_citas(
+    p_desde    date,
+    p_hasta    date,
+    p_duracion integer default 60
+)
+returns json
+language sql
+stable
+as $$
+with rango as (
+    select estado, medico_id, sucursal_id, fecha
+    from public.citas
+    where fecha between p_desde and p_hasta
+),
+dias as (
+    select (array['Lunes','Martes','Miércoles','Jueves','Viernes','Sábado','Domingo'])[extract(isodow from d)] as dia
+    from generate_series(p_desde, p_hasta, interval '1 day') as d
+),
+agendados as (
+    -- duracion_slot es opcional en horarios: se lee vía jsonb para no exigir la columna
+    select coalesce(sum(ceil(
+        extract(epoch from (h.hora_fin::time - h.hora_inicio::time)) / 60
+        / coalesce(nullif((to_jsonb(h) ->> 'duracion_slot')::integer, 0), p_duracion)
+    )), 0)::bigint as slots
+    from dias
+    join public.horarios h on h.dia_semana = dias.dia
+    where h.hora_fin::time > h.hora_inicio::time
+)
+select json_build_object(
+    'total', (select count(*) from rango),
+    'por_estado', coalesce(
+        (select json_object_agg(estado, n) from (select estado, count(*) as n from rango group by estado) e),
+        '{}'::json),
+    'por_medico', coalesce(
+        (select json_agg(json_build_object('medico_id', medico_id, 'total', n) order by n desc)
+         from (select medico_id, count(*) as n from rango group by medico_id) m),
+        '[]'::json),
+    'por_sucursal', coalesce(
+        (select json_agg(json_build_object('sucursal_id', sucursal_id, 'total', n) order by n desc)
+         from (select sucursal_id, count(*) as n from rango group by sucursal_id) s),
+        '[]'::json),
+    'por_dia', coalesce(
+        (select json_agg(json_build_object('fecha', fecha, 'total', n) order by fecha)
+         from (select fecha, count(*) as n from rango group by fecha) d),
+        '[]'::json),
+    'slots_agendados', (select slots from agendados),
+    'slots_reservados', (select count(*) from rango where estado <> 'cancelada')
+);
+$$;
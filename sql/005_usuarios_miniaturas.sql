@@ -0,0 +1,5 @@
+-- 005_usuarios_miniaturas.sql
+-- URLs de las miniaturas de la foto de perfil, por lado en píxeles:
+-- {"64": "https://...", "128": "...", "256": "..."}. Las escribe la tarea
+-- posterior a POST /usuarios/ (ver fotos.py); null mientras no existan.
+alter table public.usuarios add column if not exists foto_miniaturas jsonb;
@@ -0,0 +1,8 @@
+-- 006_usuarios_especialidad.sql
+-- Especialidad del médico (texto libre, null para otros roles). La usa el
+-- filtro `especialidad` de GET /disponibilidad/primeros; sin esta columna ese
+-- filtro responde 500.
+alter table public.usuarios add column if not exists especialidad text;
+
+create index if not exists usuarios_rol_especialidad
+    on public.usuarios (rol_id, especialidad);
@@ -1,4 +1,3 @@
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 
@@ -7,5 +6,17 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_API_KEY")
 
-# Crear cliente Supabase
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+_supabase = None
+
+
+# Cliente Supabase (síncrono) construido en el primer acceso a `supabase`: la API
+# usa el backend de repositorio/supabase.py, que solo necesita las credenciales,
+# así que importar este módulo no carga gotrue/realtime ni crea el cliente
+def __getattr__(nombre):
+    global _supabase
+    if nombre != "supabase":
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    if _supabase is None:
+        from supabase import create_client
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
@@ -0,0 +1,7 @@
+# Los módulos de la API están en la raíz del repositorio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATA_BACKEND", "memoria")
+os.environ.setdefault("ARRANQUE_RAPIDO", "1")
@@ -0,0 +1,64 @@
+# GET /citas/medico/{id} hace un número fijo de viajes al backend (citas,
+# nombres de usuario en un lote `in`, sucursales), sin importar cuántas citas
+# tenga el médico.
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import cache
+import datos
+import main
+from repositorio import RepositorioMemoria
+
+MEDICO_ID = "m1"
+MAX_LLAMADAS = 3
+
+
+def _semilla(n_citas: int) -> dict:
+    pacientes = [{"id": f"p{i}", "nombre": f"Paciente {i}", "email": f"p{i}@x"} for i in range(20)]
+    hoy = date.today()
+    return {
+        "sucursales": [{"id": "s1", "nombre": "Centro"}],
+        "usuarios": [{"id": MEDICO_ID, "nombre": "Dr A", "email": "a@x"}, *pacientes],
+        "citas": [
+            {
+                "id": f"c{i}",
+                "paciente_id": pacientes[i % len(pacientes)]["id"],
+                "medico_id": MEDICO_ID,
+                "sucursal_id": "s1",
+                "fecha": (hoy + timedelta(days=i // 8)).isoformat(),
+                "hora": f"{8 + i % 8:02d}:00",
+                "estado": "pendiente",
+                "comentarios": "",
+            }
+            for i in range(n_citas)
+        ],
+    }
+
+
+def _llamadas_citas_medico(n_citas: int) -> int:
+    repo = datos.usar_repositorio(RepositorioMemoria(_semilla(n_citas)))
+    # Cachés de nombres en frío: se cuentan también esas consultas
+    cache.invalidar("usuarios_nombres")
+    cache.invalidar("sucursales_nombres")
+
+    res = TestClient(main.app).get(f"/citas/medico/{MEDICO_ID}")
+    assert res.status_code == 200
+    assert len(res.json()) == n_citas
+    assert all(c["paciente_nombre"].startswith("Paciente") for c in res.json())
+    return repo.llamadas
+
+
+@pytest.fixture(autouse=True)
+def _restaurar_backend():
+    anterior = datos.db._cliente
+    yield
+    datos.db._cliente = anterior
+
+
+def test_citas_medico_llamadas_constantes():
+    una = _llamadas_citas_medico(1)
+    muchas = _llamadas_citas_medico(300)
+    assert una <= MAX_LLAMADAS
+    assert muchas == una
@@ -0,0 +1,53 @@
+# Reservas concurrentes del mismo slot contra POST /citas: exactamente una gana,
+# tanto por la función RPC transaccional como por el candado en memoria (sin
+# RPC). El backend en memoria agrega latencia por llamada para que las
+# peticiones se intercalen.
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+import datos
+import main
+import reservas
+from disponibilidad import DIAS_ES
+from repositorio import RepositorioMemoria
+
+LATENCIA = 0.02
+CONCURRENCIA = 50
+
+
+async def disparar(funciones: bool) -> RepositorioMemoria:
+    manana = date.today() + timedelta(days=1)
+    repo = datos.usar_repositorio(RepositorioMemoria({
+        "horarios": [{"medico_id": "m1", "sucursal_id": "s1", "dia_semana": DIAS_ES[manana.weekday()],
+                      "hora_inicio": "08:00:00", "hora_fin": "12:00:00"}],
+    }, latencia=LATENCIA, funciones=funciones))
+
+    formulario = {"paciente_id": "p1", "medico_id": "m1", "sucursal_id": "s1",
+                  "fecha": manana.isoformat(), "hora": "09:00"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as cliente:
+        respuestas = await asyncio.gather(*(cliente.post("/citas", data=formulario) for _ in range(CONCURRENCIA)))
+
+    assert sorted(r.status_code for r in respuestas) == [201] + [400] * (CONCURRENCIA - 1)
+    return repo
+
+
+@pytest.fixture(autouse=True)
+def _restaurar_estado():
+    anterior = datos.db._cliente
+    rpc = dict(reservas._rpc_disponible)
+    # Cada caso empieza intentando la RPC, como un proceso recién arrancado
+    reservas._rpc_disponible.update(dict.fromkeys(rpc, True))
+    yield
+    datos.db._cliente = anterior
+    reservas._rpc_disponible.update(rpc)
+
+
+@pytest.mark.parametrize("funciones", [True, False], ids=["rpc", "candado"])
+def test_reservas_concurrentes_una_ganadora(funciones):
+    repo = asyncio.run(disparar(funciones))
+    assert len(repo.tablas["citas"]) == 1
+    # Sin funciones en la base, la API recurre al candado y lo recuerda
+    assert reservas._rpc_disponible["reservar_cita"] is funciones
@@ -0,0 +1,38 @@
+# a_json y a_ndjson deben escribir los mismos bytes con orjson y con el `json`
+# estándar (sin orjson instalado), incluidos los tipos que van por `default`.
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+import respuestas
+
+pytest.importorskip("orjson")
+
+FILAS = [
+    {
+        "id": uuid.UUID(int=7),
+        "paciente": "Señora Núñez",
+        "fecha": date(2026, 10, 19),
+        "creada": datetime(2024, 1, 1, 10, 0, 0),
+        "actualizada": datetime(2024, 1, 1, 10, 0, 0, 123456, tzinfo=timezone(timedelta(hours=-6))),
+        "hora": time(8, 30),
+        "monto": Decimal("150.50"),
+        "detalle": {1: [True, None, 12.5]},
+    },
+    {"id": "c2", "estado": "pendiente", "comentarios": ""},
+]
+
+
+def test_a_json_igual_sin_orjson(monkeypatch):
+    con = respuestas.a_json(FILAS)
+    monkeypatch.setattr(respuestas, "orjson", None)
+    assert respuestas.a_json(FILAS) == con
+
+
+def test_a_ndjson_igual_sin_orjson(monkeypatch):
+    con = respuestas.a_ndjson(FILAS)
+    monkeypatch.setattr(respuestas, "orjson", None)
+    assert respuestas.a_ndjson(FILAS) == con
+    assert con.count(b"\n") == len(FILAS)
@@ -0,0 +1,50 @@
+# vuelo.py
+# Single-flight: lecturas idénticas concurrentes comparten una sola carga en
+# curso. La primera petición con una clave lanza la carga como tarea y las que
+# llegan mientras tanto esperan ese mismo resultado (o error) en lugar de repetir
+# las consultas. La tarea no se cancela si la petición que la lanzó se corta,
+# así que las demás la reciben igual. El resultado se comparte entre peticiones:
+# quien lo usa no debe modificarlo.
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+import metricas
+
+lecturas = metricas.Contador(
+    "singleflight_requests_total",
+    "Lecturas con single-flight: 'ejecutada' lanzó la carga, 'compartida' esperó una en curso",
+    ("group", "result"),
+)
+
+_en_vuelo: Dict[Tuple[str, Hashable], "asyncio.Task"] = {}
+
+
+def _terminar(llave: Tuple[str, Hashable], tarea: "asyncio.Task") -> None:
+    if _en_vuelo.get(llave) is tarea:
+        del _en_vuelo[llave]
+    # Marca el error como leído aunque todas las peticiones se hayan cortado
+    if not tarea.cancelled():
+        tarea.exception()
+
+
+async def compartir(grupo: str, clave: Hashable, cargar: Callable[[], Awaitable[Any]]) -> Any:
+    llave = (grupo, clave)
+    tarea = _en_vuelo.get(llave)
+    if tarea is None:
+        tarea = asyncio.ensure_future(cargar())
+        _en_vuelo[llave] = tarea
+        tarea.add_done_callback(lambda t: _terminar(llave, t))
+        lecturas.inc(grupo, "ejecutada")
+    else:
+        lecturas.inc(grupo, "compartida")
+    return await asyncio.shield(tarea)
+
+
+def estadisticas() -> Dict[str, Dict[str, int]]:
+    resumen: Dict[str, Dict[str, int]] = defaultdict(lambda: {"ejecutadas": 0, "compartidas": 0, "en_vuelo": 0})
+    for (grupo, resultado), valor in lecturas.series().items():
+        resumen[grupo]["ejecutadas" if resultado == "ejecutada" else "compartidas"] = int(valor)
+    for grupo, _ in _en_vuelo:
+        resumen[grupo]["en_vuelo"] += 1
+    return dict(resumen)